@@ -0,0 +1,207 @@
+"""Наполнение базы и сценарии запросов для ya_news и ya_note."""
+from itertools import cycle
+from urllib.parse import urlencode
+
+from harness import Request
+
+
+def login(user):
+    """Cookie авторизованной сессии и CSRF-токена для пользователя."""
+    from django.conf import settings
+    from django.contrib.auth import (
+        BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+    )
+    from django.contrib.sessions.backends.db import SessionStore
+    from django.middleware.csrf import _get_new_csrf_token
+
+    session = SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.save()
+    return {
+        settings.SESSION_COOKIE_NAME: session.session_key,
+        settings.CSRF_COOKIE_NAME: _get_new_csrf_token(),
+    }
+
+
+def revisit(request):
+    """
+    Тот же запрос повторно, с ETag ответа на первый.
+
+    Так возвращается читатель или робот, у которого страница уже есть.
+    """
+    from django.test import Client
+
+    response = Client(
+        HTTP_HOST='localhost', HTTP_COOKIE=request.cookie
+    ).get(request.url)
+    return Request(
+        request.method, request.url, cookies=request.cookies,
+        headers={'If-None-Match': response['ETag']},
+    )
+
+
+def form(cookies, **data):
+    from django.conf import settings
+
+    data['csrfmiddlewaretoken'] = cookies[settings.CSRF_COOKIE_NAME]
+    return urlencode(data).encode()
+
+
+def generate(options, **counts):
+    """Наполняет базу командой generate_data с пользователями bench-N."""
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+
+    call_command(
+        'generate_data', users=options.users, seed=options.seed,
+        prefix='bench-', verbosity=0, **counts
+    )
+    return list(get_user_model().objects.filter(
+        username__startswith='bench-'
+    ).order_by('pk'))
+
+
+def seed_news(options):
+    from news.models import News
+
+    users = generate(
+        options, news=options.news, comments=options.news * options.comments
+    )
+    return {
+        'users': users,
+        'sessions': [login(user) for user in users],
+        'news': list(News.objects.values_list('pk', flat=True)),
+    }
+
+
+def news_flows(context, count, rng):
+    from django.db.models import Min
+    from django.urls import reverse
+    from news.models import Comment
+
+    users = context['users']
+    sessions = context['sessions']
+    news_ids = context['news']
+
+    def detail(pk):
+        return reverse('news:detail', args=(pk,))
+
+    session_of = {user.pk: session for user, session in zip(users, sessions)}
+    own_comments = [
+        (session_of[author_id], comment_pk)
+        for author_id, comment_pk in Comment.objects.order_by(
+        ).values_list('author_id').annotate(Min('pk'))
+    ]
+    # Для удаления у каждого запроса свой комментарий.
+    Comment.objects.bulk_create(
+        Comment(news_id=news_ids[0], author=users[index % len(users)],
+                text=f'Удалить {index}')
+        for index in range(count)
+    )
+    doomed = Comment.objects.filter(
+        text__startswith='Удалить'
+    ).values_list('pk', 'author_id')
+    details = [
+        Request('GET', detail(rng.choice(news_ids))) for _ in range(count)
+    ]
+    details_user = [
+        Request('GET', detail(rng.choice(news_ids)), cookies=session)
+        for session, _ in zip(cycle(sessions), range(count))
+    ]
+    return {
+        'home': [Request('GET', reverse('news:home'))] * count,
+        'detail': details,
+        'detail_user': details_user,
+        # Повторные визиты идут до сценариев записи: те меняют версии.
+        'detail_revisit': list(map(revisit, details)),
+        'detail_user_revisit': list(map(revisit, details_user)),
+        'comment_post': [
+            Request(
+                'POST', detail(rng.choice(news_ids)), cookies=session,
+                body=form(session, text=f'Новый комментарий {index}'),
+            )
+            for index, session in zip(range(count), cycle(sessions))
+        ],
+        'comment_edit': [
+            Request(
+                'POST', reverse('news:edit', args=(comment_pk,)),
+                cookies=session, body=form(session, text=f'Правка {index}'),
+            )
+            for index, (session, comment_pk) in zip(
+                range(count), cycle(own_comments)
+            )
+        ],
+        'comment_delete': [
+            Request(
+                'POST', reverse('news:delete', args=(comment_pk,)),
+                cookies=session_of[author_id],
+                body=form(session_of[author_id]),
+            )
+            for comment_pk, author_id in doomed
+        ],
+    }
+
+
+def seed_notes(options):
+    users = generate(options, notes=options.users * options.notes)
+    return {
+        'users': users,
+        'sessions': [login(user) for user in users],
+    }
+
+
+def notes_flows(context, count, rng):
+    from django.urls import reverse
+    from notes.models import Note
+
+    # Заметки распределены неравномерно: в сценариях участвуют только
+    # пользователи, у которых они есть.
+    sessions, slugs = [], []
+    for user, session in zip(context['users'], context['sessions']):
+        own = list(
+            Note.objects.filter(author=user).values_list('slug', flat=True)
+        )
+        if own:
+            sessions.append(session)
+            slugs.append(own)
+    lists = [
+        Request('GET', reverse('notes:list'), cookies=session)
+        for session, _ in zip(cycle(sessions), range(count))
+    ]
+    return {
+        'list': lists,
+        'list_revisit': list(map(revisit, lists)),
+        'detail': [
+            Request(
+                'GET', reverse('notes:detail', args=(rng.choice(own),)),
+                cookies=session,
+            )
+            for session, own, _ in zip(cycle(sessions), cycle(slugs),
+                                       range(count))
+        ],
+        'add': [
+            Request(
+                'POST', reverse('notes:add'), cookies=session,
+                body=form(session, title=f'Новая {index}', text='Текст',
+                          slug=f'bench-new-{index}'),
+            )
+            for index, session in zip(range(count), cycle(sessions))
+        ],
+        # Пустой slug и один заголовок: все запросы спорят за один slug.
+        'add_same_title': [
+            Request(
+                'POST', reverse('notes:add'), cookies=session,
+                body=form(session, title='Одинаковый заголовок',
+                          text='Текст', slug=''),
+            )
+            for _, session in zip(range(count), cycle(sessions))
+        ],
+    }
+
+
+PROJECTS = {
+    'ya_news': (seed_news, news_flows),
+    'ya_note': (seed_notes, notes_flows),
+}
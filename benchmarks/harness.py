@@ -0,0 +1,242 @@
+"""Общие части нагрузочных бенчмарков: Django, база, драйверы и метрики."""
+import asyncio
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+import django
+
+ROOT = Path(__file__).resolve().parent.parent
+SETTINGS = {
+    'ya_news': 'yanews.settings',
+    'ya_note': 'yanote.settings',
+}
+
+
+def setup_django(project):
+    """Подключает проект из репозитория и настраивает Django."""
+    sys.path.insert(0, str(ROOT / project))
+    os.environ['DJANGO_SETTINGS_MODULE'] = SETTINGS[project]
+    django.setup()
+
+
+@contextmanager
+def temporary_database():
+    """
+    Временная файловая база со всеми миграциями.
+
+    Файл, а не база в памяти, нужен, чтобы параллельные потоки
+    работали с одними данными через собственные соединения.
+    """
+    from django.db import connection
+
+    with tempfile.TemporaryDirectory() as directory:
+        connection.settings_dict['TEST']['NAME'] = str(
+            Path(directory) / 'bench.sqlite3'
+        )
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+class Request:
+
+    def __init__(self, method, path, body=b'', cookies=None,
+                 content_type='application/x-www-form-urlencoded',
+                 headers=None):
+        self.method = method
+        self.url = path
+        self.path, _, self.query = path.partition('?')
+        self.body = body
+        self.cookies = cookies or {}
+        self.cookie = '; '.join(
+            f'{name}={value}' for name, value in (cookies or {}).items()
+        )
+        self.content_type = content_type
+        self.headers = headers or {}
+
+
+class WSGIDriver:
+    """Вызывает WSGI-приложение напрямую, без сети."""
+
+    def __init__(self, application):
+        self.application = application
+
+    def environ(self, request):
+        environ = {
+            'REQUEST_METHOD': request.method,
+            'PATH_INFO': request.path,
+            'QUERY_STRING': request.query,
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': 'localhost',
+            'HTTP_COOKIE': request.cookie,
+            'CONTENT_TYPE': request.content_type,
+            'CONTENT_LENGTH': str(len(request.body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(request.body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for name, value in request.headers.items():
+            environ['HTTP_' + name.upper().replace('-', '_')] = value
+        return environ
+
+    def send(self, request):
+        status = []
+
+        def start_response(response_status, headers, exc_info=None):
+            status.append(int(response_status.split()[0]))
+
+        body = self.application(self.environ(request), start_response)
+        try:
+            for _ in body:
+                pass
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+        return status[0]
+
+    def run(self, requests, concurrency):
+        def timed(request):
+            start = time.perf_counter()
+            status = self.send(request)
+            return status, time.perf_counter() - start
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return list(executor.map(timed, requests))
+
+
+class ASGIDriver:
+    """Вызывает ASGI-приложение в цикле событий, без сети."""
+
+    def __init__(self, application):
+        self.application = application
+
+    def scope(self, request):
+        headers = [
+            (b'host', b'localhost'),
+            (b'content-type', request.content_type.encode()),
+            (b'content-length', str(len(request.body)).encode()),
+        ]
+        if request.cookie:
+            headers.append((b'cookie', request.cookie.encode()))
+        headers.extend(
+            (name.lower().encode(), value.encode())
+            for name, value in request.headers.items()
+        )
+        return {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': request.method,
+            'scheme': 'http',
+            'path': request.path,
+            'raw_path': request.path.encode(),
+            'query_string': request.query.encode(),
+            'root_path': '',
+            'headers': headers,
+            'server': ('localhost', 80),
+            'client': ('127.0.0.1', 0),
+        }
+
+    async def send(self, request):
+        status = []
+        messages = [
+            {'type': 'http.request', 'body': request.body, 'more_body': False}
+        ]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await asyncio.Event().wait()
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+
+        await self.application(self.scope(request), receive, send)
+        return status[0]
+
+    def run(self, requests, concurrency):
+        async def run_all():
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def timed(request):
+                async with semaphore:
+                    start = time.perf_counter()
+                    status = await self.send(request)
+                    return status, time.perf_counter() - start
+
+            return await asyncio.gather(*map(timed, requests))
+
+        return asyncio.run(run_all())
+
+
+def get_driver(project, interface):
+    package = SETTINGS[project].split('.')[0]
+    module = __import__(f'{package}.{interface}', fromlist=['application'])
+    driver_class = WSGIDriver if interface == 'wsgi' else ASGIDriver
+    return driver_class(module.application)
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    return sorted_values[index]
+
+
+def measure(driver, requests, concurrency, ok_statuses=(200, 302, 304)):
+    """Прогоняет запросы и возвращает пропускную способность и задержки."""
+    start = time.perf_counter()
+    results = driver.run(requests, concurrency)
+    elapsed = time.perf_counter() - start
+    latencies = sorted(latency * 1000 for _, latency in results)
+    return {
+        'requests': len(results),
+        'errors': sum(status not in ok_statuses for status, _ in results),
+        'throughput_rps': len(results) / elapsed,
+        'mean_ms': statistics.mean(latencies),
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+    }
+
+
+def compare(baseline, candidate, threshold):
+    """
+    Сравнивает два прогона и возвращает строки отчёта и регрессии.
+
+    Регрессией считается рост p95 или падение пропускной способности
+    больше чем на долю threshold.
+    """
+    lines, regressions = [], []
+    for flow, new in candidate['flows'].items():
+        old = baseline['flows'].get(flow)
+        if old is None:
+            continue
+        p95_change = new['p95_ms'] / old['p95_ms'] - 1
+        rps_change = new['throughput_rps'] / old['throughput_rps'] - 1
+        regressed = p95_change > threshold or rps_change < -threshold
+        lines.append(
+            f'{flow:<16} p95: {old["p95_ms"]:8.2f} -> {new["p95_ms"]:8.2f} мс '
+            f'({p95_change:+.0%})  rps: {old["throughput_rps"]:8.1f} -> '
+            f'{new["throughput_rps"]:8.1f} ({rps_change:+.0%})'
+            + ('  РЕГРЕССИЯ' if regressed else '')
+        )
+        if regressed:
+            regressions.append(flow)
+    return lines, regressions
@@ -0,0 +1,146 @@
+"""
+Нагрузочный бенчмарк ya_news и ya_note.
+
+Наполняет временную базу, прогоняет сценарии через WSGI- или
+ASGI-приложение проекта и сохраняет пропускную способность и задержки
+p50/p95/p99 в JSON. Режим compare сравнивает два прогона. Под ASGI
+страницы чтения обслуживают асинхронные представления, --sync-views
+оставляет синхронные.
+
+Запуск из корня репозитория:
+    python benchmarks/load.py run ya_news --concurrency 8 --output a.json
+    python benchmarks/load.py run ya_news --interface asgi --output b.json
+    python benchmarks/load.py compare a.json b.json
+"""
+import argparse
+import json
+import logging
+import platform
+import random
+import sys
+from datetime import datetime
+
+import harness
+
+
+def run(options):
+    harness.setup_django(options.project)
+    import django
+    from django.conf import settings
+
+    from flows import PROJECTS
+
+    logging.disable(logging.INFO)
+    settings.SQLITE_PRODUCTION_MODE = options.sqlite_production
+    # Асинхронные представления включает ASGI-модуль проекта, но
+    # настройки к его импорту уже прочитаны.
+    settings.ASYNC_VIEWS = (
+        options.interface == 'asgi' and not options.sync_views
+    )
+    seed, build_flows = PROJECTS[options.project]
+    with harness.temporary_database():
+        context = seed(options)
+        flows = build_flows(
+            context, options.requests, random.Random(options.seed)
+        )
+        driver = harness.get_driver(options.project, options.interface)
+        results = {}
+        for name, requests in flows.items():
+            if options.flows and name not in options.flows:
+                continue
+            results[name] = harness.measure(
+                driver, requests, options.concurrency
+            )
+            print(
+                f'{name:<16} {results[name]["throughput_rps"]:8.1f} rps  '
+                f'p50 {results[name]["p50_ms"]:7.2f}  '
+                f'p95 {results[name]["p95_ms"]:7.2f}  '
+                f'p99 {results[name]["p99_ms"]:7.2f} мс  '
+                f'ошибок: {results[name]["errors"]}'
+            )
+    report = {
+        'project': options.project,
+        'interface': options.interface,
+        'concurrency': options.concurrency,
+        'sqlite_production': options.sqlite_production,
+        'async_views': settings.ASYNC_VIEWS,
+        'started': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'flows': results,
+    }
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+    return 0
+
+
+def compare(options):
+    with open(options.baseline, encoding='utf-8') as file:
+        baseline = json.load(file)
+    with open(options.candidate, encoding='utf-8') as file:
+        candidate = json.load(file)
+    lines, regressions = harness.compare(
+        baseline, candidate, options.threshold
+    )
+    print('\n'.join(lines))
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Прогнать сценарии.')
+    run_parser.add_argument('project', choices=harness.SETTINGS)
+    run_parser.add_argument(
+        '--interface', choices=('wsgi', 'asgi'), default='wsgi'
+    )
+    run_parser.add_argument('--concurrency', type=int, default=8)
+    run_parser.add_argument(
+        '--requests', type=int, default=200,
+        help='Число запросов в каждом сценарии.',
+    )
+    run_parser.add_argument(
+        '--flows', nargs='*', help='Прогнать только эти сценарии.'
+    )
+    run_parser.add_argument('--users', type=int, default=20)
+    run_parser.add_argument('--news', type=int, default=50)
+    run_parser.add_argument(
+        '--comments', type=int, default=20, help='Комментариев на новость.'
+    )
+    run_parser.add_argument(
+        '--notes', type=int, default=50, help='Заметок на пользователя.'
+    )
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument(
+        '--sqlite-production', action='store_true',
+        help='Включить SQLITE_PRODUCTION_MODE.',
+    )
+    run_parser.add_argument(
+        '--sync-views', action='store_true',
+        help='Под ASGI обслуживать страницы синхронными представлениями.',
+    )
+    run_parser.add_argument('--output', help='Куда сохранить JSON.')
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser(
+        'compare', help='Сравнить два прогона.'
+    )
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('candidate')
+    compare_parser.add_argument(
+        '--threshold', type=float, default=0.1,
+        help='Допустимое ухудшение p95 и rps, доля (0.1 = 10%%).',
+    )
+    compare_parser.set_defaults(handler=compare)
+
+    options = parser.parse_args()
+    sys.exit(options.handler(options))
+
+
+if __name__ == '__main__':
+    main()
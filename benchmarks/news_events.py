@@ -0,0 +1,144 @@
+"""
+Рассылка событий комментариев по потокам SSE против перезагрузки.
+
+Открывает --listeners потоков news.live.LiveComments на одну новость
+с --comments комментариями, добавляет --events новых комментариев и
+замеряет, за сколько событие доходит до всех потоков. Для сравнения
+считается, сколько байт и времени стоит перезагрузка news:detail,
+которой читатель раньше узнавал о новых комментариях: из кэша и после
+нового комментария, сбросившего кэш страницы.
+
+Запуск из корня репозитория:
+    python benchmarks/news_events.py --listeners 1000 --events 50
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+from asgiref.sync import sync_to_async
+
+import harness
+
+
+async def not_found(scope, receive, send):
+    await send({'type': 'http.response.start', 'status': 404})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def fan_out(application, path, listeners, events, create_comment):
+    """
+    Открывает потоки SSE и замеряет доставку каждого события всем.
+
+    Возвращает отсортированные задержки в мс и средний размер события.
+    """
+    scope = {
+        'type': 'http', 'method': 'GET', 'path': path,
+        'query_string': b'', 'headers': [],
+    }
+    disconnect = asyncio.Event()
+    opened = []
+    deliveries = []
+    event_bytes = []
+
+    async def receive():
+        await disconnect.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            opened.append(message['status'])
+        elif message['body'].startswith(b'event: created'):
+            deliveries.append(time.perf_counter())
+            event_bytes.append(len(message['body']))
+
+    streams = [
+        asyncio.ensure_future(application(scope, receive, send))
+        for _ in range(listeners)
+    ]
+    while len(opened) < listeners:
+        await asyncio.sleep(0.01)
+    fanout = []
+    for index in range(events):
+        start = time.perf_counter()
+        await sync_to_async(create_comment)(f'Событие {index}')
+        while len(deliveries) < listeners * (index + 1):
+            await asyncio.sleep(0)
+        fanout.append((deliveries[-1] - start) * 1000)
+    disconnect.set()
+    await asyncio.gather(*streams)
+    return sorted(fanout), statistics.mean(event_bytes)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--listeners', type=int, default=1000)
+    parser.add_argument('--events', type=int, default=50)
+    parser.add_argument('--comments', type=int, default=200)
+    parser.add_argument('--reloads', type=int, default=50)
+    options = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    harness.setup_django('ya_news')
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+    from django.urls import reverse
+    from news.cache import invalidate_news_pages
+    from news.live import LiveComments
+    from news.models import Comment, News
+
+    settings.ALLOWED_HOSTS = ['*']
+    settings.NEWS_EVENTS_MAX_CONNECTIONS = options.listeners
+    settings.NEWS_EVENTS_QUEUE_SIZE = options.events + 1
+
+    with harness.temporary_database():
+        author = get_user_model().objects.create(username='Автор')
+        news = News.objects.create(title='Заголовок', text='Текст')
+        Comment.objects.bulk_create(
+            Comment(news=news, author=author, text=f'Комментарий {index}')
+            for index in range(options.comments)
+        )
+        client = Client()
+        url = reverse('news:detail', args=(news.pk,))
+        reloads = {'из кэша': [], 'после сброса': []}
+        for _ in range(options.reloads):
+            for name, latencies in reloads.items():
+                if name == 'после сброса':
+                    invalidate_news_pages(news.pk)
+                start = time.perf_counter()
+                page = client.get(url).content
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        fanout, event_size = asyncio.run(fan_out(
+            LiveComments(not_found), reverse('news:events', args=(news.pk,)),
+            options.listeners, options.events,
+            lambda text: Comment.objects.create(
+                news=news, author=author, text=text
+            ),
+        ))
+
+    print(
+        f'Потоков: {options.listeners}, событий: {options.events}, '
+        f'комментариев под новостью: {options.comments}'
+    )
+    print(
+        f'событие SSE   {event_size:8.0f} байт  доставка всем '
+        f'p50 {harness.percentile(fanout, 0.5):7.2f}  '
+        f'p95 {harness.percentile(fanout, 0.95):7.2f} мс'
+    )
+    for name, latencies in reloads.items():
+        latencies.sort()
+        print(
+            f'перезагрузка  {len(page):8d} байт  {name:14} '
+            f'p50 {harness.percentile(latencies, 0.5):7.2f}  '
+            f'p95 {harness.percentile(latencies, 0.95):7.2f} мс'
+        )
+
+
+if __name__ == '__main__':
+    main()
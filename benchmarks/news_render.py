@@ -0,0 +1,105 @@
+"""
+Рендеринг страницы комментариев и главной с готовым текстом и без.
+
+Комментарии и новости строятся в памяти из словаря generate_data, база
+не нужна. «Фильтры» — строки без Comment.text_html и News.excerpt, как
+до команды prerender_text: шаблоны прогоняют текст через linebreaksbr и
+truncatewords. «Готовый текст» — те же строки после подготовки при
+сохранении. Шаблоны загружаются один раз, замеряется только рендеринг.
+Перед замером результаты рендеринга сверяются.
+
+Запуск из корня репозитория:
+    python benchmarks/news_render.py --renders 2000
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timezone
+
+import harness
+
+
+def timed(render, renders):
+    start = time.perf_counter()
+    for _ in range(renders):
+        render()
+    return (time.perf_counter() - start) / renders * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--renders', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    options = parser.parse_args()
+
+    harness.setup_django('ya_news')
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.template.loader import get_template
+    from news.management.commands.generate_data import words
+    from news.models import Comment, News
+    from news.rendering import make_excerpt, render_comment_text
+
+    rng = random.Random(options.seed)
+    author = get_user_model()(pk=1, username='Автор')
+    now = datetime.now(timezone.utc)
+    texts = [
+        '\n'.join(words(rng, 3, 30) for _ in range(rng.randint(1, 4)))
+        for _ in range(settings.COMMENTS_COUNT_ON_DETAIL_PAGE)
+    ]
+    stories = [
+        words(rng, 50, 600) for _ in range(settings.NEWS_COUNT_ON_HOME_PAGE)
+    ]
+
+    def comments(prepared):
+        return [
+            Comment(
+                pk=index, author=author, news_id=1, created=now, text=text,
+                text_html=render_comment_text(text) if prepared else '',
+            )
+            for index, text in enumerate(texts, 1)
+        ]
+
+    def news(prepared):
+        return [
+            News(
+                pk=index, title='Заголовок', text=text, date=now.date(),
+                excerpt=make_excerpt(text) if prepared else '',
+            )
+            for index, text in enumerate(stories, 1)
+        ]
+
+    pages = {
+        'комментарии': lambda prepared: (
+            'news/comments.html',
+            {'news_id': 1, 'comments': comments(prepared)},
+        ),
+        'главная': lambda prepared: (
+            'news/home.html', {'object_list': news(prepared)},
+        ),
+    }
+    for name, build in pages.items():
+        results = {}
+        for prepared in (False, True):
+            name_, context = build(prepared)
+            template = get_template(name_)
+            results[prepared] = (template.render(context), timed(
+                lambda: template.render(context), options.renders
+            ))
+        if results[False][0] != results[True][0]:
+            print(f'{name}: HTML различается', file=sys.stderr)
+            return 1
+        filters, prepared = results[False][1], results[True][1]
+        print(
+            f'{name:<12} фильтры {filters:7.3f} мс  готовый текст '
+            f'{prepared:7.3f} мс  быстрее в {filters / prepared:.1f} раза'
+        )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
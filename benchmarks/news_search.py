@@ -0,0 +1,98 @@
+"""
+Задержка поиска по новостям и комментариям.
+
+Наполняет временную базу командой generate_data и сравнивает
+ранжирование через индексы FTS5 (news.search.rank_news, без кэша) с
+поиском icontains по заголовку, тексту и комментариям. Отдельно
+замеряется повторный запрос через кэш результатов (search_news).
+
+Запуск из корня репозитория:
+    python benchmarks/news_search.py --comments 1000000 --workers 4
+"""
+import argparse
+import random
+import sys
+import time
+
+import harness
+
+
+def timed(func, queries):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        func(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return harness.percentile(latencies, 0.5), harness.percentile(
+        latencies, 0.95
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--news', type=int, default=10000)
+    parser.add_argument('--comments', type=int, default=200000)
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    options = parser.parse_args()
+
+    harness.setup_django('ya_news')
+    from django.core.management import call_command
+    from django.db.models import Q
+    from news.management.commands.generate_data import VOCABULARY, WORDS
+    from news.models import News
+    from news.search import rank_news, search_news
+    from yacommon.search import build_match
+
+    rng = random.Random(options.seed)
+    query_sets = {
+        'частые': [rng.choice(WORDS) for _ in range(options.queries)],
+        'редкие': [
+            rng.choice(VOCABULARY[len(VOCABULARY) // 2:])
+            for _ in range(options.queries)
+        ],
+    }
+
+    def icontains(query):
+        list(News.objects.filter(
+            Q(title__icontains=query) | Q(text__icontains=query)
+            | Q(comment__text__icontains=query)
+        ).distinct().values_list('pk', flat=True)[:10])
+
+    with harness.temporary_database():
+        start = time.perf_counter()
+        call_command(
+            'generate_data', users=options.users, news=options.news,
+            comments=options.comments, seed=options.seed,
+            workers=options.workers, verbosity=0,
+        )
+        print(
+            f'Новостей: {options.news}, комментариев: {options.comments}, '
+            f'наполнение и индексация {time.perf_counter() - start:.1f} с'
+        )
+        # Первый проход наполняет кэш результатов для замера «кэш».
+        for queries in query_sets.values():
+            for query in queries:
+                search_news(query)
+        for name, func in (
+            ('FTS5', lambda query: rank_news(build_match(query))),
+            ('кэш', search_news),
+            ('icontains', icontains),
+        ):
+            for words, queries in query_sets.items():
+                p50, p95 = timed(func, queries)
+                print(
+                    f'{name:<10} {words:<7} p50 {p50:8.2f}  '
+                    f'p95 {p95:8.2f} мс'
+                )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
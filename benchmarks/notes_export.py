@@ -0,0 +1,73 @@
+"""
+Потоковая выгрузка заметок: скорость и пик памяти.
+
+Наполняет временную базу заметками одного пользователя и выгружает их
+во всех форматах notes.export. Пик памяти Python замеряется
+tracemalloc во втором проходе, чтобы не искажать время, и не должен
+расти с числом заметок; zip проверяется стандартным zipfile.
+
+Запуск из корня репозитория:
+    python benchmarks/notes_export.py --notes 1000000
+"""
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from pathlib import Path
+
+import harness
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--notes', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=0)
+    options = parser.parse_args()
+
+    harness.setup_django('ya_note')
+    from django.core.management import call_command
+    from notes.export import FORMATS, export_notes
+    from notes.models import Note
+
+    with harness.temporary_database(), tempfile.TemporaryDirectory() as path:
+        call_command(
+            'generate_data', users=1, notes=options.notes,
+            seed=options.seed, verbosity=0,
+        )
+        author_id = Note.objects.values_list('author', flat=True).first()
+        print(f'Заметок у пользователя: {options.notes}')
+        for export_format in FORMATS:
+            output = Path(path) / f'notes.{export_format}'
+
+            def export():
+                with open(output, 'wb') as file:
+                    for chunk in export_notes(author_id, export_format):
+                        file.write(chunk)
+
+            start = time.perf_counter()
+            export()
+            elapsed = time.perf_counter() - start
+            tracemalloc.start()
+            export()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            size = output.stat().st_size
+            print(
+                f'{export_format:<7} {elapsed:7.1f} с  '
+                f'{size / 1024 / 1024:8.1f} МБ  '
+                f'{size / 1024 / 1024 / elapsed:6.1f} МБ/с  '
+                f'пик памяти {peak / 1024 / 1024:6.1f} МБ'
+            )
+            if export_format == 'zip':
+                with zipfile.ZipFile(output) as archive:
+                    assert len(archive.infolist()) == options.notes
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
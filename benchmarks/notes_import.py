@@ -0,0 +1,68 @@
+"""
+Пакетная загрузка заметок: скорость и число запросов.
+
+Выгружает заметки сгенерированного пользователя в NDJSON и загружает
+их другому пользователю через notes.imports. Все заметки получают
+занятые slug, поэтому замер включает подбор суффиксов; число запросов
+на пачку должно оставаться постоянным.
+
+Запуск из корня репозитория:
+    python benchmarks/notes_import.py --notes 100000
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import harness
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--notes', type=int, default=50000)
+    parser.add_argument('--seed', type=int, default=0)
+    options = parser.parse_args()
+
+    harness.setup_django('ya_note')
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from notes.export import export_notes
+    from notes.imports import import_notes
+    from notes.models import Note
+
+    with harness.temporary_database(), tempfile.TemporaryDirectory() as path:
+        call_command(
+            'generate_data', users=1, notes=options.notes,
+            seed=options.seed, verbosity=0,
+        )
+        author_id = Note.objects.values_list('author', flat=True).first()
+        output = Path(path) / 'notes.ndjson'
+        with open(output, 'wb') as file:
+            for chunk in export_notes(author_id, 'ndjson'):
+                file.write(chunk)
+        reader = User.objects.create(username='benchmark-reader')
+        start = time.perf_counter()
+        with open(output, 'rb') as file, \
+                CaptureQueriesContext(connection) as queries:
+            progress = import_notes(reader.pk, file, 'ndjson')
+        elapsed = time.perf_counter() - start
+        batches = -(-options.notes // settings.NOTES_IMPORT_BATCH_SIZE)
+        print(
+            f'Загружено {progress["imported"]} заметок за {elapsed:.1f} с '
+            f'({progress["imported"] / elapsed:.0f} в секунду), '
+            f'изменено slug {progress["renamed"]}'
+        )
+        print(f'Запросов на пачку: {len(queries) / batches:.1f}')
+        assert Note.objects.filter(author=reader).count() == options.notes
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
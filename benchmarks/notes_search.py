@@ -0,0 +1,100 @@
+"""
+Задержка полнотекстового поиска по заметкам.
+
+Наполняет временную базу командой generate_data и сравнивает поиск
+через индекс FTS5 (notes.search) с поиском icontains по заголовку и
+тексту для самого активного пользователя и для обычного. icontains
+не ранжирует результаты: по частому слову он останавливается на
+первых 20 строках, а по редкому читает все заметки пользователя.
+
+Запуск из корня репозитория:
+    python benchmarks/notes_search.py --notes 1000000 --workers 4
+"""
+import argparse
+import random
+import sys
+import time
+
+import harness
+
+
+def timed(func, queries):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        func(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return harness.percentile(latencies, 0.5), harness.percentile(
+        latencies, 0.95
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--notes', type=int, default=200000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    options = parser.parse_args()
+
+    harness.setup_django('ya_note')
+    from django.core.management import call_command
+    from django.db.models import Count, Q
+    from notes.management.commands.generate_data import VOCABULARY, WORDS
+    from notes.models import Note
+    from notes.search import search_notes
+
+    rng = random.Random(options.seed)
+    # Частые слова есть почти в каждой заметке, редкие — в единицах.
+    query_sets = {
+        'частые': [rng.choice(WORDS) for _ in range(options.queries)],
+        'редкие': [
+            rng.choice(VOCABULARY[len(VOCABULARY) // 2:])
+            for _ in range(options.queries)
+        ],
+    }
+    with harness.temporary_database():
+        start = time.perf_counter()
+        call_command(
+            'generate_data', users=options.users, notes=options.notes,
+            seed=options.seed, workers=options.workers, verbosity=0,
+        )
+        print(
+            f'Заметок: {options.notes}, наполнение и индексация '
+            f'{time.perf_counter() - start:.1f} с'
+        )
+        authors = list(Note.objects.values('author').annotate(
+            total=Count('pk')
+        ).order_by('-total'))
+        for label, author in (
+            ('активный', authors[0]),
+            ('обычный', authors[len(authors) // 2]),
+        ):
+            author_id = author['author']
+
+            def icontains(query, author_id=author_id):
+                list(Note.objects.filter(author_id=author_id).filter(
+                    Q(title__icontains=query) | Q(text__icontains=query)
+                ).only('id', 'slug', 'title')[:20])
+
+            for name, func in (
+                ('FTS5', lambda query: search_notes(author_id, query)),
+                ('icontains', icontains),
+            ):
+                for words, queries in query_sets.items():
+                    p50, p95 = timed(func, queries)
+                    print(
+                        f'{label:<9} ({author["total"]:>6} заметок) '
+                        f'{name:<10} {words:<7} p50 {p50:8.2f}  '
+                        f'p95 {p95:8.2f} мс'
+                    )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""
+Сравнение фильтра запрещённых слов с прежним циклом по списку.
+
+Запуск из корня репозитория:
+    python benchmarks/profanity.py --words 5000 --length 20000
+"""
+import argparse
+import random
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'ya_news'))
+
+from news.profanity import WordMatcher  # noqa: E402
+
+ALPHABET = 'абвгдежзийклмнопрстуфхцчшщъыьэюя'
+
+
+def loop_search(words, text):
+    """Прежняя реализация CommentForm.clean_text."""
+    lowered_text = text.lower()
+    for word in words:
+        if word in lowered_text:
+            return word
+    return None
+
+
+def random_word(rng, min_length=5, max_length=12):
+    length = rng.randint(min_length, max_length)
+    return ''.join(rng.choice(ALPHABET) for _ in range(length))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--words', type=int, default=5000)
+    parser.add_argument('--length', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    words = [random_word(rng) for _ in range(args.words)]
+    # Чистый текст — худший случай для обеих реализаций.
+    text = ' '.join(
+        random_word(rng, 2, 4) for _ in range(args.length // 4)
+    )[:args.length]
+
+    build = timeit.timeit(lambda: WordMatcher(words), number=1)
+    matcher = WordMatcher(words)
+    loop = min(timeit.repeat(
+        lambda: loop_search(words, text), number=1, repeat=args.repeat
+    ))
+    automaton = min(timeit.repeat(
+        lambda: matcher.search(text), number=1, repeat=args.repeat
+    ))
+    print(f'слов: {args.words}, длина текста: {len(text)}')
+    print(f'построение автомата: {build * 1000:.1f} мс')
+    print(f'цикл по списку:      {loop * 1000:.2f} мс')
+    print(f'автомат:             {automaton * 1000:.2f} мс')
+    print(f'ускорение:           {loop / automaton:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Скорость slugify: pytils против notes.translit.
+
+Заголовки строятся из словаря generate_data: уникальные проверяют
+таблицу транслитерации, повторяющиеся (по Ципфу) — ещё и кэш. Перед
+замером результаты обеих функций сверяются на всех заголовках.
+
+Запуск из корня репозитория:
+    python benchmarks/slugify.py --titles 1000000
+"""
+import argparse
+import random
+import sys
+import time
+from itertools import accumulate
+
+import harness
+
+
+def timed(func, titles):
+    start = time.perf_counter()
+    for title in titles:
+        func(title)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--titles', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=0)
+    options = parser.parse_args()
+
+    harness.setup_django('ya_note')
+    from pytils.translit import slugify as pytils_slugify
+    from notes.management.commands.generate_data import words
+    from notes.translit import slugify
+
+    rng = random.Random(options.seed)
+    unique = [
+        f'{words(rng, 1, 8).capitalize()} №{index}'
+        for index in range(options.titles)
+    ]
+    popular = [words(rng, 1, 3).capitalize() for _ in range(1000)]
+    repeated = rng.choices(
+        popular, k=options.titles, cum_weights=list(accumulate(
+            1 / rank for rank in range(1, len(popular) + 1)
+        )),
+    )
+    mismatches = sum(
+        slugify.__wrapped__(title) != pytils_slugify(title)
+        for title in unique
+    )
+    print(f'Заголовков: {options.titles}, расхождений с pytils: {mismatches}')
+    for label, titles in (('уникальные', unique), ('повторы', repeated)):
+        slugify.cache_clear()
+        baseline = timed(pytils_slugify, titles)
+        candidate = timed(slugify, titles)
+        print(
+            f'{label:<11} pytils {baseline:6.2f} с  '
+            f'translit {candidate:6.2f} с  '
+            f'ускорение {baseline / candidate:5.1f}x'
+        )
+    return 0 if not mismatches else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
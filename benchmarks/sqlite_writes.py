@@ -0,0 +1,59 @@
+"""
+Параллельные записи в SQLite до и после SQLITE_PRODUCTION_MODE.
+
+Дважды запускает load.py run со сценариями записи — в обычном режиме
+и в производственном — и печатает сравнение. Каждый прогон идёт в
+отдельном процессе со свежей временной базой.
+
+Запуск из корня репозитория:
+    python benchmarks/sqlite_writes.py ya_news --concurrency 32
+"""
+import argparse
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+WRITE_FLOWS = {
+    'ya_news': ('comment_post', 'comment_edit', 'comment_delete'),
+    'ya_note': ('add',),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('project', choices=WRITE_FLOWS)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=500)
+    options = parser.parse_args()
+
+    load = Path(__file__).resolve().parent / 'load.py'
+    with tempfile.TemporaryDirectory() as directory:
+        reports = []
+        for mode, extra in (('обычный', []), ('production', [
+            '--sqlite-production'
+        ])):
+            report = str(Path(directory) / f'{len(reports)}.json')
+            print(f'Режим: {mode}')
+            subprocess.run(
+                [
+                    sys.executable, str(load), 'run', options.project,
+                    '--concurrency', str(options.concurrency),
+                    '--requests', str(options.requests),
+                    '--flows', *WRITE_FLOWS[options.project],
+                    '--output', report, *extra,
+                ],
+                check=True,
+            )
+            reports.append(report)
+        print('Сравнение:')
+        # Код возврата compare сообщает о регрессиях, здесь он не важен.
+        subprocess.run([sys.executable, str(load), 'compare', *reports])
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,178 @@
+"""
+Рендеринг шаблонов с кэширующим загрузчиком и без него.
+
+Наполняет временную базу командой generate_data и запрашивает страницы
+проекта тестовым клиентом, запоминая контекст каждого отрисованного
+шаблона, включая базовые и подключаемые. Затем каждый шаблон проекта
+отрисовывается со своим контекстом двумя движками: без кэша — так
+работает DEBUG без TEMPLATE_PRODUCTION_MODE, шаблон и его предки
+разбираются при каждом рендеринге, — и с загрузчиком
+yacommon.templating.Loader после preload(). Результаты обоих движков
+сверяются.
+
+Запуск из корня репозитория:
+    python benchmarks/templates.py ya_news --renders 500
+"""
+import argparse
+import logging
+import sys
+import time
+
+import harness
+
+LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+
+def news_pages():
+    from django.contrib.auth import get_user_model
+    from django.urls import reverse
+    from news.models import Comment, News
+
+    news = News.objects.order_by('-comments_count').first()
+    comment = Comment.objects.filter(news=news).first()
+    user = get_user_model().objects.get(pk=comment.author_id)
+    return user, [
+        (False, reverse('news:home')),
+        (False, reverse('news:detail', args=(news.pk,))),
+        (True, reverse('news:detail', args=(news.pk,))),
+        (True, reverse('news:edit', args=(comment.pk,))),
+        (True, reverse('news:delete', args=(comment.pk,))),
+        (False, reverse('news:search') + '?q=новость'),
+        (False, reverse('users:login')),
+        (False, reverse('users:signup')),
+    ]
+
+
+def notes_pages():
+    from django.urls import reverse
+    from notes.models import Note
+
+    note = Note.objects.select_related('author').first()
+    return note.author, [
+        (False, reverse('notes:home')),
+        (True, reverse('notes:list')),
+        (True, reverse('notes:detail', args=(note.slug,))),
+        (True, reverse('notes:add')),
+        (True, reverse('notes:edit', args=(note.slug,))),
+        (True, reverse('notes:delete', args=(note.slug,))),
+        (True, reverse('notes:search') + '?q=новость'),
+        (True, reverse('notes:import')),
+        (True, reverse('notes:success')),
+        (False, reverse('users:login')),
+        (False, reverse('users:signup')),
+    ]
+
+
+PROJECTS = {
+    'ya_news': ({'users': 20, 'news': 50, 'comments': 2000}, news_pages),
+    'ya_note': ({'users': 20, 'notes': 2000}, notes_pages),
+}
+
+
+def capture_contexts(user, pages):
+    """Контексты шаблонов проекта со страниц: имя шаблона -> контекст."""
+    from django.test import Client
+    from django.test.signals import template_rendered
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    contexts = {}
+
+    def store(sender, template, context, **kwargs):
+        if template.origin.name.startswith(str(harness.ROOT)):
+            contexts.setdefault(template.name, context.flatten())
+
+    template_rendered.connect(store)
+    anonymous, member = Client(), Client()
+    member.force_login(user)
+    for logged_in, url in pages:
+        client = member if logged_in else anonymous
+        response = client.get(url, HTTP_HOST='localhost')
+        if response.status_code != 200:
+            raise RuntimeError(f'{url}: {response.status_code}')
+    template_rendered.disconnect(store)
+    return contexts
+
+
+def timed(engine, name, context, renders):
+    from django.template import Context
+
+    start = time.perf_counter()
+    for _ in range(renders):
+        engine.get_template(name).render(Context(context))
+    return (time.perf_counter() - start) / renders * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('project', choices=PROJECTS)
+    parser.add_argument('--renders', type=int, default=500)
+    options = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    harness.setup_django(options.project)
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.template import Context
+    from django.template.backends.django import DjangoTemplates
+
+    settings.ALLOWED_HOSTS = ['*']
+    settings.TEMPLATE_PRODUCTION_MODE = True
+    uncached, cached = (
+        # Через бэкенд, чтобы подключились библиотеки тегов приложений.
+        DjangoTemplates({
+            'NAME': name, 'DIRS': settings.TEMPLATES[0]['DIRS'],
+            'APP_DIRS': False, 'OPTIONS': {'loaders': loaders},
+        }).engine
+        for name, loaders in (
+            ('uncached', LOADERS),
+            ('cached', [('yacommon.templating.Loader', LOADERS)]),
+        )
+    )
+    start = time.perf_counter()
+    preloaded = cached.template_loaders[0].preload()
+    print(
+        f'Предзагрузка: {preloaded} шаблонов за '
+        f'{(time.perf_counter() - start) * 1000:.0f} мс'
+    )
+
+    counts, build_pages = PROJECTS[options.project]
+    with harness.temporary_database():
+        call_command('generate_data', verbosity=0, **counts)
+        contexts = capture_contexts(*build_pages())
+        total = {'uncached': 0, 'cached': 0}
+        print(f'{"шаблон":<28} {"без кэша":>10} {"с кэшем":>10}')
+        for name, context in sorted(contexts.items()):
+            html = {
+                engine: engine.get_template(name).render(Context(context))
+                for engine in (uncached, cached)
+            }
+            if html[uncached] != html[cached]:
+                print(f'{name}: HTML различается', file=sys.stderr)
+                return 1
+            results = {
+                'uncached': timed(uncached, name, context, options.renders),
+                'cached': timed(cached, name, context, options.renders),
+            }
+            for key, value in results.items():
+                total[key] += value
+            print(
+                f'{name:<28} {results["uncached"]:8.3f} мс '
+                f'{results["cached"]:7.3f} мс  быстрее в '
+                f'{results["uncached"] / results["cached"]:.1f} раза'
+            )
+        print(
+            f'{"все шаблоны":<28} {total["uncached"]:8.3f} мс '
+            f'{total["cached"]:7.3f} мс'
+        )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
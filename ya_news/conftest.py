@@ -0,0 +1 @@
+pytest_plugins = ('yacommon.query_budget', 'yacommon.isolated_caches')
@@ -10,6 +10,7 @@ class CommentInline(admin.StackedInline):
 
 @admin.register(News)
 class NewsAdmin(admin.ModelAdmin):
+    list_display = ('title', 'date', 'comments_count')
     inlines = [
         CommentInline,
     ]
@@ -0,0 +1,347 @@
+import hashlib
+import re
+import time
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.locmem import LocMemCache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, urlencode
+from django.utils.safestring import mark_safe
+
+from .pagination import get_comments_page
+
+HOME_VERSION_KEY = 'news:home:version'
+SEARCH_VERSION_KEY = 'news:search:version'
+COMMENT_ACTIONS = re.compile(r'<!--comment-actions:(\d+):(\d+)-->')
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+# Размеры записей и счётчик вытеснений хранятся рядом с данными
+# LocMemCache: все экземпляры бэкенда с одним LOCATION работают с
+# общим хранилищем.
+_stats = {}
+_counters = {'hits': 0, 'misses': 0}
+_counters_lock = Lock()
+
+
+class SizedLocMemCache(LocMemCache):
+    """
+    Локальный LRU-кэш с ограничением по суммарному размеру записей.
+
+    Кроме MAX_ENTRIES понимает опцию MAX_SIZE — предельный объём
+    сериализованных значений в байтах. Давно не читавшиеся записи
+    вытесняются по одной, пока новая запись не поместится. Размер
+    каждой записи запоминается при записи, поэтому incr(), который
+    меняет значение в обход _set(), не сбивает учёт.
+    """
+
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        self._max_size = params.get('OPTIONS', {}).get(
+            'MAX_SIZE', DEFAULT_MAX_SIZE
+        )
+        self._stats = _stats.setdefault(
+            name, {'size': 0, 'evictions': 0, 'sizes': {}}
+        )
+
+    @property
+    def size(self):
+        return self._stats['size']
+
+    @property
+    def evictions(self):
+        return self._stats['evictions']
+
+    def _account(self, key, value):
+        """Учитывает новый размер записи key; value None — её удаление."""
+        self._stats['size'] -= self._stats['sizes'].pop(key, 0)
+        if value is not None:
+            self._stats['sizes'][key] = len(value)
+            self._stats['size'] += len(value)
+
+    def _set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        self._delete(key)
+        while self._cache and (
+            len(self._cache) >= self._max_entries
+            or self._stats['size'] + len(value) > self._max_size
+        ):
+            self._delete(next(reversed(self._cache)))
+            self._stats['evictions'] += 1
+        self._cache[key] = value
+        self._cache.move_to_end(key, last=False)
+        self._expire_info[key] = self.get_backend_timeout(timeout)
+        self._account(key, value)
+
+    def _delete(self, key):
+        self._account(key, None)
+        return super()._delete(key)
+
+    def incr(self, key, delta=1, version=None):
+        value = super().incr(key, delta, version)
+        key = self.make_key(key, version)
+        with self._lock:
+            self._account(key, self._cache.get(key))
+        return value
+
+    def clear(self):
+        super().clear()
+        with self._lock:
+            self._stats['size'] = 0
+            self._stats['sizes'].clear()
+
+
+def get_page_cache():
+    return caches[settings.NEWS_PAGE_CACHE]
+
+
+def get_version_cache():
+    return caches[settings.NEWS_VERSION_CACHE]
+
+
+def get_story_version_key(news_id):
+    return f'news:{news_id}:version'
+
+
+def get_version(key):
+    """
+    Текущая версия группы страниц.
+
+    Версия — момент последнего изменения в наносекундах. Если её
+    вытеснили из кэша, создаётся новая, которая не совпадёт ни с одной
+    из прежних, поэтому устаревшие страницы не вернутся. Версии лежат
+    в кэше NEWS_VERSION_CACHE, общем для процессов сервера.
+    """
+    cache = get_version_cache()
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    get_version_cache().set(key, time.time_ns(), None)
+
+
+def invalidate_news_pages(news_id):
+    """
+    Сбрасывает закэшированные страницы новости и главную.
+
+    Кэш поиска сбрасывается отдельно и реже, см. news.signals.
+    """
+    bump_version(get_story_version_key(news_id))
+    bump_version(HOME_VERSION_KEY)
+
+
+def get_comments_fragment(news_id, cursor=None):
+    """
+    HTML страницы комментариев, общий для всех пользователей.
+
+    Ключ включает версию новости, поэтому любое изменение комментариев
+    делает фрагмент недействительным. Вместо ссылок «Редактировать» и
+    «Удалить» во фрагменте стоят метки, их заполняет punch_holes().
+    """
+    cache = get_page_cache()
+    version = get_version(get_story_version_key(news_id))
+    key = f'news:comments:{news_id}:{cursor or ""}:{version}'
+    fragment = cache.get(key)
+    if fragment is None:
+        comments, next_cursor = get_comments_page(news_id, cursor)
+        html = render_to_string('news/comments.html', {
+            'news_id': news_id,
+            'comments': comments,
+            'next_cursor': next_cursor,
+        })
+        fragment = (html, next_cursor)
+        cache.set(key, fragment)
+    return fragment
+
+
+def punch_holes(html, user):
+    """Подставляет во фрагмент ссылки действий для комментариев user."""
+    def actions(match):
+        comment_pk, author_id = match.groups()
+        if int(author_id) != user.pk:
+            return ''
+        return render_to_string(
+            'news/comment_actions.html', {'comment_pk': comment_pk}
+        )
+
+    return mark_safe(COMMENT_ACTIONS.sub(actions, html))
+
+
+def count(counter):
+    with _counters_lock:
+        _counters[counter] += 1
+
+
+def get_stats():
+    cache = get_page_cache()
+    with _counters_lock:
+        stats = dict(_counters)
+    stats['evictions'] = getattr(cache, 'evictions', None)
+    stats['size'] = getattr(cache, 'size', None)
+    return stats
+
+
+def reset_stats():
+    with _counters_lock:
+        for counter in _counters:
+            _counters[counter] = 0
+
+
+def get_page_key(request, version_key, params=()):
+    """
+    Ключ страницы: путь, параметры из params и версия группы страниц.
+
+    Остальные параметры на страницу не влияют и в ключ не входят:
+    иначе произвольные строки запроса заполнили бы кэш копиями одной
+    страницы.
+    """
+    query = urlencode([
+        (name, request.GET[name]) for name in params if name in request.GET
+    ])
+    path_hash = hashlib.md5(f'{request.path}?{query}'.encode()).hexdigest()
+    return f'news:page:{path_hash}:{get_version(version_key)}'
+
+
+def get_cached_page(key):
+    """Готовый ответ из кэша страниц или None."""
+    cached = get_page_cache().get(key)
+    if cached is None:
+        return None
+    count('hits')
+    content, content_type = cached
+    return HttpResponse(content, content_type=content_type)
+
+
+class AnonymousPageCacheMixin:
+    """
+    Отдаёт анонимным читателям готовую страницу из кэша.
+
+    Ключ страницы включает путь, параметры из cache_params и версию
+    группы страниц из get_version_key(). При попадании в кэш ORM не
+    используется.
+    """
+    cache_params = ()
+
+    def get_version_key(self):
+        raise NotImplementedError
+
+    def get_cache_timeout(self):
+        return DEFAULT_TIMEOUT
+
+    def dispatch(self, request, *args, **kwargs):
+        if (
+            request.method not in ('GET', 'HEAD')
+            or request.user.is_authenticated
+        ):
+            return super().dispatch(request, *args, **kwargs)
+        key = get_page_key(
+            request, self.get_version_key(), self.cache_params
+        )
+        cached = get_cached_page(key)
+        if cached is not None:
+            return cached
+        count('misses')
+        response = super().dispatch(request, *args, **kwargs)
+
+        def store(response):
+            if response.status_code == 200:
+                get_page_cache().set(
+                    key, (response.content, response['Content-Type']),
+                    self.get_cache_timeout(),
+                )
+
+        if callable(getattr(response, 'render', None)):
+            response.add_post_render_callback(store)
+        else:
+            store(response)
+        return response
+
+
+def get_page_etag(request, version):
+    """
+    Значение ETag без рендеринга: путь с параметрами и версия группы.
+
+    Страница пользователя отличается ссылками действий и формой с
+    токеном CSRF, поэтому в его ETag входят id и секрет CSRF.
+    """
+    parts = [request.get_full_path(), str(version)]
+    if request.user.is_authenticated:
+        parts += [str(request.user.pk), request.META.get('CSRF_COOKIE', '')]
+    return '"%s"' % hashlib.md5(':'.join(parts).encode()).hexdigest()
+
+
+def get_last_modified(request, version):
+    """
+    Время изменения страницы в секундах или None.
+
+    Отдаётся только анонимам: страницу пользователя проверяет ETag.
+    Версия текущей секунды не отдаётся — изменение в ту же секунду
+    клиент по Last-Modified бы не заметил.
+    """
+    modified = version // 10 ** 9
+    if request.user.is_authenticated or modified >= int(time.time()):
+        return None
+    return modified
+
+
+def set_validators(request, response, version):
+    response['ETag'] = get_page_etag(request, version)
+    last_modified = get_last_modified(request, version)
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def get_not_modified(request, version):
+    """Ответ 304, если у клиента актуальная страница, иначе None."""
+    response = get_conditional_response(
+        request,
+        etag=get_page_etag(request, version),
+        last_modified=get_last_modified(request, version),
+    )
+    if response is None:
+        return None
+    return set_validators(request, response, version)
+
+
+class ConditionalPageMixin:
+    """
+    Отвечает 304 на повторный запрос неизменившейся страницы.
+
+    ETag и Last-Modified строятся по версии группы страниц из
+    get_version_key() до работы view и шаблона, так что ответ 304 не
+    стоит ни рендеринга, ни запросов к базе. Mixin ставится перед
+    AnonymousPageCacheMixin: страница из кэша тоже получает валидаторы.
+    """
+
+    def get_version_key(self):
+        raise NotImplementedError
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        # Версия читается до страницы: изменение во время рендеринга
+        # даст следующему запросу новую страницу, а не старую.
+        version = get_version(self.get_version_key())
+        not_modified = get_not_modified(request, version)
+        if not_modified is not None:
+            return not_modified
+        response = super().dispatch(request, *args, **kwargs)
+
+        def validate(response):
+            # Секрет CSRF может появиться только при рендеринге формы.
+            if response.status_code == 200:
+                set_validators(request, response, version)
+
+        if callable(getattr(response, 'render', None)):
+            response.add_post_render_callback(validate)
+        else:
+            validate(response)
+        return response
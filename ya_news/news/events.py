@@ -0,0 +1,144 @@
+"""
+События комментариев для живой ленты.
+
+Изменения комментариев после фиксации транзакции публикуются в брокер,
+а news.live раздаёт их открытым потокам SSE. Брокер по умолчанию
+работает в пределах процесса; для нескольких процессов его заменяет
+класс с тем же интерфейсом из настройки NEWS_EVENTS_BROKER.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils.module_loading import import_string
+
+CREATED = 'created'
+UPDATED = 'updated'
+DELETED = 'deleted'
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+class Subscription:
+    """
+    Очередь событий одного потока SSE.
+
+    Очередь ограничена: если читатель не успевает забирать события,
+    подписка помечается переполненной и поток закрывается, а не копит
+    события в памяти без конца.
+    """
+
+    def __init__(self, channel, loop, queue_size):
+        self.channel = channel
+        self.loop = loop
+        self.queue = asyncio.Queue(queue_size)
+        self.overflowed = False
+
+    def put(self, message):
+        """Кладёт событие в очередь; вызывается в цикле событий."""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            # Пустое сообщение будит читателя, чтобы он закрыл поток.
+            self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    async def get(self):
+        """Следующее событие или None, если подписка переполнилась."""
+        message = await self.queue.get()
+        return None if self.overflowed else message
+
+
+class LocalBroker:
+    """
+    Брокер событий в пределах процесса.
+
+    Заменяет межпроцессный брокер (pub/sub Redis и т. п.) с тем же
+    интерфейсом: publish() вызывается из любого потока, subscribe()
+    и unsubscribe() — в цикле событий потока SSE.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, channel, queue_size):
+        subscription = Subscription(
+            channel, asyncio.get_running_loop(), queue_size
+        )
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions[subscription.channel]
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.channel]
+
+    def has_subscribers(self, channel):
+        return channel in self._subscriptions
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(
+                    subscription.put, message
+                )
+            except RuntimeError:
+                # Цикл событий уже закрыт, поток SSE завершается сам.
+                pass
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(settings.NEWS_EVENTS_BROKER)()
+        return _broker
+
+
+def get_channel(news_id):
+    return f'news:{news_id}:comments'
+
+
+def publish_comment(event, comment, comment_id):
+    """
+    Публикует событие комментария после фиксации транзакции.
+
+    comment_id передаётся отдельно: у удалённого комментария pk к этому
+    моменту уже сброшен.
+
+    HTML комментария отрисовывается один раз при публикации; ссылки
+    действий для автора подставляет каждый поток SSE. По author_id
+    поток узнаёт, нужны ли они его читателю, не разбирая HTML.
+    """
+    channel = get_channel(comment.news_id)
+    broker = get_broker()
+    if not broker.has_subscribers(channel):
+        return
+    message = {'event': event, 'id': comment_id}
+    if event != DELETED:
+        message['author_id'] = comment.author_id
+        message['html'] = render_to_string(
+            'news/comment.html', {'comment': comment}
+        )
+    broker.publish(channel, json.dumps(message, ensure_ascii=False))
+
+
+def publish_on_commit(event, comment):
+    transaction.on_commit(
+        partial(publish_comment, event, comment, comment.pk)
+    )
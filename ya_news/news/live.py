@@ -0,0 +1,172 @@
+"""
+Поток SSE с событиями комментариев новости.
+
+Работает только под ASGI: yanews.asgi ставит LiveComments перед
+Django. Открытый поток держит одну подписку на брокер news.events и не
+занимает поток ОС. Под WSGI тот же адрес отвечает 204, и браузер не
+переподключается.
+"""
+import asyncio
+import json
+from importlib import import_module
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import auth
+from django.db import close_old_connections
+from django.http.cookie import parse_cookie
+from django.urls import Resolver404, resolve
+
+from .cache import punch_holes
+from .events import get_broker, get_channel
+from .models import News
+
+EVENTS_URL_NAME = 'news:events'
+STREAM_HEADERS = [
+    (b'content-type', b'text/event-stream; charset=utf-8'),
+    (b'cache-control', b'no-cache'),
+    # Прокси не должен копить события в буфере.
+    (b'x-accel-buffering', b'no'),
+]
+
+
+def get_user(scope, news_id):
+    """
+    Пользователь по cookie сессии или None, если новости нет.
+
+    Выполняется в потоке: сессия и пользователь читаются из базы.
+    """
+    try:
+        if not News.objects.filter(pk=news_id).exists():
+            return None
+        cookies = parse_cookie(
+            dict(scope['headers']).get(b'cookie', b'').decode('latin-1')
+        )
+        engine = import_module(settings.SESSION_ENGINE)
+        session = engine.SessionStore(
+            cookies.get(settings.SESSION_COOKIE_NAME)
+        )
+        return auth.get_user(SimpleNamespace(session=session))
+    finally:
+        close_old_connections()
+
+
+def format_event(event, data):
+    return f'event: {event}\ndata: {data}\n\n'.encode()
+
+
+async def wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+class LiveComments:
+    """
+    ASGI-приложение: события комментариев новости в виде SSE.
+
+    Остальные запросы передаются приложению Django. Число открытых
+    потоков на процесс ограничено NEWS_EVENTS_MAX_CONNECTIONS, сверх
+    него клиент получает 503. Раз в NEWS_EVENTS_HEARTBEAT секунд поток
+    отправляет комментарий-пинг, чтобы прокси не закрыл соединение.
+    """
+
+    def __init__(self, application):
+        self.application = application
+        self.connections = 0
+
+    async def __call__(self, scope, receive, send):
+        news_id = self.match(scope)
+        if news_id is None:
+            return await self.application(scope, receive, send)
+        if self.connections >= settings.NEWS_EVENTS_MAX_CONNECTIONS:
+            return await self.respond(send, 503, [(b'retry-after', b'10')])
+        self.connections += 1
+        try:
+            await self.stream(scope, receive, send, news_id)
+        finally:
+            self.connections -= 1
+
+    def match(self, scope):
+        if scope['type'] != 'http' or not scope['path'].endswith('/events/'):
+            return None
+        try:
+            match = resolve(scope['path'])
+        except Resolver404:
+            return None
+        if match.view_name != EVENTS_URL_NAME:
+            return None
+        return match.kwargs['pk']
+
+    async def respond(self, send, status, headers=()):
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': list(headers),
+        })
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def stream(self, scope, receive, send, news_id):
+        user = await sync_to_async(get_user)(scope, news_id)
+        if user is None:
+            return await self.respond(send, 404)
+        broker = get_broker()
+        subscription = broker.subscribe(
+            get_channel(news_id), settings.NEWS_EVENTS_QUEUE_SIZE
+        )
+        disconnected = asyncio.ensure_future(wait_disconnect(receive))
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': STREAM_HEADERS,
+            })
+            await self.send_chunk(send, b'retry: 5000\n\n')
+            while True:
+                message = asyncio.ensure_future(subscription.get())
+                done, _ = await asyncio.wait(
+                    (message, disconnected),
+                    timeout=settings.NEWS_EVENTS_HEARTBEAT,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if disconnected in done:
+                    message.cancel()
+                    return
+                if not done:
+                    message.cancel()
+                    await self.send_chunk(send, b': ping\n\n')
+                    continue
+                if message.result() is None:
+                    # Читатель отстал: страница должна перечитать
+                    # комментарии целиком.
+                    await self.send_chunk(send, format_event('reset', '{}'))
+                    break
+                await self.send_chunk(
+                    send, await self.personalize(message.result(), user)
+                )
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            broker.unsubscribe(subscription)
+            disconnected.cancel()
+
+    async def send_chunk(self, send, body):
+        await send({
+            'type': 'http.response.body', 'body': body, 'more_body': True,
+        })
+
+    async def personalize(self, message, user):
+        """Событие со ссылками действий для комментариев пользователя."""
+        data = json.loads(message)
+        author_id = data.pop('author_id', None)
+        if 'html' in data:
+            if user.pk is not None and user.pk == author_id:
+                # Ссылки автора рендерятся шаблоном — это работа потока.
+                data['html'] = await sync_to_async(punch_holes)(
+                    data['html'], user
+                )
+            else:
+                # Чужой комментарий: метка просто убирается, без шаблона.
+                data['html'] = punch_holes(data['html'], user)
+        return format_event(
+            data.pop('event'), json.dumps(data, ensure_ascii=False)
+        )
@@ -0,0 +1,180 @@
+import time
+from datetime import timedelta
+from itertools import accumulate
+from multiprocessing import Pool
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from news.models import Comment, News
+from news.rendering import make_excerpt, render_comment_text
+from news.search import optimize_index
+from yacommon.generation import build_vocabulary, chunk_random, chunks
+
+WORDS = (
+    'новость', 'город', 'выборы', 'погода', 'москва', 'дорога', 'школа',
+    'больница', 'футбол', 'концерт', 'театр', 'выставка', 'мэрия',
+    'депутат', 'закон', 'налог', 'цена', 'рубль', 'бюджет', 'завод',
+    'поезд', 'самолёт', 'метро', 'парк', 'река', 'снег', 'жара', 'ремонт',
+    'строительство', 'открытие', 'решение', 'проект', 'жители', 'район',
+    'улица', 'праздник', 'фестиваль', 'учёные', 'исследование', 'врачи',
+    'пожар', 'авария', 'суд', 'полиция', 'спорт', 'чемпионат', 'победа',
+    'новый', 'большой', 'важный', 'последний', 'главный', 'городской',
+    'сегодня', 'вчера', 'завтра', 'снова', 'впервые', 'наконец', 'очень',
+)
+VOCABULARY, VOCABULARY_WEIGHTS = build_vocabulary(WORDS)
+
+_news_ids = None
+_user_ids = None
+_cum_weights = None
+
+
+def words(rng, min_count, max_count):
+    return ' '.join(rng.choices(
+        VOCABULARY, cum_weights=VOCABULARY_WEIGHTS,
+        k=rng.randint(min_count, max_count),
+    ))
+
+
+def init_worker(news_ids, user_ids, skew):
+    """
+    Готовит процесс к генерации комментариев.
+
+    Вес новости убывает как 1 / rank ** skew: несколько новостей
+    собирают большую часть комментариев, как на живом сайте.
+    """
+    global _news_ids, _user_ids, _cum_weights
+    _news_ids = news_ids
+    _user_ids = user_ids
+    _cum_weights = list(accumulate(
+        1 / (rank ** skew) for rank in range(1, len(news_ids) + 1)
+    ))
+
+
+def build_comments(task):
+    seed, index, size = task
+    rng = chunk_random(seed, 'comments', index)
+    comments = [
+        (news_id, rng.choice(_user_ids), words(rng, 3, 80))
+        for news_id in rng.choices(_news_ids, cum_weights=_cum_weights,
+                                   k=size)
+    ]
+    return [
+        (news_id, author_id, text, render_comment_text(text))
+        for news_id, author_id, text in comments
+    ]
+
+
+def build_news(rng, today):
+    title = words(rng, 2, 6).capitalize()[:50]
+    text = words(rng, 50, 600).capitalize()
+    return News(
+        title=title,
+        text=text,
+        excerpt=make_excerpt(text),
+        date=today - timedelta(days=rng.randint(0, 365)),
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует пользователей, новости и комментарии для нагрузочного '
+        'тестирования. При одинаковом --seed данные совпадают.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--news', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=1000000)
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Показатель распределения Ципфа для комментариев.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--prefix', default='user-',
+            help='Префикс имён пользователей.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Строк в одной пачке bulk_create и транзакции.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Процессов для генерации комментариев.',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        user_ids = self.create_users(options)
+        news_ids = self.create_news(options)
+        self.create_comments(options, news_ids, user_ids)
+        call_command(
+            'recount_comments',
+            batch_size=options['batch_size'],
+            verbosity=0,
+        )
+        optimize_index()
+        if options['verbosity']:
+            self.stdout.write(
+                f'Создано: пользователей {len(user_ids)}, новостей '
+                f'{len(news_ids)}, комментариев {options["comments"]} '
+                f'за {time.monotonic() - started:.1f} с'
+            )
+
+    def create_users(self, options):
+        user_model = get_user_model()
+        prefix = options['prefix']
+        for _, start, size in chunks(options['users'], options['batch_size']):
+            with transaction.atomic():
+                user_model.objects.bulk_create(
+                    user_model(username=f'{prefix}{number}', password='!')
+                    for number in range(start, start + size)
+                )
+        return list(user_model.objects.filter(
+            username__startswith=prefix
+        ).order_by('pk').values_list('pk', flat=True))
+
+    def create_news(self, options):
+        today = timezone.localdate()
+        first_pk = News.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+        for index, _, size in chunks(options['news'], options['batch_size']):
+            rng = chunk_random(options['seed'], 'news', index)
+            with transaction.atomic():
+                News.objects.bulk_create(
+                    build_news(rng, today) for _ in range(size)
+                )
+        return list(News.objects.filter(pk__gt=first_pk).order_by(
+            'pk'
+        ).values_list('pk', flat=True))
+
+    def create_comments(self, options, news_ids, user_ids):
+        tasks = [
+            (options['seed'], index, size)
+            for index, _, size in chunks(
+                options['comments'], options['batch_size']
+            )
+        ]
+        initargs = (news_ids, user_ids, options['skew'])
+        if options['workers'] > 1:
+            with Pool(options['workers'], init_worker, initargs) as pool:
+                self.insert_comments(pool.imap(build_comments, tasks))
+        else:
+            init_worker(*initargs)
+            self.insert_comments(map(build_comments, tasks))
+
+    def insert_comments(self, batches):
+        for batch in batches:
+            with transaction.atomic():
+                Comment.objects.bulk_create(
+                    Comment(
+                        news_id=news_id, author_id=author_id, text=text,
+                        text_html=text_html,
+                    )
+                    for news_id, author_id, text, text_html in batch
+                )
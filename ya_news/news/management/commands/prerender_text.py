@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from news.cache import (
+    bump_version, get_story_version_key, invalidate_news_pages
+)
+from news.models import Comment, News
+from news.rendering import make_excerpt, render_comment_text
+
+# Модель, исходное поле, поле с результатом и функция, которая его считает.
+FIELDS = (
+    (News, 'text', 'excerpt', make_excerpt),
+    (Comment, 'text', 'text_html', render_comment_text),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет анонсы новостей и HTML комментариев пачками. '
+        'Пересчитывает все строки, поэтому нужен и после смены правил '
+        'подготовки текста.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Сколько строк пересчитывать в одной транзакции.',
+        )
+
+    def handle(self, *args, batch_size, verbosity, **options):
+        for model, source, target, prepare in FIELDS:
+            updated = self.prerender(
+                model, source, target, prepare, batch_size
+            )
+            if verbosity:
+                self.stdout.write(
+                    f'{model._meta.db_table}.{target}: обновлено {updated}'
+                )
+
+    def prerender(self, model, source, target, prepare, batch_size):
+        """
+        Пересчитывает поле диапазонами id и записывает только изменения.
+
+        Страницы новостей с изменёнными строками сбрасываются из кэша.
+        """
+        updated = 0
+        last_pk = 0
+        news_field = 'pk' if model is News else 'news_id'
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    model.objects.filter(pk__gt=last_pk).order_by('pk').only(
+                        'pk', news_field, source, target
+                    )[:batch_size]
+                )
+                if not batch:
+                    return updated
+                drifted = []
+                for row in batch:
+                    prepared = prepare(getattr(row, source))
+                    if getattr(row, target) != prepared:
+                        setattr(row, target, prepared)
+                        drifted.append(row)
+                model.objects.bulk_update(drifted, [target])
+            for news_id in {getattr(row, news_field) for row in drifted}:
+                if model is News:
+                    invalidate_news_pages(news_id)
+                else:
+                    bump_version(get_story_version_key(news_id))
+            updated += len(drifted)
+            last_pk = batch[-1].pk
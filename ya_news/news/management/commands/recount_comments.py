@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from news.models import Comment, News
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики комментариев у новостей пачками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько новостей пересчитывать в одной транзакции.',
+        )
+
+    def handle(self, *args, batch_size, verbosity, **options):
+        repaired = 0
+        last_pk = 0
+        while True:
+            with transaction.atomic():
+                batch = dict(
+                    News.objects.filter(pk__gt=last_pk).order_by(
+                        'pk'
+                    ).values_list('pk', 'comments_count')[:batch_size]
+                )
+                if not batch:
+                    break
+                actual = dict(
+                    Comment.objects.filter(news_id__in=batch).order_by(
+                    ).values_list('news_id').annotate(Count('pk'))
+                )
+                drifted = [
+                    News(pk=pk, comments_count=actual.get(pk, 0))
+                    for pk, stored in batch.items()
+                    if stored != actual.get(pk, 0)
+                ]
+                News.objects.bulk_update(drifted, ['comments_count'])
+            repaired += len(drifted)
+            last_pk = max(batch)
+        if verbosity:
+            self.stdout.write(f'Исправлено счётчиков: {repaired}')
@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from news.cache import SEARCH_VERSION_KEY, bump_version
+from news.models import Comment, News
+from news.search import optimize_index
+
+# Индекс, индексируемая модель и колонки индекса в порядке вставки.
+INDEXES = (
+    ('news_news_fts', News, ('title', 'text')),
+    ('news_comment_fts', Comment, ('text', 'news_id')),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Перестраивает поисковые индексы новостей и комментариев пачками. '
+        'Запускать при остановленной записи: правки строк, ещё не '
+        'попавших в новый индекс, его испортят.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=20000,
+            help='Сколько строк индексировать в одной транзакции.',
+        )
+
+    def handle(self, *args, batch_size, verbosity, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Поисковые индексы есть только в SQLite.')
+        for table, model, columns in INDEXES:
+            indexed = self.reindex(table, model, columns, batch_size)
+            if verbosity:
+                self.stdout.write(f'{table}: проиндексировано {indexed}')
+        optimize_index()
+        bump_version(SEARCH_VERSION_KEY)
+
+    def reindex(self, table, model, columns, batch_size):
+        """
+        Очищает индекс и заполняет его заново диапазонами id.
+
+        Каждая пачка — отдельная короткая транзакция, поэтому
+        блокировка записи не держится всё время перестройки.
+        """
+        names = ', '.join(columns)
+        insert = (
+            f'INSERT INTO {table}(rowid, {names}) '
+            f'SELECT id, {names} FROM {model._meta.db_table} '
+            'WHERE id > %s AND id <= %s'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table}({table}) VALUES ('delete-all')"
+            )
+        ids = model.objects.order_by('pk').values_list('pk', flat=True)
+        last_pk = 0
+        indexed = 0
+        while True:
+            batch = list(ids.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                return indexed
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(insert, (last_pk, batch[-1]))
+            indexed += len(batch)
+            last_pk = batch[-1]
@@ -0,0 +1,78 @@
+from django.db import migrations
+
+# Индексы FTS5 с внешним содержимым: тексты хранятся только в таблицах
+# news_news и news_comment, а триггеры обновляют индексы при любой
+# записи, включая bulk_create и каскадное удаление. news_id в индексе
+# комментариев не индексируется и читается из news_comment по rowid.
+# Миграции, пересоздающие эти таблицы на SQLite, удаляют триггеры —
+# после них нужно повторить CREATE_TRIGGERS и команду reindex_search.
+CREATE_INDEX = (
+    "CREATE VIRTUAL TABLE news_news_fts USING fts5("
+    "title, text, content='news_news', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE VIRTUAL TABLE news_comment_fts USING fts5("
+    "text, news_id UNINDEXED, content='news_comment', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+)
+CREATE_TRIGGERS = (
+    "CREATE TRIGGER news_news_fts_insert AFTER INSERT ON news_news BEGIN "
+    "INSERT INTO news_news_fts(rowid, title, text) "
+    "VALUES (new.id, new.title, new.text); END",
+    "CREATE TRIGGER news_news_fts_delete AFTER DELETE ON news_news BEGIN "
+    "INSERT INTO news_news_fts(news_news_fts, rowid, title, text) "
+    "VALUES ('delete', old.id, old.title, old.text); END",
+    "CREATE TRIGGER news_news_fts_update "
+    "AFTER UPDATE OF title, text ON news_news BEGIN "
+    "INSERT INTO news_news_fts(news_news_fts, rowid, title, text) "
+    "VALUES ('delete', old.id, old.title, old.text); "
+    "INSERT INTO news_news_fts(rowid, title, text) "
+    "VALUES (new.id, new.title, new.text); END",
+    "CREATE TRIGGER news_comment_fts_insert AFTER INSERT ON news_comment "
+    "BEGIN INSERT INTO news_comment_fts(rowid, text, news_id) "
+    "VALUES (new.id, new.text, new.news_id); END",
+    "CREATE TRIGGER news_comment_fts_delete AFTER DELETE ON news_comment "
+    "BEGIN INSERT INTO news_comment_fts(news_comment_fts, rowid, text, "
+    "news_id) VALUES ('delete', old.id, old.text, old.news_id); END",
+    "CREATE TRIGGER news_comment_fts_update "
+    "AFTER UPDATE OF text ON news_comment BEGIN "
+    "INSERT INTO news_comment_fts(news_comment_fts, rowid, text, news_id) "
+    "VALUES ('delete', old.id, old.text, old.news_id); "
+    "INSERT INTO news_comment_fts(rowid, text, news_id) "
+    "VALUES (new.id, new.text, new.news_id); END",
+)
+REBUILD = (
+    "INSERT INTO news_news_fts(news_news_fts) VALUES ('rebuild')",
+    "INSERT INTO news_comment_fts(news_comment_fts) VALUES ('rebuild')",
+)
+DROP = (
+    'DROP TRIGGER IF EXISTS news_news_fts_insert',
+    'DROP TRIGGER IF EXISTS news_news_fts_delete',
+    'DROP TRIGGER IF EXISTS news_news_fts_update',
+    'DROP TRIGGER IF EXISTS news_comment_fts_insert',
+    'DROP TRIGGER IF EXISTS news_comment_fts_delete',
+    'DROP TRIGGER IF EXISTS news_comment_fts_update',
+    'DROP TABLE IF EXISTS news_news_fts',
+    'DROP TABLE IF EXISTS news_comment_fts',
+)
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0003_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run(CREATE_INDEX + CREATE_TRIGGERS + REBUILD), run(DROP)
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.15 on 2026-10-18 20:46
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+# AddField на SQLite пересоздаёт таблицы и удаляет триггеры поисковых
+# индексов из 0004_search. id и тексты при этом не меняются, поэтому
+# индексы остаются верными — достаточно вернуть триггеры, в обе стороны.
+search = import_module('news.migrations.0004_search')
+create_triggers = search.run(search.CREATE_TRIGGERS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0004_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, create_triggers),
+        migrations.AddField(
+            model_name='comment',
+            name='text_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='news',
+            name='excerpt',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(create_triggers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+from news.rendering import make_excerpt, render_comment_text
+
+# Строки, созданные до 0005_prerendered_text, получают анонс и HTML
+# комментария здесь: шаблоны читают только подготовленные поля. Позже
+# те же поля пересчитывает команда prerender_text.
+FIELDS = (
+    ('News', 'text', 'excerpt', make_excerpt),
+    ('Comment', 'text', 'text_html', render_comment_text),
+)
+BATCH_SIZE = 2000
+
+
+def backfill(apps, schema_editor):
+    """Заполняет пустые поля пачками по id, обновляя только их."""
+    for model_name, source, target, prepare in FIELDS:
+        model = apps.get_model('news', model_name)
+        rows = model.objects.filter(**{target: ''}).order_by('pk').only(
+            'pk', source, target
+        )
+        last_pk = 0
+        while True:
+            batch = list(rows.filter(pk__gt=last_pk)[:BATCH_SIZE])
+            if not batch:
+                break
+            for row in batch:
+                setattr(row, target, prepare(getattr(row, source)))
+            model.objects.bulk_update(batch, [target])
+            last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0005_prerendered_text'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -1,37 +1,88 @@
 from datetime import datetime
 
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+
+
+def add_update_field(kwargs, source, derived):
+    """Сохранение source через update_fields сохраняет и derived."""
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and source in update_fields:
+        kwargs['update_fields'] = (*update_fields, derived)
 
 
 class News(models.Model):
     title = models.CharField(max_length=50)
     text = models.TextField()
     date = models.DateField(default=datetime.today)
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+    excerpt = models.TextField(blank=True, editable=False)
 
     class Meta:
         ordering = ('-date',)
+        indexes = (
+            models.Index(fields=('-date',), name='news_date_idx'),
+        )
         verbose_name_plural = 'Новости'
         verbose_name = 'Новость'
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        """
+        Сохранение текста через update_fields сохраняет и анонс.
+
+        Сам анонс считает обработчик pre_save из news.signals: он
+        срабатывает и для loaddata, которая save() не вызывает.
+        """
+        add_update_field(kwargs, 'text', 'excerpt')
+        return super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     news = models.ForeignKey(
         News,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        # Отдельный индекс не нужен: news стоит первым в составном.
+        db_index=False,
     )
     author = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
     text = models.TextField()
+    text_html = models.TextField(blank=True, editable=False)
     created = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ('created',)
+        indexes = (
+            # Страницы комментариев новости: фильтр по news и ключ
+            # пагинации (created, id) без сортировки в памяти.
+            models.Index(
+                fields=('news', 'created', 'id'),
+                name='comment_news_created_idx',
+            ),
+        )
 
     def __str__(self):
         return self.text[:50]
+
+    def save(self, *args, **kwargs):
+        """
+        Новый комментарий увеличивает счётчик новости в той же транзакции.
+
+        Уменьшение счётчика при удалении выполняет обработчик post_delete
+        из news.signals: так учитываются и каскадные удаления. HTML текста
+        для шаблонов считает обработчик pre_save оттуда же.
+        """
+        add_update_field(kwargs, 'text', 'text_html')
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            News.objects.filter(pk=self.news_id).update(
+                comments_count=F('comments_count') + 1
+            )
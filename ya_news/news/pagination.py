@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import Http404
+
+from .models import Comment
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+# Наибольшее значение BigAutoField: больший id не влезет в INTEGER базы.
+MAX_ID = 2 ** 63 - 1
+
+
+def encode_cursor(comment):
+    """Курсор — время создания в микросекундах и id комментария."""
+    return f'{(comment.created - EPOCH) // MICROSECOND}_{comment.pk}'
+
+
+def decode_cursor(cursor):
+    """
+    Время и id из курсора.
+
+    Курсор приходит из адреса, поэтому проверяется и диапазон: id вне
+    BigAutoField уронил бы запрос с OverflowError.
+    """
+    try:
+        created, pk = cursor.split('_')
+        created, pk = EPOCH + int(created) * MICROSECOND, int(pk)
+    except (ValueError, OverflowError):
+        raise Http404('Некорректный курсор комментариев')
+    if not 0 <= pk <= MAX_ID:
+        raise Http404('Некорректный курсор комментариев')
+    return created, pk
+
+
+def get_comments_page(news_id, cursor=None):
+    """
+    Возвращает страницу комментариев после курсора и курсор следующей.
+
+    Страница выбирается по ключу (created, id), а не через OFFSET,
+    поэтому любая страница стоит столько же, сколько первая.
+    """
+    size = settings.COMMENTS_COUNT_ON_DETAIL_PAGE
+    comments = Comment.objects.filter(news_id=news_id).select_related(
+        'author'
+    ).order_by('created', 'pk')
+    if cursor:
+        created, pk = decode_cursor(cursor)
+        comments = comments.filter(
+            Q(created__gt=created) | Q(created=created, pk__gt=pk)
+        )
+    page = list(comments[:size + 1])
+    if len(page) > size:
+        return page[:size], encode_cursor(page[size - 1])
+    return page, None
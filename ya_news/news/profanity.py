@@ -0,0 +1,122 @@
+import os
+from collections import deque
+from threading import Lock
+
+from django.conf import settings
+
+# Латинские буквы и цифры, похожие на кириллицу, которыми обходят фильтр.
+SUBSTITUTIONS = str.maketrans({
+    'a': 'а', 'b': 'в', 'c': 'с', 'e': 'е', 'h': 'н', 'k': 'к',
+    'm': 'м', 'o': 'о', 'p': 'р', 't': 'т', 'x': 'х', 'y': 'у',
+    '0': 'о', '3': 'з', '6': 'б', '@': 'а', 'ё': 'е',
+})
+
+
+def normalize(text):
+    """Приводит регистр и заменяет похожие символы кириллицей."""
+    return text.casefold().translate(SUBSTITUTIONS)
+
+
+class WordMatcher:
+    """
+    Автомат Ахо — Корасик для списка слов.
+
+    Строится один раз и находит вхождения любых слов за один проход
+    по тексту, независимо от длины списка.
+    """
+
+    def __init__(self, words):
+        self._goto = [{}]
+        self._output = [None]
+        for word in words:
+            self._add(normalize(word))
+        self._fail = [0] * len(self._goto)
+        self._build_links()
+
+    def _add(self, word):
+        if not word:
+            return
+        state = 0
+        for char in word:
+            if char not in self._goto[state]:
+                self._goto.append({})
+                self._output.append(None)
+                self._goto[state][char] = len(self._goto) - 1
+            state = self._goto[state][char]
+        self._output[state] = word
+
+    def _build_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                if self._output[child] is None:
+                    self._output[child] = self._output[self._fail[child]]
+
+    def search(self, text):
+        """Первое найденное слово или None."""
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for char in normalize(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state] is not None:
+                return output[state]
+        return None
+
+
+def load_words(path):
+    """Читает слова из файла: по одному на строку, # — комментарий."""
+    with open(path, encoding='utf-8') as file:
+        return [
+            line.strip() for line in file
+            if line.strip() and not line.lstrip().startswith('#')
+        ]
+
+
+class BadWordsFilter:
+    """
+    Фильтр запрещённых слов с перезагрузкой без перезапуска.
+
+    Базовые слова дополняются файлом из NEWS_BAD_WORDS_FILE: автомат
+    перестраивается, как только у файла меняется время изменения.
+    """
+
+    def __init__(self, words):
+        self._words = tuple(words)
+        self._file_words = ()
+        self._source = None
+        self._lock = Lock()
+        self._rebuild()
+
+    def _rebuild(self):
+        self._matcher = WordMatcher(self._words + self._file_words)
+
+    def _file_source(self):
+        path = settings.NEWS_BAD_WORDS_FILE
+        if not path:
+            return None
+        try:
+            return path, os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def get_matcher(self):
+        source = self._file_source()
+        if source != self._source:
+            with self._lock:
+                self._file_words = (
+                    tuple(load_words(source[0])) if source else ()
+                )
+                self._source = source
+                self._rebuild()
+        return self._matcher
+
+    def search(self, text):
+        return self.get_matcher().search(text)
@@ -1,12 +1,44 @@
 from datetime import datetime, timedelta
+from importlib import reload
+from io import StringIO
 
 import pytest
 from django.conf import settings
-from django.urls import reverse
+from django.core.management import call_command
+from django.urls import clear_url_caches, reverse
 
+from news import urls as news_urls
+from news.cache import get_page_cache, get_version_cache, reset_stats
 from news.models import Comment, News
+from yanews import urls as project_urls
 
 COMMENT_TEXT = 'Текст комментария'
+MANY_COMMENTS_COUNT = 100_000
+
+
+@pytest.fixture(autouse=True)
+def clear_page_cache():
+    """Закэшированные страницы и версии не должны переживать тест."""
+    get_page_cache().clear()
+    get_version_cache().clear()
+    reset_stats()
+
+
+def reload_urls():
+    """Пересобирает URL-схему после смены ASYNC_VIEWS."""
+    reload(news_urls)
+    reload(project_urls)
+    clear_url_caches()
+
+
+@pytest.fixture
+def async_views(settings):
+    """Асинхронные представления в URL-схеме, как под ASGI."""
+    settings.ASYNC_VIEWS = True
+    reload_urls()
+    yield
+    settings.ASYNC_VIEWS = False
+    reload_urls()
 
 
 @pytest.fixture
@@ -62,11 +94,44 @@ def news_with_ten_comments(news, author):
     return news
 
 
+@pytest.fixture
+def news_with_many_comments(eleven_news, author):
+    """Главная страница, под новостями которой 100 тысяч комментариев."""
+    all_news = list(News.objects.all()[:settings.NEWS_COUNT_ON_HOME_PAGE])
+    Comment.objects.bulk_create(
+        (
+            Comment(
+                news=all_news[index % len(all_news)],
+                author=author,
+                text=f'Текст {index}',
+            )
+            for index in range(MANY_COMMENTS_COUNT)
+        ),
+        batch_size=5000,
+    )
+    call_command('recount_comments', stdout=StringIO())
+    return all_news
+
+
+@pytest.fixture
+def seeded_news():
+    """Тысяча новостей и 20 тысяч комментариев от генератора данных."""
+    call_command(
+        'generate_data', users=50, news=1000, comments=20000,
+        stdout=StringIO(),
+    )
+
+
 @pytest.fixture
 def url_news_detail(news):
     return reverse('news:detail', args=(news.id,))
 
 
+@pytest.fixture
+def url_news_events(news):
+    return reverse('news:events', args=(news.id,))
+
+
 @pytest.fixture
 def url_comment_delete(comment):
     return reverse('news:delete', args=(comment.id,))
@@ -82,6 +147,11 @@ def url_news_home():
     return reverse('news:home')
 
 
+@pytest.fixture
+def url_news_search():
+    return reverse('news:search')
+
+
 @pytest.fixture
 def url_user_login():
     return reverse('users:login')
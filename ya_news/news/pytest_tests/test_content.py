@@ -1,5 +1,31 @@
+import os
+import re
+import subprocess
+import sys
+import time
+import tracemalloc
+from http import HTTPStatus
+from unittest import mock
+
 import pytest
 from django.conf import settings
+from django.urls import reverse
+
+from news.cache import (
+    SizedLocMemCache, get_stats, get_story_version_key, get_version
+)
+from news.models import Comment, News
+from news.pagination import get_comments_page
+from news.pytest_tests.conftest import MANY_COMMENTS_COUNT
+from news.search import search_news
+
+COMMENT_ID = re.compile(r'id="comment-(\d+)"')
+NEXT_COMMENTS_LINK = re.compile(
+    r'href="([^"#]+)#comments"\s+data-next-comments'
+)
+# Главная страница не должна поднимать комментарии в память:
+# 100 тысяч объектов Comment заняли бы сотни мегабайт.
+HOME_PAGE_MEMORY_LIMIT = 2 * 1024 * 1024
 
 pytestmark = pytest.mark.django_db
 
@@ -25,6 +51,24 @@ def test_news_order(eleven_news, url_news_home, client):
     assert all_dates == sorted_dates
 
 
+def test_home_page_counts_comments_in_database(
+    news_with_many_comments, url_news_home, client,
+    django_assert_num_queries
+):
+    """Число комментариев на главной считается одним запросом."""
+    tracemalloc.start()
+    try:
+        with django_assert_num_queries(1):
+            response = client.get(url_news_home)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    counts = [news.comments_count for news in response.context['object_list']]
+    assert sum(counts) == MANY_COMMENTS_COUNT
+    assert peak < HOME_PAGE_MEMORY_LIMIT
+
+
 def test_comments_order(news_with_ten_comments, url_news_detail, client):
     """Старые комментарии должны быть в начале, новые — в конце."""
     response = client.get(url_news_detail)
@@ -41,6 +85,68 @@ def test_comments_order(news_with_ten_comments, url_news_detail, client):
     )
 
 
+def test_comments_keyset_pagination(
+    news_with_ten_comments, url_news_detail, client, settings
+):
+    """Ссылки «Следующие комментарии» проходят все комментарии по порядку."""
+    settings.COMMENTS_COUNT_ON_DETAIL_PAGE = 4
+    pages = []
+    url = url_news_detail
+    while url:
+        html = client.get(url).content.decode()
+        pages.append([int(pk) for pk in COMMENT_ID.findall(html)])
+        next_link = NEXT_COMMENTS_LINK.search(html)
+        url = next_link and next_link[1]
+
+    assert [len(page) for page in pages] == [4, 4, 2]
+    seen = [pk for page in pages for pk in page]
+    assert seen == list(
+        news_with_ten_comments.comment_set.order_by('pk').values_list(
+            'pk', flat=True
+        )
+    )
+
+
+def test_get_comments_page_cursors(news_with_ten_comments, settings):
+    """Курсоры проходят все комментарии по порядку и без повторов."""
+    settings.COMMENTS_COUNT_ON_DETAIL_PAGE = 4
+    pages = []
+    cursor = None
+    while True:
+        page, cursor = get_comments_page(news_with_ten_comments.pk, cursor)
+        pages.append(page)
+        if cursor is None:
+            break
+
+    assert [len(page) for page in pages] == [4, 4, 2]
+    seen = [comment for page in pages for comment in page]
+    assert seen == list(news_with_ten_comments.comment_set.order_by('pk'))
+
+
+def test_comments_fragment_endpoint(news_with_ten_comments, client, settings):
+    """JSON-фрагмент отдаёт HTML очередной страницы и следующий курсор."""
+    settings.COMMENTS_COUNT_ON_DETAIL_PAGE = 6
+    url = reverse('news:comments', args=(news_with_ten_comments.pk,))
+
+    first = client.get(url).json()
+    second = client.get(url, {'after': first['next']}).json()
+
+    assert 'Текст 5' in first['html']
+    assert 'Текст 6' in second['html']
+    assert second['next'] is None
+
+
+def test_cached_comments_show_actions_only_to_author(
+    comment, url_news_detail, url_comment_edit, author_client, admin_client
+):
+    """Общий фрагмент комментариев дополняется ссылками только автора."""
+    other_page = admin_client.get(url_news_detail).content.decode()
+    author_page = author_client.get(url_news_detail).content.decode()
+
+    assert url_comment_edit not in other_page
+    assert url_comment_edit in author_page
+
+
 def test_anonymous_client_has_no_form(url_news_detail, client):
     """Проверка, что анонимному пользователю недоступна форма комментария."""
     response = client.get(url_news_detail)
@@ -56,3 +162,180 @@ def test_authorized_client_has_form(url_news_detail, author_client):
     from news.forms import CommentForm
 
     assert isinstance(response.context['form'], CommentForm)
+
+
+def test_anonymous_page_served_from_cache(
+    news, url_news_detail, client, django_assert_num_queries
+):
+    """Повторный запрос анонима отдаётся из кэша без обращения к базе."""
+    first = client.get(url_news_detail)
+    with django_assert_num_queries(0):
+        second = client.get(url_news_detail)
+
+    assert second.content == first.content
+    assert get_stats()['hits'] == 1
+    assert get_stats()['misses'] == 1
+
+
+def test_cached_page_invalidated_by_comment(
+    news, author, url_news_detail, url_news_home, client
+):
+    """Новый комментарий сбрасывает кэш страницы новости и главной."""
+    client.get(url_news_detail)
+    client.get(url_news_home)
+    Comment.objects.create(news=news, author=author, text='Свежий')
+
+    assert 'Свежий' in client.get(url_news_detail).content.decode()
+    assert 'Комментариев: 1' in client.get(url_news_home).content.decode()
+
+
+def test_authenticated_pages_not_cached(url_news_detail, author_client):
+    """Страницы авторизованных пользователей не кэшируются."""
+    author_client.get(url_news_detail)
+    author_client.get(url_news_detail)
+
+    assert get_stats()['hits'] == get_stats()['misses'] == 0
+
+
+def test_sized_cache_evicts_least_recently_used():
+    """Кэш вытесняет давно не читавшуюся запись при нехватке места."""
+    cache = SizedLocMemCache('test-eviction', {'OPTIONS': {'MAX_SIZE': 300}})
+    cache.set('first', 'x' * 100)
+    cache.set('second', 'x' * 100)
+    cache.get('first')
+    cache.set('third', 'x' * 100)
+
+    assert cache.get('second') is None
+    assert cache.get('first') is not None
+    assert cache.evictions == 1
+    assert cache.size <= 300
+
+
+def test_sized_cache_accounts_incr():
+    """Размер записи пересчитывается после incr(), а не копится."""
+    cache = SizedLocMemCache('test-incr', {})
+    cache.set('counter', 9)
+    cache.incr('counter', 10 ** 20)
+    cache.incr('counter', -10 ** 20)
+    size = cache.size
+    cache.delete('counter')
+
+    assert size > 0
+    assert cache.size == 0
+
+
+def test_page_key_ignores_unknown_params(news, url_news_detail, client):
+    """Посторонние параметры запроса не плодят копии страницы в кэше."""
+    client.get(url_news_detail)
+    client.get(url_news_detail, {'utm_source': 'mail'})
+    client.get(url_news_detail, {'utm_source': 'news'})
+
+    assert get_stats()['misses'] == 1
+    assert get_stats()['hits'] == 2
+
+
+def test_version_shared_between_processes(news):
+    """Изменение в другом процессе сервера меняет версию страниц."""
+    key = get_story_version_key(news.pk)
+    version = get_version(key)
+
+    subprocess.run(
+        [
+            sys.executable, '-c',
+            'import django; django.setup(); '
+            'from news.cache import bump_version; '
+            f'bump_version({key!r})',
+        ],
+        cwd=settings.BASE_DIR,
+        env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'yanews.settings'},
+        check=True,
+    )
+
+    assert get_version(key) != version
+
+
+def search(client, query, **params):
+    return client.get(reverse('news:search'), {'q': query, **params})
+
+
+def test_news_lists_do_not_load_text(news, url_news_home, client):
+    """Главная и поиск выводят анонс, полный текст не загружается."""
+    for response in (client.get(url_news_home), search(client, 'заголовок')):
+        news_list = response.context['object_list']
+        assert [item.pk for item in news_list] == [news.pk]
+        assert 'text' in news_list[0].get_deferred_fields()
+        assert news.excerpt in response.content.decode()
+
+
+def test_search_finds_news_by_word_forms(news, client):
+    """Поиск находит новость по другой форме слова."""
+    response = search(client, 'заметками')
+
+    assert response.context['object_list'] == [news]
+
+
+def test_search_ranks_title_above_text_and_comments(author, client):
+    """Совпадение в заголовке важнее совпадений в тексте и комментариях."""
+    in_comments = News.objects.create(title='Погода', text='Дождь')
+    Comment.objects.create(news=in_comments, author=author, text='Выборы')
+    in_text = News.objects.create(title='Город', text='Скоро выборы')
+    in_title = News.objects.create(title='Выборы мэра', text='Итоги')
+
+    response = search(client, 'выборы')
+
+    assert response.context['object_list'] == [in_title, in_text, in_comments]
+
+
+def test_search_shows_comments_count(comment, client):
+    """Результаты поиска несут счётчик комментариев новости."""
+    response = search(client, 'комментария')
+
+    assert 'Комментариев: 1' in response.content.decode()
+
+
+def test_search_paginates_results(eleven_news, client, settings):
+    """Результаты поиска делятся на страницы."""
+    settings.NEWS_COUNT_ON_SEARCH_PAGE = 4
+
+    pages = [
+        search(client, 'новость', page=page).context['object_list']
+        for page in (1, 2, 3)
+    ]
+
+    assert [len(page) for page in pages] == [4, 4, 3]
+    assert len({news.pk for page in pages for news in page}) == 11
+
+
+def test_search_cache_kept_until_timeout_by_new_comment(
+    news, author, settings
+):
+    """Новый комментарий попадает в поиск, когда истекает запись кэша."""
+    assert search_news('погода') == []
+    Comment.objects.create(news=news, author=author, text='Хорошая погода')
+
+    assert search_news('погода') == []
+    expired = time.time() + settings.NEWS_SEARCH_CACHE_TIMEOUT + 1
+    with mock.patch('time.time', return_value=expired):
+        assert search_news('погода') == [news.pk]
+
+
+def test_search_cache_invalidated_by_text_edits(news, comment, client):
+    """Правки текста новости и комментария сразу видны в поиске."""
+    for query in ('погода', 'выборы'):
+        assert search(client, query).context['object_list'] == []
+    comment.text = 'Хорошая погода'
+    comment.save(update_fields=('text',))
+
+    assert search(client, 'погода').context['object_list'] == [news]
+    news.title = 'Выборы'
+    news.save()
+
+    assert search(client, 'выборы').context['object_list'] == [news]
+
+
+def test_search_ignores_query_syntax(news, client):
+    """Синтаксис FTS5 в запросе пользователя не работает и не ломает поиск."""
+    response = search(client, '"заголовок*) (^')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.context['object_list'] == [news]
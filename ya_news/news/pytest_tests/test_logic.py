@@ -1,10 +1,26 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
 from http import HTTPStatus
+from importlib import import_module
+from io import StringIO
 from random import choice
+from unittest import mock
 import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
 from pytest_django.asserts import assertFormError
+from news.events import (
+    CREATED, DELETED, UPDATED, LocalBroker, get_broker, get_channel
+)
 from news.forms import BAD_WORDS, WARNING
-from news.models import Comment
+from news.models import Comment, News
 from news.pytest_tests.conftest import COMMENT_TEXT
+from news.search import search_news
+from yacommon.sqlite import WriteQueue
 
 pytestmark = pytest.mark.django_db
 
@@ -62,6 +78,33 @@ def test_user_cant_use_bad_words(url_news_detail, admin_client):
     assert comments_count == comments_before
 
 
+@pytest.mark.parametrize(
+    'text',
+    ('Вы все НЕГОДЯЙ!', 'какая-то pедиcкa', 'нeгoдяй, однако'),
+)
+def test_bad_words_found_through_case_and_lookalikes(
+    text, url_news_detail, admin_client
+):
+    """Фильтр не обмануть регистром и похожими латинскими буквами."""
+    response = admin_client.post(url_news_detail, data={'text': text})
+
+    assertFormError(response, form='form', field='text', errors=WARNING)
+    assert not Comment.objects.exists()
+
+
+def test_bad_words_file_reloaded_without_restart(
+    url_news_detail, admin_client, settings, tmp_path
+):
+    """Слова из файла подхватываются сразу после его изменения."""
+    words_file = tmp_path / 'bad_words.txt'
+    words_file.write_text('# модерация\nбука\n', encoding='utf-8')
+    settings.NEWS_BAD_WORDS_FILE = str(words_file)
+
+    response = admin_client.post(url_news_detail, data={'text': 'Ты бука'})
+
+    assertFormError(response, form='form', field='text', errors=WARNING)
+
+
 def test_author_can_delete_comment(
     url_comment_delete, comment, author_client
 ):
@@ -101,6 +144,14 @@ def test_author_can_edit_comment(url_comment_edit, comment, author_client):
     assert comment.created is not None
 
 
+def test_edited_comment_html_updated(url_comment_edit, comment, author_client):
+    """HTML комментария пересчитывается вместе с текстом."""
+    author_client.post(url_comment_edit, data={'text': '<b>Жирный</b>\nтекст'})
+
+    comment.refresh_from_db()
+    assert comment.text_html == '&lt;b&gt;Жирный&lt;/b&gt;<br>текст'
+
+
 def test_user_cant_edit_comment_of_another_user(
     url_comment_edit, comment, admin_client
 ):
@@ -115,3 +166,247 @@ def test_user_cant_edit_comment_of_another_user(
     assert comment.text == COMMENT_TEXT
     assert comment.author is not None
     assert comment.created is not None
+
+
+def test_comments_count_follows_create_and_delete(
+    news, url_news_detail, admin_client, admin_user
+):
+    """Счётчик комментариев новости меняется при создании и удалении."""
+    admin_client.post(url_news_detail, data=form_data)
+    news.refresh_from_db()
+    assert news.comments_count == 1
+
+    Comment.objects.get(news=news).delete()
+    news.refresh_from_db()
+    assert news.comments_count == 0
+
+
+def test_comments_count_after_cascade_delete(news, comment, author):
+    """Каскадное удаление автора уменьшает счётчик комментариев."""
+    news.refresh_from_db()
+    assert news.comments_count == 1
+
+    author.delete()
+    news.refresh_from_db()
+    assert news.comments_count == 0
+
+
+def test_recount_comments_repairs_drift(news, comment):
+    """Команда recount_comments исправляет рассинхронизированный счётчик."""
+    News.objects.filter(pk=news.pk).update(comments_count=42)
+
+    call_command('recount_comments', batch_size=1, stdout=StringIO())
+
+    news.refresh_from_db()
+    assert news.comments_count == 1
+
+
+def test_generate_data_is_deterministic_and_counted():
+    """Генератор повторяет данные по seed и заполняет счётчики."""
+    def generate(prefix):
+        call_command(
+            'generate_data', users=3, news=4, comments=50, batch_size=7,
+            seed=1, prefix=prefix, stdout=StringIO(),
+        )
+        return News.objects.order_by('-pk')[:4]
+
+    first = [(news.title, news.comments_count) for news in generate('a-')]
+    second = [(news.title, news.comments_count) for news in generate('b-')]
+
+    assert first == second
+    assert sum(count for _, count in first) == 50
+    assert Comment.objects.count() == 100
+
+
+def test_reindex_search_rebuilds_index(news, comment):
+    """Команда reindex_search заново заполняет очищенные индексы."""
+    with connection.cursor() as cursor:
+        for table in ('news_news_fts', 'news_comment_fts'):
+            cursor.execute(
+                f"INSERT INTO {table}({table}) VALUES ('delete-all')"
+            )
+    assert search_news('заголовок') == []
+
+    call_command('reindex_search', batch_size=1, stdout=StringIO())
+
+    assert search_news('заголовок') == [news.pk]
+    assert search_news('комментарий') == [news.pk]
+
+
+@pytest.mark.parametrize(
+    'url, data, expected_queries',
+    (
+        # Сессия, пользователь, новость; вставка и счётчик в savepoint.
+        (pytest.lazy_fixture('url_news_detail'), form_data, 7),
+        # Сессия, пользователь, комментарий с новостью и запись текста.
+        (pytest.lazy_fixture('url_comment_edit'), form_data, 4),
+        # Сессия, пользователь, комментарий, удаление и счётчик.
+        (pytest.lazy_fixture('url_comment_delete'), {}, 5),
+    )
+)
+def test_comment_flows_query_count(
+    url, data, expected_queries, author_client, django_assert_num_queries
+):
+    """Создание, правка и удаление комментария без повторных выборок."""
+    with django_assert_num_queries(expected_queries):
+        response = author_client.post(url, data=data)
+
+    assert response.status_code == HTTPStatus.FOUND
+
+
+@pytest.mark.django_db(transaction=True)
+def test_write_queue_serializes_concurrent_writes(settings, news, author):
+    """Очередь записей сохраняет параллельные комментарии пачками."""
+    settings.SQLITE_PRODUCTION_MODE = True
+    queue = WriteQueue()
+
+    def post(index):
+        return queue.run(
+            Comment.objects.create, news=news, author=author, text=str(index)
+        )
+
+    def fail():
+        raise ValueError
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        comments = list(executor.map(post, range(20)))
+        failed = executor.submit(queue.run, fail)
+
+    with pytest.raises(ValueError):
+        failed.result()
+    assert len({comment.pk for comment in comments}) == 20
+    news.refresh_from_db()
+    assert news.comments_count == Comment.objects.count() == 20
+
+
+def test_comment_changes_published_after_commit(
+    news, author, django_capture_on_commit_callbacks
+):
+    """Создание, правка и удаление комментария уходят подписчикам."""
+
+    def change_comment():
+        with django_capture_on_commit_callbacks(execute=True):
+            comment = Comment.objects.create(
+                news=news, author=author, text=COMMENT_TEXT
+            )
+        with django_capture_on_commit_callbacks(execute=True):
+            comment.text = NEW_COMMENT_TEXT
+            comment.save()
+        with django_capture_on_commit_callbacks(execute=True):
+            comment.delete()
+
+    async def listen():
+        broker = get_broker()
+        subscription = broker.subscribe(get_channel(news.pk), 10)
+        try:
+            await sync_to_async(change_comment)()
+            return [
+                json.loads(await asyncio.wait_for(subscription.get(), 5))
+                for _ in range(3)
+            ]
+        finally:
+            broker.unsubscribe(subscription)
+
+    created, updated, deleted = async_to_sync(listen)()
+    assert created['event'] == CREATED
+    assert COMMENT_TEXT in created['html']
+    assert updated['event'] == UPDATED
+    assert NEW_COMMENT_TEXT in updated['html']
+    assert deleted == {'event': DELETED, 'id': created['id']}
+
+
+def test_comment_not_rendered_without_subscribers(
+    news, author, django_capture_on_commit_callbacks
+):
+    """Без открытых потоков событие не рендерится и не публикуется."""
+    with mock.patch('news.events.render_to_string') as render:
+        with django_capture_on_commit_callbacks(execute=True):
+            Comment.objects.create(news=news, author=author, text='Текст')
+    render.assert_not_called()
+
+
+def test_slow_subscriber_overflows():
+    """Переполненная подписка отдаёт None вместо старых событий."""
+
+    async def overflow():
+        broker = LocalBroker()
+        subscription = broker.subscribe('channel', 2)
+        for index in range(3):
+            broker.publish('channel', str(index))
+        # Публикация ставит события в очередь через цикл событий.
+        await asyncio.sleep(0)
+        message = await subscription.get()
+        broker.unsubscribe(subscription)
+        return message, broker.has_subscribers('channel')
+
+    assert async_to_sync(overflow)() == (None, False)
+
+
+def test_news_excerpt_prepared_on_save():
+    """Анонс новости считается при сохранении."""
+    news = News.objects.create(
+        title='Заголовок', text=' '.join(map(str, range(20)))
+    )
+
+    assert news.excerpt == ' '.join(map(str, range(15))) + ' …'
+
+
+def test_prerender_fills_bulk_created_rows(news, author):
+    """Команда заполняет строки, созданные в обход save()."""
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text=f'<i>Текст</i>\n{index}')
+        for index in range(3)
+    )
+    News.objects.filter(pk=news.pk).update(excerpt='')
+
+    call_command('prerender_text', batch_size=2, stdout=StringIO())
+
+    news.refresh_from_db()
+    assert news.excerpt == news.text
+    assert [
+        comment.text_html for comment in Comment.objects.filter(news=news)
+    ] == [f'&lt;i&gt;Текст&lt;/i&gt;<br>{index}' for index in range(3)]
+
+
+def test_fixture_news_get_excerpts(client, url_news_home):
+    """Новости из фикстуры получают анонсы: loaddata не вызывает save()."""
+    call_command('loaddata', 'news.json', verbosity=0)
+
+    news_list = list(News.objects.all())
+    assert news_list
+    assert all(news.excerpt for news in news_list)
+    content = client.get(url_news_home).content.decode()
+    assert news_list[0].excerpt in content
+
+
+def test_raw_saved_comment_gets_html(news, author):
+    """HTML текста считается и для raw-записей, как в loaddata."""
+    comment = Comment(
+        news=news, author=author, text='<b>Текст</b>\nещё',
+        created=timezone.now(),
+    )
+    comment.save_base(raw=True)
+
+    comment.refresh_from_db()
+    assert comment.text_html == '&lt;b&gt;Текст&lt;/b&gt;<br>ещё'
+
+
+def test_migration_backfills_prerendered_text(news, author):
+    """Миграция заполняет поля строк, созданных до их появления."""
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text='<i>Текст</i>\nещё')
+        for _ in range(3)
+    )
+    News.objects.filter(pk=news.pk).update(excerpt='')
+    migration = import_module(
+        'news.migrations.0006_backfill_prerendered_text'
+    )
+
+    with mock.patch.object(migration, 'BATCH_SIZE', 2):
+        migration.backfill(apps, None)
+
+    news.refresh_from_db()
+    assert news.excerpt == news.text
+    assert set(Comment.objects.values_list('text_html', flat=True)) == {
+        '&lt;i&gt;Текст&lt;/i&gt;<br>ещё'
+    }
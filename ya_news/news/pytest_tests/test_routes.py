@@ -1,7 +1,31 @@
+import asyncio
+import json
+import logging
+import time
 from http import HTTPStatus
+from unittest import mock
+from urllib.parse import urlencode
+
 import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import Client
+from django.urls import resolve, reverse
 from pytest_django.asserts import assertRedirects
 
+from news.cache import get_story_version_key, get_version_cache
+from news.events import get_broker, get_channel
+from news.forms import CommentForm
+from news.live import LiveComments
+from news.models import Comment
+from news.views import async_news_detail, async_news_list
+from yacommon.middleware import install_query_timer, time_queries
+from yacommon.query_plans import get_slow_steps
+from yacommon.templating import get_loaders, preload_templates
+
 pytestmark = pytest.mark.django_db
 
 
@@ -9,6 +33,7 @@ pytestmark = pytest.mark.django_db
     'url, client_fixture, expected_status',
     (
         (pytest.lazy_fixture('url_news_home'), 'client', HTTPStatus.OK),
+        (pytest.lazy_fixture('url_news_search'), 'client', HTTPStatus.OK),
         (pytest.lazy_fixture('url_user_login'), 'client', HTTPStatus.OK),
         (pytest.lazy_fixture('url_user_logout'), 'client', HTTPStatus.OK),
         (pytest.lazy_fixture('url_user_signup'), 'client', HTTPStatus.OK),
@@ -40,6 +65,26 @@ def test_page_status_codes(
     assert response.status_code == expected_status
 
 
+@pytest.mark.parametrize(
+    'cursor',
+    (
+        'abc',
+        '1_2_3',
+        # id больше BigAutoField: запрос упал бы с OverflowError.
+        f'0_{2 ** 63}',
+        '0_-1',
+        f'{10 ** 20}_1',
+    )
+)
+@pytest.mark.parametrize('url_name', ('news:detail', 'news:comments'))
+def test_invalid_comments_cursor_not_found(url_name, cursor, news, client):
+    """Некорректный или вне диапазона курсор комментариев даёт 404."""
+    response = client.get(
+        reverse(url_name, args=(news.pk,)), {'after': cursor}
+    )
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
 @pytest.mark.parametrize(
     'url_fixture, login_url_fixture',
     (
@@ -56,3 +101,404 @@ def test_redirects_for_anonymous_user(
     expected_redirect_url = f'{login_url}?next={url}'
     response = client.get(url)
     assertRedirects(response, expected_redirect_url)
+
+
+def test_query_budget_violation_reported(
+    url_news_home, client, request, monkeypatch
+):
+    """Превышение бюджета SQL-запросов попадает в отчёт плагина."""
+    recorder = request.config.pluginmanager.get_plugin(
+        'query_budget_recorder'
+    )
+    monkeypatch.setitem(recorder.budgets, 'news:home', 0)
+
+    client.get(url_news_home)
+    violations, recorder.violations = recorder.violations, []
+
+    assert len(violations) == 1
+    assert 'FROM "news_news"' in recorder.format_violation(*violations[0])
+
+
+def test_server_timing_header(url_news_detail, author_client, settings):
+    """Ответ содержит время этапов обработки в заголовке Server-Timing."""
+    settings.REQUEST_TIMING_SAMPLE_RATE = 1
+    response = author_client.get(url_news_detail)
+
+    timing = response['Server-Timing']
+    for metric in ('url;dur=', 'view;dur=', 'template;dur=', 'db;dur='):
+        assert metric in timing
+    assert 'desc="4 queries"' in timing
+
+
+def test_server_timing_respects_sample_rate(url_news_home, client, settings):
+    """При нулевой доле выборки запросы не замеряются."""
+    settings.REQUEST_TIMING_SAMPLE_RATE = 0
+
+    assert 'Server-Timing' not in client.get(url_news_home)
+
+
+def test_slow_queries_logged_with_plan(
+    url_news_home, client, settings, caplog
+):
+    """Медленные запросы попадают в лог вместе с планом выполнения."""
+    settings.REQUEST_TIMING_SLOW_QUERY_MS = 0
+
+    with caplog.at_level(logging.INFO, logger='yanews.timing'):
+        client.get(url_news_home)
+
+    timing = json.loads(caplog.records[-1].getMessage())
+    assert timing['view'] == 'news:home'
+    assert timing['slow_queries'][0]['plan']
+
+
+def fetch(async_client, method, url, *args, **kwargs):
+    """Запрос асинхронного клиента из синхронного теста."""
+    async def request():
+        return await getattr(async_client, method)(url, *args, **kwargs)
+
+    return async_to_sync(request)()
+
+
+def test_async_views_in_url_scheme(
+    async_views, async_client, url_news_home, url_news_detail
+):
+    """Под ASGI главная и страница новости отдаются асинхронными view."""
+    for url, view in (
+        (url_news_home, async_news_list),
+        (url_news_detail, async_news_detail),
+    ):
+        assert resolve(url).func is view
+        assert fetch(async_client, 'get', url).status_code == HTTPStatus.OK
+
+
+def test_async_cached_page_skips_view(
+    async_views, async_client, url_news_home
+):
+    """Закэшированная страница отдаётся анониму без вызова view."""
+    first = fetch(async_client, 'get', url_news_home)
+    with mock.patch('news.views.render_response') as render_response:
+        second = fetch(async_client, 'get', url_news_home)
+
+    render_response.assert_not_called()
+    assert second.content == first.content
+
+
+def test_async_versions_read_off_event_loop(
+    async_views, async_client, url_news_home
+):
+    """Файловый кэш версий читается в потоке, а не в цикле событий."""
+    on_loop = []
+
+    def get_version_cache():
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            on_loop.append(False)
+        else:
+            on_loop.append(True)
+        return caches[settings.NEWS_VERSION_CACHE]
+
+    fetch(async_client, 'get', url_news_home)
+    with mock.patch('news.cache.get_version_cache', get_version_cache):
+        fetch(async_client, 'get', url_news_home)
+
+    assert on_loop
+    assert not any(on_loop)
+
+
+def test_async_detail_for_user(
+    async_views, async_client, author, url_news_detail
+):
+    """Пользователь с сессией получает страницу с формой комментария."""
+    async_client.force_login(author)
+
+    response = fetch(async_client, 'get', url_news_detail)
+
+    assert isinstance(response.context['form'], CommentForm)
+
+
+def test_async_detail_accepts_comment(
+    async_views, async_client, author, news, url_news_detail
+):
+    """Комментарий отправляется на тот же адрес и под ASGI."""
+    async_client.force_login(author)
+
+    response = fetch(
+        async_client, 'post', url_news_detail, urlencode({'text': 'Текст'}),
+        content_type='application/x-www-form-urlencoded',
+    )
+
+    assertRedirects(
+        response, f'{url_news_detail}#comments',
+        fetch_redirect_response=False,
+    )
+    assert Comment.objects.filter(news=news, author=author).exists()
+
+
+def test_async_server_timing_counts_queries(
+    async_views, async_client, author, url_news_detail, settings
+):
+    """Под ASGI запросы к базе из потоков попадают в Server-Timing."""
+    settings.REQUEST_TIMING_SAMPLE_RATE = 1
+    async_client.force_login(author)
+    install_query_timer(None, connection)
+    try:
+        response = fetch(async_client, 'get', url_news_detail)
+    finally:
+        connection.execute_wrappers.remove(time_queries)
+
+    assert 'desc="4 queries"' in response['Server-Timing']
+
+
+@pytest.mark.parametrize(
+    'url',
+    (
+        pytest.lazy_fixture('url_news_home'),
+        pytest.lazy_fixture('url_news_detail'),
+    ),
+)
+def test_repeat_visit_not_modified(url, client, django_assert_num_queries):
+    """Повторный запрос с ETag получает 304 без рендеринга и базы."""
+    etag = client.get(url)['ETag']
+
+    with django_assert_num_queries(0):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response['ETag'] == etag
+    assert not response.content
+
+
+def test_new_comment_changes_etag(
+    client, news, author, url_news_detail, url_news_home
+):
+    urls = (url_news_detail, url_news_home)
+    etags = [client.get(url)['ETag'] for url in urls]
+    Comment.objects.create(news=news, author=author, text='Текст')
+
+    for url, etag in zip(urls, etags):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK
+        assert response['ETag'] != etag
+
+
+def test_user_etag_not_shared(author_client, admin_client, url_news_detail):
+    """Страница с формой и ссылками автора проверяется по его ETag."""
+    etag = author_client.get(url_news_detail)['ETag']
+
+    assert author_client.get(
+        url_news_detail, HTTP_IF_NONE_MATCH=etag
+    ).status_code == HTTPStatus.NOT_MODIFIED
+    for other_client in (Client(), admin_client):
+        assert other_client.get(
+            url_news_detail, HTTP_IF_NONE_MATCH=etag
+        ).status_code == HTTPStatus.OK
+
+
+def test_last_modified_for_anonymous(author_client, news, url_news_detail):
+    """Last-Modified отдаётся анониму, когда версия старше секунды."""
+    client = Client()
+    get_version_cache().set(
+        get_story_version_key(news.pk), time.time_ns() - 10 ** 10, None
+    )
+    last_modified = client.get(url_news_detail)['Last-Modified']
+
+    response = client.get(
+        url_news_detail, HTTP_IF_MODIFIED_SINCE=last_modified
+    )
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert not author_client.get(url_news_detail).has_header(
+        'Last-Modified'
+    )
+
+
+def test_async_repeat_visit_not_modified(
+    async_views, async_client, url_news_home
+):
+    """Под ASGI ответ 304 анониму отдаётся без вызова view."""
+    etag = fetch(async_client, 'get', url_news_home)['ETag']
+    with mock.patch('news.views.render_response') as render_response:
+        # Асинхронный клиент передаёт дополнительные заголовки как есть.
+        response = fetch(
+            async_client, 'get', url_news_home, **{'If-None-Match': etag}
+        )
+
+    render_response.assert_not_called()
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+@pytest.fixture
+def preloaded_templates(settings):
+    """Шаблоны разобраны при старте, как в производственном режиме."""
+    settings.TEMPLATE_PRODUCTION_MODE = True
+    yield preload_templates()
+    for loader in get_loaders():
+        loader.reset()
+
+
+def test_pages_use_preloaded_templates(
+    preloaded_templates, author_client, url_news_detail, url_news_home,
+    caplog,
+):
+    """После предзагрузки страницы не разбирают шаблоны."""
+    with caplog.at_level(logging.WARNING, logger='yanews.templates'):
+        for page_client, url in (
+            (Client(), url_news_home), (author_client, url_news_detail)
+        ):
+            assert page_client.get(url).status_code == HTTPStatus.OK
+
+    assert preloaded_templates > 0
+    assert not caplog.records
+
+
+def test_template_parsed_at_request_time_reported(
+    preloaded_templates, client, url_news_home, caplog
+):
+    for loader in get_loaders():
+        loader.get_template_cache.pop('news/home.html')
+
+    with caplog.at_level(logging.WARNING, logger='yanews.templates'):
+        client.get(url_news_home)
+
+    assert 'news/home.html' in caplog.records[0].getMessage()
+
+
+def test_views_use_indexes(seeded_news, client):
+    """Запросы страниц на большой базе обходятся без полного просмотра."""
+    comment = Comment.objects.order_by('news', '-pk').first()
+    public_urls = (
+        reverse('news:home'),
+        reverse('news:detail', args=(comment.news_id,)),
+        reverse('news:comments', args=(comment.news_id,)),
+        reverse('news:search') + '?q=проект',
+    )
+    author_urls = (
+        reverse('news:edit', args=(comment.pk,)),
+        reverse('news:delete', args=(comment.pk,)),
+    )
+    plans = {url: get_slow_steps(client, url) for url in public_urls}
+    client.force_login(comment.author)
+    plans.update({url: get_slow_steps(client, url) for url in author_urls})
+    assert {url: steps for url, steps in plans.items() if steps} == {}
+
+
+async def not_found(scope, receive, send):
+    await send({'type': 'http.response.start', 'status': 404})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def open_stream(url, client=None, until=None, app=None):
+    """
+    Открывает поток SSE и читает его, пока until(сообщения) ложно.
+
+    Возвращает отправленные сообщения ASGI; после until клиент
+    отключается.
+    """
+    app = app or LiveComments(not_found)
+    cookie = f'{settings.SESSION_COOKIE_NAME}=' + (
+        client.cookies[settings.SESSION_COOKIE_NAME].value if client else ''
+    )
+    scope = {
+        'type': 'http', 'method': 'GET', 'path': url, 'query_string': b'',
+        'headers': [(b'cookie', cookie.encode())],
+    }
+    disconnect = asyncio.Event()
+    messages = []
+
+    async def receive():
+        await disconnect.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        messages.append(message)
+
+    task = asyncio.ensure_future(app(scope, receive, send))
+    while until is not None and not until(messages) and not task.done():
+        await asyncio.sleep(0.01)
+    disconnect.set()
+    await asyncio.wait_for(task, 5)
+    return messages
+
+
+def get_body(messages):
+    return b''.join(message.get('body', b'') for message in messages)
+
+
+def test_events_not_streamed_under_wsgi(client, url_news_events):
+    """Под WSGI браузер получает 204 и не переподключается."""
+    assert client.get(url_news_events).status_code == HTTPStatus.NO_CONTENT
+
+
+def test_live_comment_stream(
+    news, author, author_client, url_news_events,
+    django_capture_on_commit_callbacks,
+):
+    """Новый комментарий приходит в поток со ссылками для автора."""
+    channel = get_channel(news.pk)
+
+    def create_comment():
+        with django_capture_on_commit_callbacks(execute=True):
+            Comment.objects.create(news=news, author=author, text='Живой')
+
+    async def scenario():
+        stream = asyncio.ensure_future(open_stream(
+            url_news_events, author_client,
+            until=lambda messages: b'event: created' in get_body(messages),
+        ))
+        while not get_broker().has_subscribers(channel):
+            await asyncio.sleep(0.01)
+        await sync_to_async(create_comment)()
+        return await asyncio.wait_for(stream, 5)
+
+    messages = async_to_sync(scenario)()
+    assert messages[0]['status'] == HTTPStatus.OK
+    assert (b'content-type', b'text/event-stream; charset=utf-8') in (
+        messages[0]['headers']
+    )
+    body = get_body(messages).decode()
+    assert body.startswith('retry: 5000')
+    data = json.loads(body.split('event: created\ndata: ')[1].split('\n')[0])
+    assert 'Живой' in data['html']
+    assert reverse('news:edit', args=(data['id'],)) in data['html']
+    assert not get_broker().has_subscribers(channel)
+
+
+def test_personalize_hops_to_thread_only_for_author(
+    comment, author, admin_user
+):
+    """Ради чужого комментария поток SSE не уходит в поток ОС."""
+    live = LiveComments(not_found)
+    message = json.dumps({
+        'event': 'created', 'id': comment.pk, 'author_id': author.pk,
+        'html': render_to_string('news/comment.html', {'comment': comment}),
+    })
+    edit_url = reverse('news:edit', args=(comment.pk,))
+
+    with mock.patch('news.live.sync_to_async') as hop:
+        event = async_to_sync(live.personalize)(message, admin_user)
+    hop.assert_not_called()
+    assert edit_url not in event.decode()
+    assert 'comment-actions' not in event.decode()
+
+    event = async_to_sync(live.personalize)(message, author).decode()
+    assert edit_url in event
+    assert 'author_id' not in event
+
+
+def test_stream_for_missing_news_not_found():
+    url = reverse('news:events', args=(1,))
+    messages = async_to_sync(open_stream)(url)
+    assert messages[0]['status'] == HTTPStatus.NOT_FOUND
+
+
+def test_stream_connections_limited(settings, url_news_events):
+    """Сверх NEWS_EVENTS_MAX_CONNECTIONS поток не открывается."""
+    settings.NEWS_EVENTS_MAX_CONNECTIONS = 0
+    messages = async_to_sync(open_stream)(url_news_events)
+    assert messages[0]['status'] == HTTPStatus.SERVICE_UNAVAILABLE
+
+
+def test_other_paths_passed_to_django(url_news_home):
+    messages = async_to_sync(open_stream)(url_news_home)
+    assert messages[0] == {'type': 'http.response.start', 'status': 404}
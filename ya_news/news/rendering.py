@@ -0,0 +1,21 @@
+"""
+Текст новостей и комментариев, подготовленный для шаблонов.
+
+Анонс новости и HTML комментария считаются один раз при сохранении и
+хранятся рядом с текстом, поэтому страницы не прогоняют каждый текст
+через фильтры truncatewords и linebreaksbr.
+"""
+from django.template.defaultfilters import linebreaksbr
+from django.utils.text import Truncator
+
+EXCERPT_WORDS = 15
+
+
+def make_excerpt(text):
+    """Анонс новости — то же, что фильтр truncatewords:15."""
+    return Truncator(text).words(EXCERPT_WORDS, truncate=' …')
+
+
+def render_comment_text(text):
+    """Экранированный текст комментария с <br> вместо переводов строк."""
+    return linebreaksbr(text, autoescape=True)
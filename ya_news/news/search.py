@@ -0,0 +1,94 @@
+"""
+Полнотекстовый поиск по новостям и комментариям через SQLite FTS5.
+
+Индексы news_news_fts и news_comment_fts создаёт миграция 0004_search.
+Слова запроса приводятся к основе и ищутся как префиксы, поэтому
+«новости» находит и «новость», и «новостями».
+"""
+import hashlib
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+
+from yacommon.search import build_match, optimize_tables
+
+from .cache import SEARCH_VERSION_KEY, get_page_cache, get_version
+
+# Совпадение во всех комментариях новости весит меньше, чем в ней самой.
+COMMENT_WEIGHT = 0.3
+# ORDER BY rank сортирует сам FTS5 и останавливается на LIMIT лучших.
+NEWS_SQL = (
+    "SELECT rowid, rank FROM news_news_fts "
+    "WHERE news_news_fts MATCH %s AND rowid >= %s "
+    # Совпадение в заголовке весит в 10 раз больше, чем в тексте.
+    "AND rank MATCH 'bm25(10.0, 1.0)' "
+    "ORDER BY rank LIMIT %s"
+)
+COMMENTS_SQL = (
+    "SELECT news_id, rank FROM news_comment_fts "
+    "WHERE news_comment_fts MATCH %s AND rowid >= %s "
+    "ORDER BY rank LIMIT %s"
+)
+# Самая старая строка среди NEWS_SEARCH_RESULTS новейших найденных.
+# bm25 считается для каждой найденной строки, и по частому слову
+# ранжирование всех совпадений заняло бы сотни миллисекунд, поэтому
+# ранжируются только новейшие кандидаты.
+BOUND_SQL = (
+    "SELECT rowid FROM {table} WHERE {table} MATCH %s "
+    "ORDER BY rowid DESC LIMIT 1 OFFSET %s"
+)
+
+
+def rank_news(query):
+    """
+    Новости (id) по убыванию релевантности.
+
+    Оценка новости — bm25 по заголовку и тексту плюс взвешенная сумма
+    bm25 её комментариев. В каждом индексе ранжируются только
+    NEWS_SEARCH_RESULTS новейших совпадений.
+    """
+    limit = settings.NEWS_SEARCH_RESULTS
+    scores = defaultdict(float)
+    with connection.cursor() as cursor:
+        for table, sql, weight in (
+            ('news_news_fts', NEWS_SQL, 1.0),
+            ('news_comment_fts', COMMENTS_SQL, COMMENT_WEIGHT),
+        ):
+            cursor.execute(
+                BOUND_SQL.format(table=table), (query, limit - 1)
+            )
+            bound = cursor.fetchone()
+            cursor.execute(sql, (query, bound[0] if bound else 0, limit))
+            for news_id, rank in cursor.fetchall():
+                scores[news_id] += weight * rank
+    # bm25 в FTS5 отрицательный: чем меньше, тем релевантнее.
+    return sorted(scores, key=scores.get)[:limit]
+
+
+def search_news(text):
+    """
+    Ранжированные id новостей по запросу из общего кэша.
+
+    Ключ включает версию поиска, которую сбрасывают изменения текста
+    новостей и правки комментариев, см. news.signals. Новые и удалённые
+    комментарии попадают в результаты по истечении записи через
+    NEWS_SEARCH_CACHE_TIMEOUT секунд. Разные формы одних слов дают один
+    запрос FTS5 и поэтому одну запись кэша.
+    """
+    query = build_match(text)
+    if query is None:
+        return []
+    cache = get_page_cache()
+    query_hash = hashlib.md5(query.encode()).hexdigest()
+    key = f'news:search:{query_hash}:{get_version(SEARCH_VERSION_KEY)}'
+    ids = cache.get(key)
+    if ids is None:
+        ids = rank_news(query)
+        cache.set(key, ids, settings.NEWS_SEARCH_CACHE_TIMEOUT)
+    return ids
+
+
+def optimize_index():
+    """Сливает сегменты индексов после массовой загрузки."""
+    optimize_tables('news_news_fts', 'news_comment_fts')
@@ -0,0 +1,79 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import SEARCH_VERSION_KEY, bump_version, invalidate_news_pages
+from .events import CREATED, DELETED, UPDATED, publish_on_commit
+from .models import Comment, News
+from .rendering import make_excerpt, render_comment_text
+
+
+@receiver(pre_save, sender=News)
+def prepare_excerpt(sender, instance, **kwargs):
+    """
+    Анонс для списков считается при записи, а не в шаблоне.
+
+    pre_save отправляется и для raw-записей loaddata, поэтому анонс
+    получают и новости из фикстур.
+    """
+    instance.excerpt = make_excerpt(instance.text)
+
+
+@receiver(pre_save, sender=Comment)
+def prepare_text_html(sender, instance, **kwargs):
+    """HTML текста комментария, в том числе для записей loaddata."""
+    instance.text_html = render_comment_text(instance.text)
+
+
+@receiver(post_delete, sender=Comment)
+def decrease_comments_count(sender, instance, **kwargs):
+    """
+    Удалённый комментарий уменьшает счётчик своей новости.
+
+    Сигнал отправляется внутри транзакции удаления, в том числе при
+    каскадном удалении новости или автора.
+    """
+    News.objects.filter(
+        pk=instance.news_id, comments_count__gt=0
+    ).update(comments_count=F('comments_count') - 1)
+
+
+@receiver(post_save, sender=News)
+@receiver(post_delete, sender=News)
+def invalidate_story_pages(sender, instance, update_fields=None, **kwargs):
+    """Кэш поиска сбрасывается, только если мог измениться индекс."""
+    invalidate_news_pages(instance.pk)
+    if update_fields is None or {'title', 'text'} & set(update_fields):
+        bump_version(SEARCH_VERSION_KEY)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, **kwargs):
+    invalidate_news_pages(instance.news_id)
+
+
+@receiver(post_save, sender=Comment)
+def invalidate_edited_comment_search(
+    sender, instance, created, update_fields, **kwargs
+):
+    """
+    Правка текста комментария сбрасывает кэш поиска.
+
+    Новые и удалённые комментарии его не сбрасывают: на обычном потоке
+    комментариев кэш популярных запросов иначе не доживал бы до
+    повторного запроса. Они попадают в результаты, когда запись кэша
+    истекает через NEWS_SEARCH_CACHE_TIMEOUT секунд.
+    """
+    if not created and (update_fields is None or 'text' in update_fields):
+        bump_version(SEARCH_VERSION_KEY)
+
+
+@receiver(post_save, sender=Comment)
+def publish_saved_comment(sender, instance, created, **kwargs):
+    publish_on_commit(CREATED if created else UPDATED, instance)
+
+
+@receiver(post_delete, sender=Comment)
+def publish_deleted_comment(sender, instance, **kwargs):
+    publish_on_commit(DELETED, instance)
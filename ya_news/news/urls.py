@@ -1,16 +1,38 @@
+from django.conf import settings
 from django.urls import path
 
 from news import views
 
 app_name = 'news'
 
+if settings.ASYNC_VIEWS:
+    news_list, news_detail = views.async_news_list, views.async_news_detail
+else:
+    news_list, news_detail = views.news_list, views.news_detail
+
 urlpatterns = [
-    path('', views.NewsList.as_view(), name='home'),
-    path('news/<int:pk>/', views.NewsDetailView.as_view(), name='detail'),
+    path('', news_list, name='home'),
+    path('search/', views.NewsSearch.as_view(), name='search'),
+    path('news/<int:pk>/', news_detail, name='detail'),
+    path(
+        'news/<int:pk>/comments/',
+        views.CommentStream.as_view(),
+        name='comments'
+    ),
+    path(
+        'news/<int:pk>/events/',
+        views.CommentEvents.as_view(),
+        name='events'
+    ),
     path(
         'delete_comment/<int:pk>/',
         views.CommentDelete.as_view(),
         name='delete'
     ),
     path('edit_comment/<int:pk>/', views.CommentUpdate.as_view(), name='edit'),
+    path(
+        'cache_stats/',
+        views.PageCacheStats.as_view(),
+        name='cache_stats'
+    ),
 ]
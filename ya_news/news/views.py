@@ -1,39 +1,123 @@
+from http import HTTPStatus
+
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.mixins import (
+    LoginRequiredMixin, UserPassesTestMixin
+)
+from django.core.paginator import Paginator
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
 from django.views import generic
 
+from yacommon.sqlite import writer
+from yacommon.views import render_response
+
+from .cache import (
+    HOME_VERSION_KEY, SEARCH_VERSION_KEY, AnonymousPageCacheMixin,
+    ConditionalPageMixin, get_cached_page, get_comments_fragment,
+    get_not_modified, get_page_key, get_stats, get_story_version_key,
+    get_version, punch_holes, set_validators
+)
 from .forms import CommentForm
 from .models import Comment, News
+from .search import search_news
 
 
-class NewsList(generic.ListView):
+class NewsList(
+        ConditionalPageMixin, AnonymousPageCacheMixin, generic.ListView
+):
     """Список новостей."""
     model = News
     template_name = 'news/home.html'
 
+    def get_version_key(self):
+        return HOME_VERSION_KEY
+
     def get_queryset(self):
         """
         Выводим только несколько последних новостей.
 
-        Их количество определяется в настройках проекта.
+        Их количество определяется в настройках проекта. Число
+        комментариев берётся из счётчика News.comments_count,
+        сами комментарии не загружаются. Вместо полного текста
+        выводится анонс News.excerpt.
+        """
+        return self.model.objects.defer('text')[
+            :settings.NEWS_COUNT_ON_HOME_PAGE
+        ]
+
+
+class NewsSearch(AnonymousPageCacheMixin, generic.TemplateView):
+    """Поиск по новостям и комментариям к ним."""
+    template_name = 'news/search.html'
+    cache_params = ('q', 'page')
+
+    def get_version_key(self):
+        return SEARCH_VERSION_KEY
+
+    def get_cache_timeout(self):
+        """Страница живёт столько же, сколько результаты поиска."""
+        return settings.NEWS_SEARCH_CACHE_TIMEOUT
+
+    def get_context_data(self, **kwargs):
+        """
+        Страница ранжированных результатов.
+
+        Список id берётся из кэша поиска, новости страницы вместе со
+        счётчиками комментариев и без полного текста загружаются
+        одним запросом.
         """
-        return self.model.objects.prefetch_related(
-            'comment_set'
-        )[:settings.NEWS_COUNT_ON_HOME_PAGE]
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get('q', '').strip()
+        page = Paginator(
+            search_news(query), settings.NEWS_COUNT_ON_SEARCH_PAGE
+        ).get_page(self.request.GET.get('page'))
+        found = News.objects.defer('text').in_bulk(page.object_list)
+        context.update(
+            query=query,
+            page_obj=page,
+            object_list=[
+                found[pk] for pk in page.object_list if pk in found
+            ],
+        )
+        return context
 
 
-class NewsDetail(generic.DetailView):
+class CommentsPageMixin:
+    """
+    Добавляет в контекст страницу комментариев новости.
+
+    Статья и комментарии берутся из общего кэша фрагментов, для
+    каждого запроса дорисовываются только ссылки действий пользователя.
+    """
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        html, context['next_cursor'] = get_comments_fragment(
+            self.object.pk, self.request.GET.get('after')
+        )
+        context['comments_html'] = punch_holes(html, self.request.user)
+        context['story_version'] = get_version(
+            get_story_version_key(self.object.pk)
+        )
+        context['page_cache'] = settings.NEWS_PAGE_CACHE
+        return context
+
+
+class NewsDetail(
+        ConditionalPageMixin,
+        AnonymousPageCacheMixin,
+        CommentsPageMixin,
+        generic.DetailView
+):
     model = News
     template_name = 'news/detail.html'
+    cache_params = ('after',)
 
-    def get_object(self, queryset=None):
-        obj = get_object_or_404(
-            self.model.objects.prefetch_related('comment_set__author'),
-            pk=self.kwargs['pk']
-        )
-        return obj
+    def get_version_key(self):
+        return get_story_version_key(self.kwargs['pk'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -42,8 +126,45 @@ class NewsDetail(generic.DetailView):
         return context
 
 
+class CommentStream(generic.View):
+    """Следующая страница комментариев в виде готового HTML-фрагмента."""
+
+    def get(self, request, *args, **kwargs):
+        news = get_object_or_404(News.objects.only('pk'), pk=kwargs['pk'])
+        html, next_cursor = get_comments_fragment(
+            news.pk, request.GET.get('after')
+        )
+        return JsonResponse({
+            'html': punch_holes(html, request.user),
+            'next': next_cursor,
+        })
+
+
+class CommentEvents(generic.View):
+    """
+    Заглушка потока событий комментариев под WSGI.
+
+    Под ASGI адрес обслуживает news.live.LiveComments. Ответ 204
+    говорит браузеру не переподключаться к потоку.
+    """
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(status=HTTPStatus.NO_CONTENT)
+
+
+class PageCacheStats(UserPassesTestMixin, generic.View):
+    """Счётчики кэша страниц: попадания, промахи и вытеснения."""
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse(get_stats())
+
+
 class NewsComment(
         LoginRequiredMixin,
+        CommentsPageMixin,
         generic.detail.SingleObjectMixin,
         generic.FormView
 ):
@@ -59,12 +180,13 @@ class NewsComment(
         comment = form.save(commit=False)
         comment.news = self.object
         comment.author = self.request.user
-        comment.save()
+        writer.run(comment.save)
         return super().form_valid(form)
 
     def get_success_url(self):
-        post = self.get_object()
-        return reverse('news:detail', kwargs={'pk': post.pk}) + '#comments'
+        return reverse(
+            'news:detail', kwargs={'pk': self.object.pk}
+        ) + '#comments'
 
 
 class NewsDetailView(generic.View):
@@ -83,14 +205,21 @@ class CommentBase(LoginRequiredMixin):
     model = Comment
 
     def get_success_url(self):
-        comment = self.get_object()
+        """Адрес строится по уже загруженному комментарию, без запросов."""
         return reverse(
-            'news:detail', kwargs={'pk': comment.news.pk}
+            'news:detail', kwargs={'pk': self.object.news_id}
         ) + '#comments'
 
     def get_queryset(self):
-        """Пользователь может работать только со своими комментариями."""
-        return self.model.objects.filter(author=self.request.user)
+        """
+        Пользователь может работать только со своими комментариями.
+
+        Новость загружается тем же запросом: её заголовок нужен шаблонам.
+        Автор нужен событию живой ленты об изменении комментария.
+        """
+        return self.model.objects.filter(
+            author=self.request.user
+        ).select_related('news', 'author')
 
 
 class CommentUpdate(CommentBase, generic.UpdateView):
@@ -98,7 +227,77 @@ class CommentUpdate(CommentBase, generic.UpdateView):
     template_name = 'news/edit.html'
     form_class = CommentForm
 
+    def form_valid(self, form):
+        """Форма меняет только текст — его одного и записываем."""
+        self.object = form.save(commit=False)
+        writer.run(self.object.save, update_fields=('text',))
+        return HttpResponseRedirect(self.get_success_url())
+
 
 class CommentDelete(CommentBase, generic.DeleteView):
     """Удаление комментария."""
     template_name = 'news/delete.html'
+
+    def delete(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        writer.run(self.object.delete)
+        return HttpResponseRedirect(self.get_success_url())
+
+
+news_list = NewsList.as_view()
+news_detail = NewsDetailView.as_view()
+
+
+def get_anonymous_page(request, version_key, cache_params):
+    """Ответ 304 или страница из кэша для анонима без сессии, иначе None."""
+    if (
+        request.method not in ('GET', 'HEAD')
+        or settings.SESSION_COOKIE_NAME in request.COOKIES
+    ):
+        return None
+    version = get_version(version_key)
+    not_modified = get_not_modified(request, version)
+    if not_modified is not None:
+        return not_modified
+    cached = get_cached_page(
+        get_page_key(request, version_key, cache_params)
+    )
+    if cached is None:
+        return None
+    return set_validators(request, cached, version)
+
+
+async def serve_page(
+    request, version_key, cache_params, view, *args, **kwargs
+):
+    """
+    Страница для асинхронного представления.
+
+    Вся работа — один вызов в потоке: версии страниц лежат в файловом
+    кэше, и чтение их в цикле событий блокировало бы его. Анониму без
+    сессии ответ 304 и закэшированная страница отдаются без view, базы
+    и рендеринга, остальные запросы выполняет синхронное view вместе с
+    рендерингом шаблона.
+    """
+    def respond():
+        response = get_anonymous_page(request, version_key, cache_params)
+        if response is None:
+            response = render_response(view, request, *args, **kwargs)
+        return response
+
+    return await sync_to_async(respond)()
+
+
+async def async_news_list(request):
+    """Главная страница под ASGI."""
+    return await serve_page(
+        request, HOME_VERSION_KEY, NewsList.cache_params, news_list
+    )
+
+
+async def async_news_detail(request, pk):
+    """Страница новости под ASGI."""
+    return await serve_page(
+        request, get_story_version_key(pk), NewsDetail.cache_params,
+        news_detail, pk=pk,
+    )
@@ -9,8 +9,23 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
+from yacommon.templating import preload_templates
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yanews.settings')
+# Под ASGI главную и страницы новостей обслуживают асинхронные
+# представления, см. news.views.serve_page.
+os.environ.setdefault('YANEWS_ASYNC_VIEWS', '1')
+
+django_application = get_asgi_application()
+
+if settings.TEMPLATE_PRODUCTION_MODE:
+    # Все шаблоны разбираются до первого запроса.
+    preload_templates()
+
+from news.live import LiveComments  # noqa: E402
 
-application = get_asgi_application()
+# Поток событий комментариев обслуживается до Django, см. news.live.
+application = LiveComments(django_application)
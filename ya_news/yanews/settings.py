@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from django.urls import reverse_lazy
@@ -20,14 +21,17 @@ INSTALLED_APPS = [
     'news.apps.NewsConfig',
 ]
 
+# Наследники стандартных middleware: под ASGI их хуки выполняются в
+# цикле событий, см. yacommon.middleware.InlineHooksMixin.
 MIDDLEWARE = [
-    'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
-    'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'yacommon.middleware.SecurityMiddleware',
+    'yacommon.middleware.SessionMiddleware',
+    'yacommon.middleware.CommonMiddleware',
+    'yacommon.middleware.CsrfViewMiddleware',
+    'yacommon.middleware.AuthenticationMiddleware',
+    'yacommon.middleware.MessageMiddleware',
+    'yacommon.middleware.XFrameOptionsMiddleware',
+    'yacommon.middleware.ServerTimingMiddleware',
 ]
 
 ROOT_URLCONF = 'yanews.urls'
@@ -36,7 +40,6 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -44,9 +47,18 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            'loaders': [
+                ('yacommon.templating.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
+# Производственный режим шаблонов: кэш даже при DEBUG и компиляция
+# всех шаблонов при старте, см. yacommon.templating.
+TEMPLATE_PRODUCTION_MODE = False
 
 WSGI_APPLICATION = 'yanews.wsgi.application'
 
@@ -57,6 +69,73 @@ DATABASES = {
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 }
+# Производственный режим SQLite: WAL, прагмы и единственный поток
+# для записей, см. yacommon.sqlite.
+SQLITE_PRODUCTION_MODE = False
+
+# Каталог файловых кэшей, общих для процессов сервера. Тесты подменяют
+# его через переменную окружения, см. yacommon.isolated_caches.
+CACHE_DIR_VARIABLE = 'YANEWS_CACHE_DIR'
+CACHE_DIR = Path(os.environ.get(CACHE_DIR_VARIABLE, BASE_DIR / 'cache'))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Версии групп страниц, см. news.cache.get_version. Общие для всех
+    # процессов сервера: запись в одном процессе сбрасывает страницы,
+    # фрагменты и ETag во всех.
+    'versions': {
+        'BACKEND': 'yacommon.cache.VersionFileCache',
+        'LOCATION': CACHE_DIR / 'versions',
+    },
+    # Кэш страниц для анонимных читателей, свой у каждого процесса.
+    # Ключи включают общие версии, поэтому устаревшую страницу не отдаст
+    # ни один процесс.
+    'pages': {
+        'BACKEND': 'news.cache.SizedLocMemCache',
+        'LOCATION': 'pages',
+        'TIMEOUT': 600,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+            'MAX_SIZE': 64 * 1024 * 1024,
+        },
+    },
+}
+
+
+# Корень логгеров общих модулей yacommon: yanews.timing, yanews.templates.
+PROJECT_LOGGER = 'yanews'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'yanews.timing': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+        'yanews.templates': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+        },
+    },
+}
+
+# Асинхронные представления главной и страницы новости, см. news.views.
+# Включаются под ASGI: yanews.asgi задаёт переменную окружения.
+ASYNC_VIEWS = os.environ.get('YANEWS_ASYNC_VIEWS') == '1'
+
+# Доля запросов, для которых замеряется время этапов обработки. Каждый
+# замер пишет строку в лог, поэтому в бою замеряется один запрос из ста.
+REQUEST_TIMING_SAMPLE_RATE = 1.0 if DEBUG else 0.01
+# С какой длительности запроса в миллисекундах логировать его план.
+REQUEST_TIMING_SLOW_QUERY_MS = 100
 
 
 AUTH_PASSWORD_VALIDATORS = []
@@ -80,3 +159,24 @@ LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('news:home')
 
 NEWS_COUNT_ON_HOME_PAGE = 10
+COMMENTS_COUNT_ON_DETAIL_PAGE = 50
+NEWS_COUNT_ON_SEARCH_PAGE = 10
+# Сколько лучших совпадений ранжирует и кэширует поиск.
+NEWS_SEARCH_RESULTS = 1000
+# Сколько секунд живут результаты поиска: за это время в них попадают
+# новые и удалённые комментарии, которые кэш поиска не сбрасывают.
+NEWS_SEARCH_CACHE_TIMEOUT = 60
+NEWS_PAGE_CACHE = 'pages'
+NEWS_VERSION_CACHE = 'versions'
+# Живая лента комментариев (SSE под ASGI), см. news.live и news.events.
+# Для нескольких процессов нужен межпроцессный брокер с интерфейсом
+# news.events.LocalBroker.
+NEWS_EVENTS_BROKER = 'news.events.LocalBroker'
+# Открытых потоков событий на процесс.
+NEWS_EVENTS_MAX_CONNECTIONS = 1000
+# Сколько событий ждут отставшего читателя, прежде чем поток закроется.
+NEWS_EVENTS_QUEUE_SIZE = 100
+# Период пинга в открытом потоке, в секундах.
+NEWS_EVENTS_HEARTBEAT = 15
+# Файл с дополнительными запрещёнными словами, по одному на строку.
+NEWS_BAD_WORDS_FILE = None
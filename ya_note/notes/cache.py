@@ -0,0 +1,95 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.utils.cache import get_conditional_response
+
+from .models import Note
+
+
+def get_notes_version_key(user_id):
+    return f'notes:{user_id}:version'
+
+
+def get_version_cache():
+    return caches[settings.NOTES_VERSION_CACHE]
+
+
+def get_notes_version(user_id):
+    """
+    Текущая версия заметок пользователя.
+
+    Версия — момент последнего изменения в наносекундах. Если её
+    вытеснили из кэша, создаётся новая, которая не совпадёт ни с одной
+    из прежних, поэтому устаревшие данные не вернутся. Версии лежат в
+    кэше NOTES_VERSION_CACHE, общем для процессов сервера.
+    """
+    key = get_notes_version_key(user_id)
+    version_cache = get_version_cache()
+    version = version_cache.get(key)
+    if version is None:
+        version_cache.add(key, time.time_ns(), None)
+        version = version_cache.get(key)
+    return version
+
+
+def bump_notes_version(user_id):
+    get_version_cache().set(
+        get_notes_version_key(user_id), time.time_ns(), None
+    )
+
+
+def get_notes_total(user_id):
+    """Число заметок пользователя, пересчитывается после изменений."""
+    return cache.get_or_set(
+        f'notes:{user_id}:total:{get_notes_version(user_id)}',
+        lambda: Note.objects.filter(author_id=user_id).count(),
+    )
+
+
+def get_notes_etag(request, version):
+    """
+    Значение ETag без рендеринга: путь, пользователь и версия заметок.
+
+    В ETag входит и секрет CSRF: после нового входа страница с прежним
+    токеном в формах не должна считаться актуальной.
+    """
+    parts = (
+        request.get_full_path(), str(request.user.pk), str(version),
+        request.META.get('CSRF_COOKIE', ''),
+    )
+    return '"%s"' % hashlib.md5(':'.join(parts).encode()).hexdigest()
+
+
+class ConditionalNotesMixin:
+    """
+    Отвечает 304 на повторный запрос, если заметки не менялись.
+
+    ETag строится по версии заметок пользователя до работы view и
+    шаблона: ответ 304 стоит только чтения сессии и пользователя.
+    Last-Modified не отдаётся — страница своя у каждого пользователя,
+    и проверять её надёжнее по ETag. Ставится после LoginRequiredMixin.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        version = get_notes_version(request.user.pk)
+        not_modified = get_conditional_response(
+            request, etag=get_notes_etag(request, version)
+        )
+        if not_modified is not None:
+            not_modified['ETag'] = get_notes_etag(request, version)
+            return not_modified
+        response = super().dispatch(request, *args, **kwargs)
+
+        def validate(response):
+            if response.status_code == 200:
+                response['ETag'] = get_notes_etag(request, version)
+
+        if callable(getattr(response, 'render', None)):
+            response.add_post_render_callback(validate)
+        else:
+            validate(response)
+        return response
@@ -0,0 +1,196 @@
+"""
+Выгрузка всех заметок пользователя.
+
+Заметки читаются пачками по ключу (author, id), как в pagination.py:
+каждая пачка — отдельный короткий запрос. Ни память процесса, ни
+открытое чтение SQLite не растут с числом заметок. Ответ собирается во
+временном файле до отправки, поэтому чтение базы не зависит от того,
+как медленно клиент скачивает выгрузку.
+"""
+import csv
+import json
+import struct
+import time
+import zlib
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+
+from .models import Note
+
+FIELDS = ('slug', 'title', 'text')
+# Ответ отдаётся кусками не меньше этого размера, а не по строке.
+CHUNK_SIZE = 64 * 1024
+# Центральный каталог zip уходит на диск, когда перерастает этот размер.
+DIRECTORY_MEMORY = 1024 * 1024
+# То же для готовой выгрузки, см. export_to_file().
+EXPORT_MEMORY = 1024 * 1024
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP64_COUNT_LIMIT = 0xFFFF
+UTF8_NAMES = 0x800
+DEFLATED = 8
+
+
+def iter_notes(author_id, batch_size=None):
+    """Кортежи FIELDS всех заметок автора в порядке создания."""
+    size = batch_size or settings.NOTES_EXPORT_BATCH_SIZE
+    notes = Note.objects.filter(author_id=author_id).order_by(
+        'pk'
+    ).values_list('pk', *FIELDS)
+    last_pk = 0
+    while True:
+        batch = list(notes.filter(pk__gt=last_pk)[:size])
+        for row in batch:
+            yield row[1:]
+        if len(batch) < size:
+            return
+        last_pk = batch[-1][0]
+
+
+def buffered(chunks):
+    """Склеивает мелкие куски в куски не меньше CHUNK_SIZE."""
+    buffer = []
+    length = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= CHUNK_SIZE:
+            yield b''.join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def to_ndjson(notes):
+    for note in notes:
+        yield json.dumps(
+            dict(zip(FIELDS, note)), ensure_ascii=False
+        ).encode() + b'\n'
+
+
+class Echo:
+    """Файл для csv.writer, который возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def to_csv(notes):
+    writer = csv.writer(Echo())
+    yield writer.writerow(FIELDS).encode()
+    for note in notes:
+        yield writer.writerow(note).encode()
+
+
+def dos_date_time(moment):
+    return (
+        (moment.tm_year - 1980) << 9 | moment.tm_mon << 5 | moment.tm_mday,
+        moment.tm_hour << 11 | moment.tm_min << 5 | moment.tm_sec // 2,
+    )
+
+
+class ZipStream:
+    """
+    Zip-архив, который пишется потоком, без перемотки назад.
+
+    Файл сжимается в памяти целиком, поэтому CRC и размеры известны до
+    заголовка. Записи центрального каталога копятся во временном файле,
+    а не в списке объектов, и выдаются в конце архива. При 65535 и
+    более файлах или смещениях за 4 ГБ добавляются записи ZIP64.
+    """
+
+    def __init__(self):
+        self.offset = 0
+        self.count = 0
+        self.directory = SpooledTemporaryFile(max_size=DIRECTORY_MEMORY)
+        self.date, self.time = dos_date_time(time.localtime())
+
+    def add(self, name, data):
+        """Байты локального заголовка и сжатого содержимого файла."""
+        name = name.encode()
+        compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        compressed = compressor.compress(data) + compressor.flush()
+        crc = zlib.crc32(data)
+        header = struct.pack(
+            '<IHHHHHIIIHH', 0x04034b50, 20, UTF8_NAMES, DEFLATED,
+            self.time, self.date, crc, len(compressed), len(data),
+            len(name), 0,
+        )
+        extra = b''
+        offset = self.offset
+        if offset >= ZIP64_LIMIT:
+            extra = struct.pack('<HHQ', 1, 8, offset)
+            offset = ZIP64_LIMIT
+        self.directory.write(struct.pack(
+            '<IHHHHHHIIIHHHHHII', 0x02014b50, 45, 45 if extra else 20,
+            UTF8_NAMES, DEFLATED, self.time, self.date, crc,
+            len(compressed), len(data), len(name), len(extra), 0, 0, 0,
+            0o644 << 16, offset,
+        ) + name + extra)
+        self.count += 1
+        self.offset += len(header) + len(name) + len(compressed)
+        return header + name + compressed
+
+    def finish(self):
+        """Центральный каталог и завершающие записи архива."""
+        directory_size = self.directory.tell()
+        self.directory.seek(0)
+        yield from iter(lambda: self.directory.read(CHUNK_SIZE), b'')
+        self.directory.close()
+        end = b''
+        count, size, offset = self.count, directory_size, self.offset
+        if (
+            count >= ZIP64_COUNT_LIMIT
+            or size >= ZIP64_LIMIT
+            or offset >= ZIP64_LIMIT
+        ):
+            end = struct.pack(
+                '<IQHHIIQQQQ', 0x06064b50, 44, 45, 45, 0, 0, count, count,
+                size, offset,
+            ) + struct.pack(
+                '<IIQI', 0x07064b50, 0, offset + directory_size, 1
+            )
+            count = min(count, ZIP64_COUNT_LIMIT)
+            size = min(size, ZIP64_LIMIT)
+            offset = min(offset, ZIP64_LIMIT)
+        yield end + struct.pack(
+            '<IHHHHIIH', 0x06054b50, 0, 0, count, count, size, offset, 0
+        )
+
+
+def to_zip(notes):
+    """Zip с файлом Markdown на каждую заметку, имя файла — slug."""
+    archive = ZipStream()
+    for slug, title, text in notes:
+        yield archive.add(f'{slug}.md', f'# {title}\n\n{text}\n'.encode())
+    yield from archive.finish()
+
+
+# Формат выгрузки: тип содержимого и преобразование заметок в байты.
+FORMATS = {
+    'ndjson': ('application/x-ndjson', to_ndjson),
+    'csv': ('text/csv; charset=utf-8', to_csv),
+    'zip': ('application/zip', to_zip),
+}
+
+
+def export_notes(author_id, export_format):
+    """Куски байтов выгрузки заметок автора в формате из FORMATS."""
+    _, convert = FORMATS[export_format]
+    return buffered(convert(iter_notes(author_id)))
+
+
+def export_to_file(author_id, export_format):
+    """
+    Выгрузка во временном файле, перемотанном к началу.
+
+    Под ASGI Django 3.2 перебирает потоковый ответ прямо в цикле
+    событий, где запросы к базе запрещены, поэтому заметки читаются
+    до ответа, в потоке view. Файл перерастает EXPORT_MEMORY на диск.
+    """
+    file = SpooledTemporaryFile(max_size=EXPORT_MEMORY)
+    for chunk in export_notes(author_id, export_format):
+        file.write(chunk)
+    file.seek(0)
+    return file
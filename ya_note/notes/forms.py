@@ -1,8 +1,8 @@
-from pytils.translit import slugify
-
 from django import forms
-from django.core.exceptions import ValidationError
+from django.conf import settings
+from django.template.defaultfilters import filesizeformat
 
+from .imports import READERS
 from .models import Note
 
 WARNING = ' - такой slug уже существует, придумайте уникальное значение!'
@@ -15,15 +15,35 @@ class NoteForm(forms.ModelForm):
         model = Note
         fields = ('title', 'text', 'slug')
 
-    def clean_slug(self):
-        """Обрабатывает случай, если slug не уникален."""
-        cleaned_data = super().clean()
-        slug = cleaned_data.get('slug')
-        if not slug:
-            title = cleaned_data.get('title')
-            slug = slugify(title)[:100]
-        if Note.objects.filter(
-                slug=slug
-        ).exclude(id=self.instance.pk).exists():
-            raise ValidationError(slug + WARNING)
-        return slug
+    def validate_unique(self):
+        """
+        Уникальность slug проверяет индекс при сохранении.
+
+        Пустой slug Note.save() заменит свободным, а занятый заданный
+        slug представление превратит в ошибку формы через slug_taken().
+        Других уникальных полей у заметки нет.
+        """
+
+    def slug_taken(self):
+        """Добавляет ошибку занятого slug после неудачного сохранения."""
+        self.add_error('slug', (self.cleaned_data['slug'] or '') + WARNING)
+
+
+class ImportForm(forms.Form):
+    """Форма загрузки файла с заметками."""
+
+    file = forms.FileField(label='Файл')
+    import_format = forms.ChoiceField(
+        label='Формат',
+        choices=[(name, name.upper()) for name in READERS],
+        help_text='Файл в формате выгрузки заметок',
+    )
+
+    def clean_file(self):
+        file = self.cleaned_data['file']
+        if file.size > settings.NOTES_IMPORT_MAX_SIZE:
+            raise forms.ValidationError(
+                'Файл больше '
+                f'{filesizeformat(settings.NOTES_IMPORT_MAX_SIZE)}'
+            )
+        return file
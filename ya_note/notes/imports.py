@@ -0,0 +1,237 @@
+"""
+Пакетная загрузка заметок из файлов выгрузки notes.export.
+
+Файл читается потоково и записывается пачками через bulk_create: на
+пачку приходится один запрос занятых slug и вставка. Загрузка идёт в
+фоновом потоке процесса, принявшего файл, а ход выполнения хранится в
+кэше NOTES_IMPORT_CACHE. Страницу статуса может отдать любой процесс
+сервера, поэтому этот кэш должен быть общим для них, а не локальным.
+"""
+import csv
+import io
+import json
+import logging
+import os
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import NamedTemporaryFile
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.validators import slug_re
+from django.db import connections
+
+from yacommon.sqlite import writer
+
+from .cache import bump_notes_version
+from .models import Note
+from .slugs import bulk_create_with_unique_slugs
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_TIMEOUT = 24 * 60 * 60
+
+_executor = None
+_executor_lock = Lock()
+
+
+def read_ndjson(file):
+    for line in io.TextIOWrapper(file, encoding='utf-8'):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+
+def read_csv(file):
+    yield from csv.DictReader(
+        io.TextIOWrapper(file, encoding='utf-8', newline='')
+    )
+
+
+def read_member(archive, info, max_size):
+    """
+    Содержимое файла архива или None, если оно больше max_size байт.
+
+    Размер в заголовке архива может быть ложным, поэтому распаковка
+    останавливается на max_size + 1 байте: маленький архив не
+    развернётся в гигабайты памяти.
+    """
+    if info.file_size > max_size:
+        return None
+    with archive.open(info) as member:
+        data = member.read(max_size + 1)
+    return None if len(data) > max_size else data
+
+
+def read_zip(file):
+    """
+    Заметки из файлов Markdown: slug — имя файла, заголовок — # ...
+
+    Файлы больше NOTES_IMPORT_MAX_NOTE_SIZE и файлы сверх
+    NOTES_IMPORT_MAX_FILES считаются битыми строками.
+    """
+    with zipfile.ZipFile(file) as archive:
+        for index, info in enumerate(archive.infolist()):
+            if info.is_dir() or not info.filename.endswith('.md'):
+                continue
+            data = None
+            if index < settings.NOTES_IMPORT_MAX_FILES:
+                data = read_member(
+                    archive, info, settings.NOTES_IMPORT_MAX_NOTE_SIZE
+                )
+            if data is None:
+                yield None
+                continue
+            content = data.decode('utf-8')
+            title = ''
+            if content.startswith('# '):
+                title, _, content = content[2:].partition('\n')
+                content = content[1:] if content[:1] == '\n' else content
+            yield {
+                'slug': os.path.basename(info.filename)[:-len('.md')],
+                'title': title,
+                'text': content[:-1] if content[-1:] == '\n' else content,
+            }
+
+
+READERS = {
+    'ndjson': read_ndjson,
+    'csv': read_csv,
+    'zip': read_zip,
+}
+
+
+def build_note(row, author_id):
+    """Несохранённая заметка из строки файла или None для битой строки."""
+    if not isinstance(row, dict) or not row.get('text'):
+        return None
+    title = Note._meta.get_field('title')
+    slug = str(row.get('slug') or '')
+    return Note(
+        title=str(row.get('title') or title.default)[:title.max_length],
+        text=str(row['text']),
+        slug=slug if slug_re.fullmatch(slug) else '',
+        author_id=author_id,
+    )
+
+
+def import_notes(author_id, file, import_format, on_progress=None):
+    """
+    Загружает заметки из файла пачками по NOTES_IMPORT_BATCH_SIZE.
+
+    Пачка пишется через очередь записей одной транзакцией. После каждой
+    пачки сбрасывается версия заметок автора и вызывается on_progress
+    со счётчиками: загружено, переименовано, пропущено строк.
+    """
+    progress = {'imported': 0, 'renamed': 0, 'errors': 0}
+    batch = []
+
+    def flush():
+        progress['renamed'] += writer.run(
+            bulk_create_with_unique_slugs, batch
+        )
+        progress['imported'] += len(batch)
+        batch.clear()
+        bump_notes_version(author_id)
+        if on_progress:
+            on_progress(dict(progress))
+
+    for row in READERS[import_format](file):
+        note = build_note(row, author_id)
+        if note is None:
+            progress['errors'] += 1
+            continue
+        batch.append(note)
+        if len(batch) >= settings.NOTES_IMPORT_BATCH_SIZE:
+            flush()
+    if batch:
+        flush()
+    return progress
+
+
+def get_progress_cache():
+    return caches[settings.NOTES_IMPORT_CACHE]
+
+
+def get_progress_key(job_id):
+    return f'notes:import:{job_id}'
+
+
+def get_progress(job_id, author_id):
+    """Ход загрузки или None, если её нет или она чужая."""
+    progress = get_progress_cache().get(get_progress_key(job_id))
+    if progress is None or progress['author_id'] != author_id:
+        return None
+    return progress
+
+
+def set_progress(job_id, author_id, status, **counters):
+    get_progress_cache().set(get_progress_key(job_id), {
+        'author_id': author_id, 'status': status, **counters,
+    }, PROGRESS_TIMEOUT)
+
+
+def run_import(job_id, author_id, path, import_format):
+    try:
+        with open(path, 'rb') as file:
+            progress = import_notes(
+                author_id, file, import_format,
+                lambda progress: set_progress(
+                    job_id, author_id, 'running', **progress
+                ),
+            )
+        set_progress(job_id, author_id, 'done', **progress)
+    except Exception:
+        logger.exception('Загрузка заметок %s не удалась', job_id)
+        progress = get_progress_cache().get(get_progress_key(job_id), {})
+        set_progress(job_id, author_id, 'failed', **{
+            counter: progress.get(counter, 0)
+            for counter in ('imported', 'renamed', 'errors')
+        })
+    finally:
+        os.remove(path)
+
+
+def run_in_background(*args):
+    """Загрузка в потоке пула: соединения потока закрываются после неё."""
+    try:
+        run_import(*args)
+    finally:
+        connections.close_all()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.NOTES_IMPORT_WORKERS,
+                thread_name_prefix='notes-import',
+            )
+        return _executor
+
+
+def start_import(author_id, uploaded, import_format):
+    """
+    Ставит загрузку файла в очередь и возвращает id задачи.
+
+    Загруженный файл копируется во временный: Django удалит свой после
+    ответа. При NOTES_IMPORT_WORKERS = 0 загрузка идёт сразу.
+    """
+    job_id = uuid.uuid4().hex
+    with NamedTemporaryFile(delete=False) as copy:
+        for chunk in uploaded.chunks():
+            copy.write(chunk)
+    set_progress(job_id, author_id, 'queued', imported=0, renamed=0,
+                 errors=0)
+    args = (job_id, author_id, copy.name, import_format)
+    if settings.NOTES_IMPORT_WORKERS:
+        get_executor().submit(run_in_background, *args)
+    else:
+        run_import(*args)
+    return job_id
@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.export import FORMATS, export_notes
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает все заметки пользователя в файл: NDJSON, CSV или zip '
+        'с файлами Markdown.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('output', help='Путь к файлу выгрузки.')
+        parser.add_argument(
+            '--format', dest='export_format', choices=FORMATS,
+            default='ndjson',
+        )
+
+    def handle(self, *args, username, output, export_format, **options):
+        user_model = get_user_model()
+        try:
+            author_id = user_model.objects.values_list(
+                'pk', flat=True
+            ).get(username=username)
+        except user_model.DoesNotExist:
+            raise CommandError(f'Пользователь {username} не найден')
+        written = 0
+        with open(output, 'wb') as file:
+            for chunk in export_notes(author_id, export_format):
+                file.write(chunk)
+                written += len(chunk)
+        if options['verbosity']:
+            self.stdout.write(f'Записано {written} байт в {output}')
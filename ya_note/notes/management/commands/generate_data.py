@@ -0,0 +1,145 @@
+import time
+from itertools import accumulate
+from multiprocessing import Pool
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from notes.models import Note
+from notes.search import optimize_index
+from notes.translit import slugify
+from yacommon.generation import build_vocabulary, chunk_random, chunks
+
+WORDS = (
+    'купить', 'молоко', 'хлеб', 'позвонить', 'маме', 'врачу', 'записаться',
+    'встреча', 'проект', 'отчёт', 'отпуск', 'билеты', 'поезд', 'гостиница',
+    'книга', 'прочитать', 'фильм', 'посмотреть', 'рецепт', 'пирог', 'идея',
+    'подарок', 'день', 'рождения', 'список', 'дела', 'работа', 'дом',
+    'ремонт', 'кухня', 'оплатить', 'счёт', 'интернет', 'квартира', 'машина',
+    'шины', 'сменить', 'спорт', 'тренировка', 'бассейн', 'английский',
+    'урок', 'задание', 'план', 'неделя', 'месяц', 'важно', 'срочно',
+    'завтра', 'вечером', 'утром', 'обязательно', 'не', 'забыть', 'снова',
+)
+VOCABULARY, VOCABULARY_WEIGHTS = build_vocabulary(WORDS)
+
+_user_ids = None
+_cum_weights = None
+
+
+def words(rng, min_count, max_count):
+    return ' '.join(rng.choices(
+        VOCABULARY, cum_weights=VOCABULARY_WEIGHTS,
+        k=rng.randint(min_count, max_count),
+    ))
+
+
+def text_length(rng):
+    """Длина текста заметки: обычно десятки слов, изредка до тысячи."""
+    return min(1000, 5 + int(rng.lognormvariate(3.5, 1.0)))
+
+
+def init_worker(user_ids, skew):
+    """
+    Готовит процесс к генерации заметок.
+
+    Вес автора убывает как 1 / rank ** skew: у немногих пользователей
+    тысячи заметок, у большинства — единицы.
+    """
+    global _user_ids, _cum_weights
+    _user_ids = user_ids
+    _cum_weights = list(accumulate(
+        1 / (rank ** skew) for rank in range(1, len(user_ids) + 1)
+    ))
+
+
+def build_notes(task):
+    seed, index, start, size = task
+    rng = chunk_random(seed, 'notes', index)
+    notes = []
+    authors = rng.choices(_user_ids, cum_weights=_cum_weights, k=size)
+    for number, author_id in enumerate(authors, start):
+        title = words(rng, 1, 8).capitalize()[:100]
+        length = text_length(rng)
+        notes.append((
+            title,
+            words(rng, length, length).capitalize(),
+            f'{slugify(title)[:80]}-{seed}-{number}',
+            author_id,
+        ))
+    return notes
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует пользователей и заметки для нагрузочного тестирования. '
+        'При одинаковом --seed данные совпадают.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--notes', type=int, default=100000)
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Показатель распределения Ципфа для числа заметок.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--prefix', default='user-',
+            help='Префикс имён пользователей.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Строк в одной пачке bulk_create и транзакции.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Процессов для генерации заметок.',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        user_ids = self.create_users(options)
+        self.create_notes(options, user_ids)
+        optimize_index()
+        if options['verbosity']:
+            self.stdout.write(
+                f'Создано: пользователей {len(user_ids)}, заметок '
+                f'{options["notes"]} за {time.monotonic() - started:.1f} с'
+            )
+
+    def create_users(self, options):
+        user_model = get_user_model()
+        prefix = options['prefix']
+        for _, start, size in chunks(options['users'], options['batch_size']):
+            with transaction.atomic():
+                user_model.objects.bulk_create(
+                    user_model(username=f'{prefix}{number}', password='!')
+                    for number in range(start, start + size)
+                )
+        return list(user_model.objects.filter(
+            username__startswith=prefix
+        ).order_by('pk').values_list('pk', flat=True))
+
+    def create_notes(self, options, user_ids):
+        tasks = [
+            (options['seed'], index, start, size)
+            for index, start, size in chunks(
+                options['notes'], options['batch_size']
+            )
+        ]
+        initargs = (user_ids, options['skew'])
+        if options['workers'] > 1:
+            with Pool(options['workers'], init_worker, initargs) as pool:
+                self.insert_notes(pool.imap(build_notes, tasks))
+        else:
+            init_worker(*initargs)
+            self.insert_notes(map(build_notes, tasks))
+
+    def insert_notes(self, batches):
+        for batch in batches:
+            with transaction.atomic():
+                Note.objects.bulk_create(
+                    Note(title=title, text=text, slug=slug, author_id=author)
+                    for title, text, slug, author in batch
+                )
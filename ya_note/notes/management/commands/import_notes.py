@@ -0,0 +1,48 @@
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.imports import READERS, import_notes
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает заметки пользователя из файла выгрузки: NDJSON, CSV '
+        'или zip с файлами Markdown.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path', help='Путь к файлу с заметками.')
+        parser.add_argument(
+            '--format', dest='import_format', choices=READERS,
+            help='По умолчанию определяется по расширению файла.',
+        )
+
+    def handle(self, *args, username, path, import_format, **options):
+        import_format = import_format or Path(path).suffix[1:]
+        if import_format not in READERS:
+            raise CommandError('Укажите формат файла через --format')
+        user_model = get_user_model()
+        try:
+            author_id = user_model.objects.values_list(
+                'pk', flat=True
+            ).get(username=username)
+        except user_model.DoesNotExist:
+            raise CommandError(f'Пользователь {username} не найден')
+
+        def report(progress):
+            if options['verbosity'] > 1:
+                self.stdout.write(self.format(progress))
+
+        with open(path, 'rb') as file:
+            progress = import_notes(author_id, file, import_format, report)
+        if options['verbosity']:
+            self.stdout.write(self.format(progress))
+
+    def format(self, progress):
+        return (
+            f'Загружено {progress["imported"]}, изменено slug '
+            f'{progress["renamed"]}, пропущено строк {progress["errors"]}'
+        )
@@ -0,0 +1,62 @@
+from django.db import migrations
+
+# Индекс FTS5 с внешним содержимым: тексты хранятся только в notes_note,
+# а триггеры обновляют индекс при любой записи, включая bulk_create.
+# author_id индексируется как отдельная колонка, чтобы поиск по
+# заметкам пользователя сужался внутри индекса, а неиндексируемый slug
+# читается из notes_note по rowid — соединять таблицы не нужно.
+# Миграции, пересоздающие notes_note на SQLite, удаляют триггеры —
+# после них нужно повторить CREATE_TRIGGERS.
+CREATE_INDEX = (
+    "CREATE VIRTUAL TABLE notes_note_fts USING fts5("
+    "title, text, author_id, slug UNINDEXED, "
+    "content='notes_note', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+)
+CREATE_TRIGGERS = (
+    "CREATE TRIGGER notes_note_fts_insert AFTER INSERT ON notes_note BEGIN "
+    "INSERT INTO notes_note_fts(rowid, title, text, author_id, slug) "
+    "VALUES (new.id, new.title, new.text, new.author_id, new.slug); END",
+    "CREATE TRIGGER notes_note_fts_delete AFTER DELETE ON notes_note BEGIN "
+    "INSERT INTO notes_note_fts(notes_note_fts, rowid, title, text, "
+    "author_id, slug) VALUES ('delete', old.id, old.title, old.text, "
+    "old.author_id, old.slug); END",
+    "CREATE TRIGGER notes_note_fts_update "
+    "AFTER UPDATE OF title, text, author_id ON notes_note BEGIN "
+    "INSERT INTO notes_note_fts(notes_note_fts, rowid, title, text, "
+    "author_id, slug) VALUES ('delete', old.id, old.title, old.text, "
+    "old.author_id, old.slug); "
+    "INSERT INTO notes_note_fts(rowid, title, text, author_id, slug) "
+    "VALUES (new.id, new.title, new.text, new.author_id, new.slug); END",
+)
+REBUILD = (
+    "INSERT INTO notes_note_fts(notes_note_fts) VALUES ('rebuild')",
+)
+DROP = (
+    'DROP TRIGGER IF EXISTS notes_note_fts_insert',
+    'DROP TRIGGER IF EXISTS notes_note_fts_delete',
+    'DROP TRIGGER IF EXISTS notes_note_fts_update',
+    'DROP TABLE IF EXISTS notes_note_fts',
+)
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0002_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run(CREATE_INDEX + CREATE_TRIGGERS + REBUILD), run(DROP)
+        ),
+    ]
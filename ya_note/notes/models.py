@@ -1,7 +1,9 @@
+from functools import partial
+
 from django.conf import settings
 from django.db import models
 
-from pytils.translit import slugify
+from .slugs import save_with_unique_slug
 
 
 class Note(models.Model):
@@ -26,13 +28,25 @@ class Note(models.Model):
     author = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
+        # Отдельный индекс не нужен: author стоит первым в составном.
+        db_index=False,
     )
 
+    class Meta:
+        indexes = (
+            # Заметки пользователя в порядке создания. Поиск по slug
+            # обслуживает уникальный индекс самого slug.
+            models.Index(fields=('author', 'id'), name='note_author_idx'),
+        )
+
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            max_slug_length = self._meta.get_field('slug').max_length
-            self.slug = slugify(self.title)[:max_slug_length]
-        super().save(*args, **kwargs)
+        """
+        Пустой slug заменяется свободным slug из заголовка.
+
+        Занятость не проверяется отдельным запросом, конфликт
+        обнаруживает уникальный индекс — см. notes.slugs.
+        """
+        save_with_unique_slug(self, partial(super().save, *args, **kwargs))
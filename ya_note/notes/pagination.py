@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.http import Http404
+
+from .models import Note
+
+# Наибольшее значение BigAutoField: больший id не влезет в INTEGER базы.
+MAX_ID = 2 ** 63 - 1
+
+
+def decode_cursor(cursor):
+    """
+    Id из курсора.
+
+    Курсор приходит из адреса, поэтому проверяется и диапазон: id вне
+    BigAutoField уронил бы запрос с OverflowError.
+    """
+    try:
+        pk = int(cursor)
+    except ValueError:
+        raise Http404('Некорректный курсор заметок')
+    if not 0 <= pk <= MAX_ID:
+        raise Http404('Некорректный курсор заметок')
+    return pk
+
+
+def get_notes_page(author, cursor=None):
+    """
+    Возвращает страницу заметок автора после курсора и курсор следующей.
+
+    Курсор — id последней заметки страницы: выборка идёт по индексу
+    (author, id) без OFFSET, поэтому любая страница стоит столько же,
+    сколько первая. Текст заметок для списка не загружается.
+    """
+    size = settings.NOTES_COUNT_ON_LIST_PAGE
+    notes = Note.objects.filter(author=author).only(
+        'id', 'slug', 'title'
+    ).order_by('pk')
+    if cursor:
+        notes = notes.filter(pk__gt=decode_cursor(cursor))
+    page = list(notes[:size + 1])
+    if len(page) > size:
+        return page[:size], page[size - 1].pk
+    return page, None
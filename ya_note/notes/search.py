@@ -0,0 +1,91 @@
+"""
+Полнотекстовый поиск по заметкам через индекс SQLite FTS5.
+
+Индекс notes_note_fts создаёт миграция 0003_note_search. Слова запроса
+приводятся к основе и ищутся как префиксы, поэтому «заметки» находит
+и «заметка», и «заметку».
+"""
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from yacommon.search import build_match, optimize_tables
+
+# Границы найденных слов в выдаче FTS5, заменяются на <mark>.
+MARK_START = '\x02'
+MARK_END = '\x03'
+# ORDER BY rank сортирует сам FTS5, поэтому highlight() и snippet()
+# считаются только для возвращаемых строк, а не для всех найденных.
+SEARCH_SQL = (
+    "SELECT rowid, slug, "
+    "highlight(notes_note_fts, 0, char(2), char(3)), "
+    "snippet(notes_note_fts, 1, char(2), char(3), '…', 16) "
+    "FROM notes_note_fts "
+    "WHERE notes_note_fts MATCH %s AND rowid >= %s "
+    # Совпадение в заголовке весит в 10 раз больше, чем в тексте.
+    "AND rank MATCH 'bm25(10.0, 1.0, 0.0, 0.0)' "
+    "ORDER BY rank LIMIT %s"
+)
+
+# Самая старая заметка среди NOTES_SEARCH_CANDIDATES новейших найденных.
+# bm25 считается для каждой найденной строки, и по частому слову у автора
+# с сотнями тысяч заметок ранжирование всех совпадений заняло бы сотни
+# миллисекунд, поэтому ранжируются только новейшие кандидаты.
+BOUND_SQL = (
+    "SELECT rowid FROM notes_note_fts "
+    "WHERE notes_note_fts MATCH %s "
+    "ORDER BY rowid DESC LIMIT 1 OFFSET %s"
+)
+
+SearchResult = namedtuple('SearchResult', 'id slug title snippet')
+
+
+def build_query(author_id, text):
+    """
+    Запрос FTS5 по заметкам автора или None, если искать нечего.
+
+    Слова ищутся только в заголовке и тексте: без фильтра колонок
+    запрос «15» нашёл бы все заметки пользователя с id 15.
+    """
+    match = build_match(text)
+    if match is None:
+        return None
+    return f'author_id:"{author_id}" AND {{title text}}: ({match})'
+
+
+def highlight(text):
+    html = escape(text).replace(MARK_START, '<mark>')
+    return mark_safe(html.replace(MARK_END, '</mark>'))
+
+
+def search_notes(author_id, text, limit=None):
+    """
+    Заметки автора по убыванию релевантности с подсветкой слов.
+
+    Если совпадений больше NOTES_SEARCH_CANDIDATES, ранжируются только
+    новейшие из них.
+    """
+    query = build_query(author_id, text)
+    if query is None:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            BOUND_SQL, (query, settings.NOTES_SEARCH_CANDIDATES - 1)
+        )
+        bound = cursor.fetchone()
+        cursor.execute(SEARCH_SQL, (
+            query, bound[0] if bound else 0,
+            limit or settings.NOTES_SEARCH_RESULTS,
+        ))
+        return [
+            SearchResult(pk, slug, highlight(title), highlight(snippet))
+            for pk, slug, title, snippet in cursor.fetchall()
+        ]
+
+
+def optimize_index():
+    """Сливает сегменты индекса после массовой загрузки."""
+    optimize_tables('notes_note_fts')
@@ -0,0 +1,163 @@
+"""
+Выделение уникальных slug без предварительной проверки занятости.
+
+Заметка сразу записывается с желаемым slug, поэтому свободный slug не
+стоит ни одного лишнего запроса. Занятый slug обнаруживает уникальный
+индекс: заданный пользователем slug превращается в ошибку формы, а к
+автоматическому добавляется случайный суффикс. Суффикс случайный, а не
+порядковый, чтобы параллельные запросы с одинаковым заголовком не
+пытались занять один и тот же следующий номер.
+"""
+import re
+import secrets
+from functools import lru_cache
+
+from django.db import IntegrityError, connection, transaction
+
+from .translit import slugify
+
+ATTEMPTS = 5
+SUFFIX_BYTES = 3
+
+
+class SlugTaken(IntegrityError):
+    """Slug занят, а подобрать свободный не удалось."""
+
+
+# Имя нарушенного ключа в ошибке MySQL: for key 'notes_note.slug'.
+MYSQL_KEY = re.compile(r"for key '(?:[^'.]*\.)?([^']+)'")
+
+
+@lru_cache(maxsize=None)
+def get_slug_constraints(model):
+    """Имена уникальных ограничений из одного столбца slug по схеме базы."""
+    column = model._meta.get_field('slug').column
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(
+            cursor, model._meta.db_table
+        )
+    return frozenset(
+        name for name, info in constraints.items()
+        if info['unique'] and info['columns'] == [column]
+    )
+
+
+def is_slug_conflict(error, model):
+    """
+    Нарушено ли ограничение уникальности slug, а не другое.
+
+    PostgreSQL и MySQL называют нарушенное ограничение, и оно
+    сверяется с ограничениями slug из схемы. SQLite имени не сообщает,
+    только таблицу и столбец.
+    """
+    if connection.vendor == 'sqlite':
+        column = model._meta.get_field('slug').column
+        return str(error) == (
+            f'UNIQUE constraint failed: {model._meta.db_table}.{column}'
+        )
+    diag = getattr(error.__cause__, 'diag', None)
+    name = getattr(diag, 'constraint_name', None)
+    if name is None:
+        match = MYSQL_KEY.search(str(error))
+        name = match and match.group(1)
+    return name in get_slug_constraints(model)
+
+
+def try_save(note, save):
+    """
+    Одна попытка записи: False, если slug занят.
+
+    Внутри транзакции запись идёт в точке сохранения: после ошибки
+    PostgreSQL не выполняет в транзакции ничего до отката к ней. Вне
+    транзакции неудавшийся оператор откатывается сам.
+    """
+    try:
+        if connection.in_atomic_block:
+            with transaction.atomic():
+                save()
+        else:
+            save()
+    except IntegrityError as error:
+        if not is_slug_conflict(error, type(note)):
+            raise
+        return False
+    return True
+
+
+def with_suffix(slug, max_length):
+    suffix = '-' + secrets.token_hex(SUFFIX_BYTES)
+    return slug[:max_length - len(suffix)] + suffix
+
+
+def save_with_unique_slug(note, save):
+    """
+    Сохраняет заметку, при пустом slug выбирая свободный по заголовку.
+
+    Свободный slug стоит одного запроса — самой записи. Заданный slug
+    не меняется, при конфликте выбрасывается SlugTaken.
+    """
+    if note.slug:
+        if not try_save(note, save):
+            raise SlugTaken(f'Slug {note.slug} уже занят')
+        return
+    max_length = note._meta.get_field('slug').max_length
+    base = slugify(note.title)[:max_length]
+    for attempt in range(ATTEMPTS):
+        note.slug = with_suffix(base, max_length) if attempt else base
+        if try_save(note, save):
+            return
+    note.slug = ''
+    raise SlugTaken(f'Не удалось подобрать свободный slug для {base}')
+
+
+def allocate_slugs(notes):
+    """
+    Делает slug пачки новых заметок уникальными одним запросом.
+
+    Пустой slug берётся из заголовка, как в save_with_unique_slug().
+    Slug, занятый в базе или другой заметкой пачки, получает случайный
+    суффикс. Возвращает число заметок, slug которых пришлось изменить.
+    """
+    max_length = notes[0]._meta.get_field('slug').max_length
+    for note in notes:
+        if not note.slug:
+            note.slug = slugify(note.title)[:max_length]
+    taken = set(type(notes[0]).objects.filter(
+        slug__in={note.slug for note in notes}
+    ).values_list('slug', flat=True))
+    renamed = 0
+    for note in notes:
+        if note.slug in taken:
+            note.slug = with_suffix(note.slug, max_length)
+            renamed += 1
+        taken.add(note.slug)
+    return renamed
+
+
+def bulk_create_with_unique_slugs(notes):
+    """
+    Записывает пачку новых заметок одной транзакцией.
+
+    Если между проверкой и записью slug занял параллельный запрос,
+    пачка откатывается и slug выбираются заново. Возвращает число
+    заметок, заданный slug которых пришлось изменить.
+    """
+    if not notes:
+        return 0
+    model = type(notes[0])
+    requested = [note.slug for note in notes]
+    for _ in range(ATTEMPTS):
+        allocate_slugs(notes)
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(notes)
+        except IntegrityError as error:
+            if not is_slug_conflict(error, model):
+                raise
+            continue
+        return sum(
+            note.slug != slug
+            for note, slug in zip(notes, requested)
+            if slug
+        )
+    raise SlugTaken('Не удалось подобрать свободные slug для пачки')
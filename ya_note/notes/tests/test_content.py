@@ -1,11 +1,31 @@
+import csv
+import io
+import json
+import zipfile
+from http import HTTPStatus
+
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
 from .test_utils import (
     BaseNoteTestCase,
     URL_NOTES_LIST,
+    URL_NOTES_SEARCH,
+    URL_SEARCH_API,
     URL_ADD_NOTE,
-    get_edit_url
+    get_edit_url,
+    get_export_url,
 )
 
+from notes.cache import bump_notes_version, get_version_cache
 from notes.forms import NoteForm
+from notes.models import Note
 
 
 class NoteContentTestCase(BaseNoteTestCase):
@@ -45,3 +65,257 @@ class NoteContentTestCase(BaseNoteTestCase):
                     form_class,
                     msg=f"На странице {url} ожидалась форма типа {form_class}."
                 )
+
+    def test_note_detail_shows_note_to_author(self):
+        """Автор видит свою заметку на отдельной странице."""
+        response = self.author_client.get(
+            reverse('notes:detail', args=(self.note.slug,))
+        )
+        self.assertEqual(response.context['note'], self.note)
+        self.assertContains(response, self.note.text)
+
+
+@override_settings(NOTES_COUNT_ON_LIST_PAGE=2)
+class NotesListPaginationTestCase(BaseNoteTestCase):
+    """Тесты постраничного списка заметок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Note.objects.bulk_create(
+            Note(title=f'Заметка {index}', text='Текст', slug=f'note-{index}',
+                 author=cls.author)
+            for index in range(4)
+        )
+
+    def setUp(self):
+        cache.clear()
+        get_version_cache().clear()
+
+    def test_pages_follow_cursor(self):
+        """Страницы идут по курсору и вместе содержат все заметки."""
+        seen = []
+        url = URL_NOTES_LIST
+        while url:
+            response = self.author_client.get(url)
+            seen += [note.pk for note in response.context['object_list']]
+            cursor = response.context['next_cursor']
+            url = cursor and f'{URL_NOTES_LIST}?after={cursor}'
+        self.assertEqual(
+            seen,
+            list(Note.objects.filter(
+                author=self.author
+            ).order_by('pk').values_list('pk', flat=True)),
+        )
+
+    def test_invalid_cursor_not_found(self):
+        """Нечисловой и слишком большой курсор дают 404, а не ошибку."""
+        for cursor in ('abc', str(2 ** 63), str(10 ** 30), '-1'):
+            with self.subTest(cursor=cursor):
+                response = self.author_client.get(
+                    URL_NOTES_LIST, {'after': cursor}
+                )
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_list_does_not_load_text(self):
+        """Текст заметок для списка не загружается."""
+        response = self.author_client.get(URL_NOTES_LIST)
+        for note in response.context['object_list']:
+            with self.subTest(note=note.pk):
+                self.assertIn('text', note.get_deferred_fields())
+
+    def test_list_cost_does_not_depend_on_notes_count(self):
+        """С сохранённым итогом страница стоит три запроса."""
+        self.author_client.get(URL_NOTES_LIST)
+        Note.objects.bulk_create(
+            Note(title='Ещё', text='Текст', slug=f'more-{index}',
+                 author=self.author)
+            for index in range(100)
+        )
+        # bulk_create() обходит сигналы, версию сбрасываем сами.
+        bump_notes_version(self.author.pk)
+        total = Note.objects.filter(author=self.author).count()
+        response = self.author_client.get(URL_NOTES_LIST)
+        self.assertEqual(response.context['notes_total'], total)
+        # Сессия, пользователь и страница заметок.
+        with self.assertNumQueries(3):
+            response = self.author_client.get(URL_NOTES_LIST)
+        self.assertEqual(response.context['notes_total'], total)
+
+    def test_total_follows_changes(self):
+        """Итог пересчитывается после создания и удаления заметки."""
+        response = self.author_client.get(URL_NOTES_LIST)
+        self.assertEqual(response.context['notes_total'], 5)
+        note = Note.objects.create(
+            title='Новая', text='Текст', slug='new', author=self.author
+        )
+        response = self.author_client.get(URL_NOTES_LIST)
+        self.assertEqual(response.context['notes_total'], 6)
+        note.delete()
+        response = self.author_client.get(URL_NOTES_LIST)
+        self.assertEqual(response.context['notes_total'], 5)
+
+
+class NoteSearchTestCase(BaseNoteTestCase):
+    """Тесты полнотекстового поиска по заметкам."""
+
+    def search(self, client, query, url=URL_NOTES_SEARCH):
+        return client.get(url, {'q': query})
+
+    def test_search_finds_other_word_forms(self):
+        """Поиск находит заметку по другой форме слова и подсвечивает его."""
+        response = self.search(self.author_client, 'заметками')
+        results = response.context['results']
+        self.assertEqual([result.slug for result in results], [self.note.slug])
+        self.assertIn('<mark>заметки</mark>', results[0].snippet)
+
+    def test_search_is_scoped_to_user(self):
+        """Чужие заметки в результаты не попадают."""
+        response = self.search(self.reader_client, 'заметки')
+        self.assertEqual(response.context['results'], [])
+
+    def test_search_ignores_author_id(self):
+        """Запрос из id пользователя не находит все его заметки."""
+        response = self.search(self.author_client, str(self.author.pk))
+        self.assertEqual(response.context['results'], [])
+
+    def test_index_follows_edit_and_delete(self):
+        """Индекс обновляется при правке и удалении заметки."""
+        self.note.text = 'Рецепт пирога'
+        self.note.save()
+        response = self.search(self.author_client, 'пироги')
+        self.assertEqual(len(response.context['results']), 1)
+        self.note.delete()
+        response = self.search(self.author_client, 'пироги')
+        self.assertEqual(response.context['results'], [])
+
+    def test_snippet_is_escaped(self):
+        """Текст заметки в выдаче экранируется, подсветка остаётся."""
+        self.note.text = '<script>заметка</script>'
+        self.note.save()
+        response = self.search(self.author_client, 'заметка')
+        self.assertContains(
+            response, '&lt;script&gt;<mark>заметка</mark>&lt;/script&gt;'
+        )
+
+    def test_search_api(self):
+        """API поиска отдаёт результаты в JSON."""
+        response = self.search(self.author_client, 'текст', URL_SEARCH_API)
+        self.assertEqual(
+            [result['url'] for result in response.json()['results']],
+            [reverse('notes:detail', args=(self.note.slug,))],
+        )
+
+    @override_settings(NOTES_SEARCH_CANDIDATES=2)
+    def test_only_newest_matches_are_ranked(self):
+        """При множестве совпадений ранжируются только новейшие."""
+        notes = Note.objects.bulk_create(
+            Note(
+                title=f'Заметка {number}', text='Текст', slug=f'n-{number}',
+                author=self.author,
+            )
+            for number in range(3)
+        )
+        response = self.search(self.author_client, 'заметка')
+        self.assertEqual(
+            {result.slug for result in response.context['results']},
+            {note.slug for note in notes[1:]},
+        )
+
+
+class NoteExportTestCase(BaseNoteTestCase):
+    """Тесты потоковой выгрузки заметок."""
+
+    def export(self, client, export_format):
+        response = client.get(get_export_url(export_format))
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_ndjson(self):
+        """NDJSON содержит только заметки пользователя."""
+        response, content = self.export(self.author_client, 'ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(
+            [json.loads(line) for line in content.splitlines()],
+            [{
+                'slug': self.note.slug,
+                'title': self.note.title,
+                'text': self.note.text,
+            }],
+        )
+        _, content = self.export(self.reader_client, 'ndjson')
+        self.assertEqual(content, b'')
+
+    def test_csv(self):
+        """CSV начинается с заголовка колонок."""
+        self.note.text = 'Строка, с "кавычками"\nи переносом'
+        self.note.save()
+        _, content = self.export(self.author_client, 'csv')
+        rows = list(csv.reader(io.StringIO(content.decode())))
+        self.assertEqual(rows, [
+            ['slug', 'title', 'text'],
+            [self.note.slug, self.note.title, self.note.text],
+        ])
+
+    def test_zip(self):
+        """Zip содержит файл Markdown на каждую заметку."""
+        response, content = self.export(self.author_client, 'zip')
+        self.assertIn('notes.zip', response['Content-Disposition'])
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(
+                archive.read(f'{self.note.slug}.md').decode(),
+                f'# {self.note.title}\n\n{self.note.text}\n',
+            )
+
+    def test_unknown_format(self):
+        """Неизвестный формат выгрузки — 404."""
+        response = self.author_client.get(get_export_url('xml'))
+        self.assertEqual(response.status_code, 404)
+
+
+class NoteExportAsgiTestCase(TransactionTestCase):
+    """Выгрузка через обработчик ASGI, как под uvicorn."""
+
+    def setUp(self):
+        self.author = User.objects.create(username='Автор')
+        self.notes = Note.objects.bulk_create(
+            Note(title=f'Заметка {index}', text='Текст', slug=f'note-{index}',
+                 author=self.author)
+            for index in range(3)
+        )
+        client = Client()
+        client.force_login(self.author)
+        self.cookie = client.cookies[settings.SESSION_COOKIE_NAME]
+
+    def fetch(self, url):
+        """Статус и всё тело ответа, прочитанные из приложения ASGI."""
+        cookie = f'{self.cookie.key}={self.cookie.value}'.encode()
+
+        async def request():
+            communicator = ApplicationCommunicator(ASGIHandler(), {
+                'type': 'http',
+                'method': 'GET',
+                'path': url,
+                'query_string': b'',
+                'headers': [(b'cookie', cookie)],
+            })
+            await communicator.send_input({'type': 'http.request'})
+            start = await communicator.receive_output(5)
+            body = []
+            while True:
+                message = await communicator.receive_output(5)
+                body.append(message.get('body', b''))
+                if not message.get('more_body'):
+                    return start['status'], b''.join(body)
+
+        return async_to_sync(request)()
+
+    def test_export_read_whole(self):
+        """Выгрузка читается до конца, без запросов в цикле событий."""
+        status, content = self.fetch(get_export_url('ndjson'))
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertEqual(
+            [json.loads(line)['slug'] for line in content.splitlines()],
+            [note.slug for note in self.notes],
+        )
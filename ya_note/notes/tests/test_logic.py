@@ -1,13 +1,41 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from http import HTTPStatus
+from io import StringIO
+from unittest import mock
 
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import (
+    Client, SimpleTestCase, TransactionTestCase, override_settings
+)
+from django.test.utils import CaptureQueriesContext
 from pytils.translit import slugify
 
+from notes.export import ZipStream, export_notes
 from notes.forms import WARNING
+from notes.imports import get_progress, import_notes, start_import
 from notes.models import Note
+from notes.slugs import SlugTaken
+from yacommon.sqlite import WriteQueue
+from notes.translit import slugify as fast_slugify
 from .test_utils import (
     BaseNoteTestCase,
     URL_ADD_NOTE,
+    URL_IMPORT,
     URL_LOGIN,
+    SLUG,
     URL_SUCCESS_PAGE,
     get_edit_url,
     get_delete_url,
@@ -76,6 +104,18 @@ class NoteManagementTestCase(BaseNoteTestCase):
         expected_slug = slugify(self.new_note_data['title'])
         self.assertEqual(created_note.slug, expected_slug)
 
+    def test_create_note_empty_slug_taken(self):
+        """Занятый slug из заголовка получает суффикс, а не ошибку."""
+        self.new_note_data.pop('slug')
+        self.new_note_data['title'] = 'Note slug'
+        self.assertEqual(slugify('Note slug'), self.note.slug)
+        response = self.author_client.post(
+            URL_ADD_NOTE, data=self.new_note_data
+        )
+        self.assertRedirects(response, URL_SUCCESS_PAGE)
+        created_note = Note.objects.get(title='Note slug')
+        self.assertTrue(created_note.slug.startswith(self.note.slug + '-'))
+
     def test_edit_note_by_author(self):
         """Автор может редактировать свои заметки."""
         response = self.author_client.post(
@@ -112,3 +152,338 @@ class NoteManagementTestCase(BaseNoteTestCase):
         response = self.reader_client.post(get_delete_url(self.note.slug))
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertEqual(Note.objects.count(), self.initial_note_count)
+
+    def test_write_flows_query_count(self):
+        """Создание, правка и удаление обходятся без лишних запросов."""
+        # Сессия, пользователь и запись в точке сохранения: slug
+        # проверяет индекс.
+        with self.assertNumQueries(5):
+            self.author_client.post(URL_ADD_NOTE, data=self.new_note_data)
+        # Сессия, пользователь, заметка и запись в точке сохранения.
+        with self.assertNumQueries(6):
+            self.author_client.post(get_edit_url(self.note.slug), data={
+                'title': self.note.title,
+                'text': self.new_note_data['text'],
+                'slug': self.note.slug,
+            })
+        # Сессия, пользователь, заметка и удаление.
+        with self.assertNumQueries(4):
+            self.author_client.post(get_delete_url(self.note.slug))
+
+    @override_settings(NOTES_EXPORT_BATCH_SIZE=2)
+    def test_export_notes_command(self):
+        """Команда выгружает все заметки автора, читая их пачками."""
+        Note.objects.bulk_create(
+            Note(
+                title=f'Заметка {index}', text='Текст', slug=f'n-{index}',
+                author=self.author,
+            )
+            for index in range(4)
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'notes.zip')
+            with self.assertNumQueries(4):
+                call_command(
+                    'export_notes', self.author.username, output,
+                    format='zip', stdout=StringIO(),
+                )
+            with zipfile.ZipFile(output) as archive:
+                names = archive.namelist()
+        self.assertEqual(
+            names, [f'{SLUG}.md'] + [f'n-{index}.md' for index in range(4)]
+        )
+
+    @mock.patch('notes.export.ZIP64_COUNT_LIMIT', 2)
+    def test_zip64_archive(self):
+        """Архив с записями ZIP64 читается стандартным zipfile."""
+        archive = ZipStream()
+        content = b''.join(
+            [archive.add(f'{index}.md', b'text') for index in range(3)]
+            + list(archive.finish())
+        )
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            self.assertEqual(len(archive.namelist()), 3)
+            self.assertIsNone(archive.testzip())
+
+    def test_generate_data(self):
+        """Генератор создаёт заметки с уникальными slug по seed."""
+        call_command(
+            'generate_data', users=3, notes=40, batch_size=9, seed=1,
+            stdout=StringIO(),
+        )
+        generated = Note.objects.filter(author__username__startswith='user-')
+        self.assertEqual(generated.count(), 40)
+        self.assertTrue(
+            generated.filter(slug__endswith='-1-39').exists()
+        )
+
+
+class SlugifyTestCase(SimpleTestCase):
+    """Тесты быстрой транслитерации для slug."""
+
+    def test_matches_pytils(self):
+        """Slug совпадает с pytils, в том числе для знаков и латиницы."""
+        titles = (
+            'Съешь ещё этих мягких французских булок',
+            'ЁЖИК в тумане', 'Чай & кофе &amp; щи',
+            '«Цитата» — №5… 100% ‘да’', 'Mixed Кириллица 2024',
+            '  --пробелы\tи\nдефисы--  ', 'Ǆemal İstanbul ß', '', '_',
+        )
+        for title in titles:
+            with self.subTest(title=title):
+                self.assertEqual(fast_slugify(title), slugify(title))
+
+
+@override_settings(NOTES_IMPORT_WORKERS=0, NOTES_IMPORT_BATCH_SIZE=2)
+class NoteImportTestCase(BaseNoteTestCase):
+    """Тесты пакетной загрузки заметок."""
+
+    def ndjson(self, *rows):
+        return io.BytesIO(b''.join(
+            json.dumps(row, ensure_ascii=False).encode() + b'\n'
+            for row in rows
+        ))
+
+    def test_round_trip_through_zip(self):
+        """Выгрузка одного пользователя загружается другому."""
+        content = io.BytesIO(b''.join(export_notes(self.author.pk, 'zip')))
+        progress = import_notes(self.reader.pk, content, 'zip')
+        self.assertEqual(progress, {'imported': 1, 'renamed': 1, 'errors': 0})
+        imported = Note.objects.get(author=self.reader)
+        self.assertEqual(
+            (imported.title, imported.text),
+            (self.note.title, self.note.text),
+        )
+        self.assertTrue(imported.slug.startswith(SLUG + '-'))
+
+    def test_one_slug_query_per_batch(self):
+        """Занятость slug проверяется одним запросом на пачку."""
+        rows = [
+            {'title': 'Одинаковый', 'text': f'Текст {index}'}
+            for index in range(5)
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            progress = import_notes(
+                self.reader.pk, self.ndjson(*rows), 'ndjson'
+            )
+        slug_queries = [
+            query for query in queries
+            if query['sql'].startswith('SELECT "notes_note"."slug"')
+        ]
+        self.assertEqual(len(slug_queries), 3)
+        self.assertEqual(progress['imported'], 5)
+        slugs = set(Note.objects.filter(
+            author=self.reader
+        ).values_list('slug', flat=True))
+        self.assertEqual(len(slugs), 5)
+        self.assertIn(slugify('Одинаковый'), slugs)
+
+    def test_bad_rows_skipped(self):
+        """Битые строки пропускаются и учитываются в счётчике."""
+        content = self.ndjson({'title': 'Без текста'}, {'text': 'Текст'})
+        content.write(b'{not json\n')
+        content.seek(0)
+        progress = import_notes(self.reader.pk, content, 'ndjson')
+        self.assertEqual(progress, {'imported': 1, 'renamed': 0, 'errors': 2})
+
+    def zip(self, *files):
+        content = io.BytesIO()
+        with zipfile.ZipFile(content, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for name, data in files:
+                archive.writestr(name, data)
+        content.seek(0)
+        return content
+
+    @override_settings(NOTES_IMPORT_MAX_NOTE_SIZE=100)
+    def test_large_zip_member_skipped(self):
+        """Сжатый файл больше предела не распаковывается."""
+        content = self.zip(
+            ('small.md', '# Малая\n\nТекст\n'), ('large.md', ' ' * 10 ** 6)
+        )
+        progress = import_notes(self.reader.pk, content, 'zip')
+        self.assertEqual(progress, {'imported': 1, 'renamed': 0, 'errors': 1})
+        self.assertEqual(
+            Note.objects.get(author=self.reader).slug, 'small'
+        )
+
+    @override_settings(NOTES_IMPORT_MAX_FILES=1)
+    def test_zip_members_over_limit_skipped(self):
+        """Файлы архива сверх предела считаются битыми строками."""
+        content = self.zip(('first.md', 'Текст'), ('second.md', 'Текст'))
+        progress = import_notes(self.reader.pk, content, 'zip')
+        self.assertEqual(progress, {'imported': 1, 'renamed': 0, 'errors': 1})
+
+    @override_settings(NOTES_IMPORT_MAX_SIZE=10)
+    def test_large_upload_rejected(self):
+        """Файл больше NOTES_IMPORT_MAX_SIZE не принимается."""
+        upload = SimpleUploadedFile(
+            'notes.ndjson', '{"text": "Текст"}\n'.encode()
+        )
+        response = self.author_client.post(
+            URL_IMPORT, {'file': upload, 'import_format': 'ndjson'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTrue(response.context['form'].has_error('file'))
+        self.assertFalse(Note.objects.filter(author=self.author).exclude(
+            pk=self.note.pk
+        ).exists())
+
+    def test_import_view_reports_progress(self):
+        """Загрузка через форму ведёт на страницу хода загрузки."""
+        upload = SimpleUploadedFile(
+            'notes.csv', 'slug,title,text\nnew,Новая,Текст\n'.encode()
+        )
+        response = self.author_client.post(
+            URL_IMPORT, {'file': upload, 'import_format': 'csv'}
+        )
+        status_url = response['Location']
+        response = self.author_client.get(status_url)
+        self.assertEqual(response.context['progress']['status'], 'done')
+        self.assertEqual(response.context['progress']['imported'], 1)
+        self.assertTrue(Note.objects.filter(slug='new').exists())
+        response = self.reader_client.get(status_url)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_import_notes_command(self):
+        """Команда определяет формат по расширению файла."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'notes.ndjson')
+            with open(path, 'wb') as file:
+                file.write(self.ndjson({'text': 'Текст'}).getvalue())
+            output = StringIO()
+            call_command('import_notes', self.reader.username, path,
+                         stdout=output)
+        self.assertIn('Загружено 1', output.getvalue())
+
+
+@override_settings(NOTES_IMPORT_WORKERS=1)
+class BackgroundImportTestCase(TransactionTestCase):
+    """Загрузка в фоновом потоке."""
+
+    def test_request_returns_before_import(self):
+        """Задача выполняется в потоке пула, ход виден в кэше."""
+        author = User.objects.create(username='Автор')
+        upload = SimpleUploadedFile('notes.ndjson', b''.join(
+            f'{{"text": "Текст {index}"}}\n'.encode() for index in range(50)
+        ))
+        job_id = start_import(author.pk, upload, 'ndjson')
+        for _ in range(100):
+            progress = get_progress(job_id, author.pk)
+            if progress['status'] == 'done':
+                break
+            time.sleep(0.05)
+        self.assertEqual(progress['imported'], 50)
+        self.assertEqual(Note.objects.filter(author=author).count(), 50)
+
+    def test_progress_visible_to_other_processes(self):
+        """Ход загрузки читает любой процесс сервера."""
+        author = User.objects.create(username='Автор')
+        upload = SimpleUploadedFile(
+            'notes.ndjson', '{"text": "Текст"}\n'.encode()
+        )
+        with override_settings(NOTES_IMPORT_WORKERS=0):
+            job_id = start_import(author.pk, upload, 'ndjson')
+        output = subprocess.run(
+            [
+                sys.executable, '-c',
+                'import django; django.setup(); '
+                'from notes.imports import get_progress; '
+                f'print(get_progress({job_id!r}, {author.pk})["status"])',
+            ],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'yanote.settings'},
+            check=True, capture_output=True, text=True,
+        ).stdout
+        self.assertEqual(output.strip(), 'done')
+
+
+@override_settings(SQLITE_PRODUCTION_MODE=True)
+class WriteQueueTestCase(TransactionTestCase):
+    """Тесты очереди записей в производственном режиме SQLite."""
+
+    def setUp(self):
+        self.author = User.objects.create(username='Автор')
+
+    def test_concurrent_writes(self):
+        """Параллельные записи выполняет один писатель, ошибки не теряются."""
+        queue = WriteQueue()
+
+        def add(index):
+            return queue.run(
+                Note.objects.create, title='Заметка', text='Текст',
+                slug=f'note-{index}', author=self.author,
+            )
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            notes = list(executor.map(add, range(20)))
+            duplicate = executor.submit(add, 0)
+
+        with self.assertRaises(IntegrityError):
+            duplicate.result()
+        self.assertEqual(len({note.slug for note in notes}), 20)
+        self.assertEqual(Note.objects.count(), 20)
+
+    def test_views_write_through_queue(self):
+        """Создание и удаление заметки в этом режиме проходят как обычно."""
+        client = Client()
+        client.force_login(self.author)
+        response = client.post(URL_ADD_NOTE, data={
+            'title': 'Заметка', 'text': 'Текст', 'slug': SLUG,
+        })
+        self.assertRedirects(response, URL_SUCCESS_PAGE)
+        response = client.post(get_delete_url(SLUG))
+        self.assertRedirects(response, URL_SUCCESS_PAGE)
+        self.assertFalse(Note.objects.exists())
+
+
+class SlugAllocationTestCase(TransactionTestCase):
+    """
+    Выделение slug вне транзакции, как в работе сервера.
+
+    Тестовая база файловая, см. DATABASES, поэтому у каждого потока
+    своё соединение, и записи идут параллельно, а не по очереди.
+    """
+
+    def setUp(self):
+        self.author = User.objects.create(username='Автор')
+
+    def test_slug_allocation_queries(self):
+        """Свободный slug стоит одного запроса, занятый — ещё одного."""
+        with self.assertNumQueries(1):
+            Note.objects.create(
+                title='Свободный заголовок', text='Текст', author=self.author
+            )
+        with self.assertNumQueries(2):
+            note = Note.objects.create(
+                title='Свободный заголовок', text='Текст', author=self.author
+            )
+        self.assertNotEqual(note.slug, slugify('Свободный заголовок'))
+        with self.assertRaises(SlugTaken):
+            Note.objects.create(
+                title='Заголовок', text='Текст', slug=note.slug,
+                author=self.author,
+            )
+        self.assertEqual(Note.objects.filter(slug=note.slug).count(), 1)
+
+    def test_concurrent_notes_with_same_title(self):
+        """Одновременные заметки с одним заголовком получают разные slug."""
+        start = threading.Barrier(8)
+
+        def add(index):
+            if index < start.parties:
+                start.wait()
+            try:
+                return Note.objects.create(
+                    title='Одинаковый заголовок', text=f'Текст {index}',
+                    author=self.author,
+                )
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=start.parties) as executor:
+            notes = list(executor.map(add, range(100)))
+
+        slugs = {note.slug for note in notes}
+        self.assertEqual(len(slugs), 100)
+        self.assertIn(slugify('Одинаковый заголовок'), slugs)
+        self.assertEqual(Note.objects.count(), 100)
@@ -6,13 +6,38 @@ from .test_utils import (
     URL_LOGOUT,
     URL_SIGNUP,
     URL_NOTES_LIST,
+    URL_NOTES_SEARCH,
+    URL_SEARCH_API,
+    URL_IMPORT,
     URL_ADD_NOTE,
     URL_SUCCESS_PAGE,
     URL_NOTE_DETAIL,
     URL_NOTE_EDIT,
     URL_NOTE_DELETE,
+    SLUG,
+    get_detail_url,
+    get_export_url,
 )
+from importlib import reload
+from io import StringIO
+import os
+import subprocess
+import sys
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import clear_url_caches, resolve, reverse
+
+from notes import urls as notes_urls
+from notes.models import Note
+from notes.views import async_note_detail, async_notes_list
+from yanote import urls as project_urls
+from yacommon.query_plans import get_slow_steps
+from yacommon.templating import get_loaders, preload_templates
 
 
 class RoutesTests(BaseNoteTestCase):
@@ -65,3 +90,192 @@ class RoutesTests(BaseNoteTestCase):
                 redirect_url = f'{URL_LOGIN}?next={url}'
                 response = self.client.get(url)
                 self.assertRedirects(response, redirect_url)
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=1)
+    def test_server_timing_header(self):
+        """Ответ содержит время этапов обработки в заголовке Server-Timing."""
+        response = self.author_client.get(URL_NOTES_LIST)
+        timing = response['Server-Timing']
+        for metric in ('url;dur=', 'view;dur=', 'template;dur=', 'db;dur='):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, timing)
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=0)
+    def test_server_timing_respects_sample_rate(self):
+        """При нулевой доле выборки запросы не замеряются."""
+        response = self.author_client.get(URL_NOTES_LIST)
+        self.assertNotIn('Server-Timing', response)
+
+
+class ConditionalGetTestCase(BaseNoteTestCase):
+    """Повторные запросы страниц заметок с ETag."""
+
+    def test_repeat_visit_not_modified(self):
+        """Без изменений заметок страница отвечает 304 без рендеринга."""
+        for url in (URL_NOTES_LIST, get_detail_url(SLUG)):
+            with self.subTest(url=url):
+                etag = self.author_client.get(url)['ETag']
+                with self.assertNumQueries(2):
+                    response = self.author_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+                self.assertEqual(response['ETag'], etag)
+
+    def test_note_change_invalidates_etag(self):
+        etag = self.author_client.get(URL_NOTES_LIST)['ETag']
+        Note.objects.create(
+            title='Новая', text='Текст', slug='new', author=self.author
+        )
+        response = self.author_client.get(
+            URL_NOTES_LIST, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_change_in_other_process_invalidates_etag(self):
+        """Версию заметок видят все процессы сервера."""
+        etag = self.author_client.get(URL_NOTES_LIST)['ETag']
+        subprocess.run(
+            [
+                sys.executable, '-c',
+                'import django; django.setup(); '
+                'from notes.cache import bump_notes_version; '
+                f'bump_notes_version({self.author.pk})',
+            ],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'yanote.settings'},
+            check=True,
+        )
+        response = self.author_client.get(
+            URL_NOTES_LIST, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_etag_not_shared_between_users(self):
+        etag = self.author_client.get(URL_NOTES_LIST)['ETag']
+        response = self.reader_client.get(
+            URL_NOTES_LIST, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+
+@override_settings(TEMPLATE_PRODUCTION_MODE=True)
+class TemplatePreloadTestCase(BaseNoteTestCase):
+    """Шаблоны, разобранные при старте, как в производственном режиме."""
+
+    def setUp(self):
+        self.preloaded = preload_templates()
+
+    def tearDown(self):
+        for loader in get_loaders():
+            loader.reset()
+
+    def test_pages_use_preloaded_templates(self):
+        self.assertGreater(self.preloaded, 0)
+        with self.assertNoLogs('yanote.templates'):
+            for url in (URL_NOTES_LIST, get_detail_url(SLUG), URL_LOGIN):
+                self.assertEqual(
+                    self.author_client.get(url).status_code, HTTPStatus.OK
+                )
+
+    def test_template_parsed_at_request_time_reported(self):
+        for loader in get_loaders():
+            loader.get_template_cache.pop('notes/list.html')
+        with self.assertLogs('yanote.templates', 'WARNING') as logs:
+            self.author_client.get(URL_NOTES_LIST)
+        self.assertIn('notes/list.html', logs.output[0])
+
+
+class QueryPlanTests(TestCase):
+    """Планы запросов страниц на большой базе."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'generate_data', users=50, notes=10000, stdout=StringIO()
+        )
+        cls.note = Note.objects.order_by('author', '-pk').first()
+
+    def setUp(self):
+        self.client.force_login(self.note.author)
+
+    @override_settings(NOTES_IMPORT_WORKERS=0)
+    def test_views_use_indexes(self):
+        """Запросы страниц обходятся без полного просмотра таблиц."""
+        urls = (
+            URL_NOTES_LIST,
+            URL_ADD_NOTE,
+            reverse('notes:detail', args=(self.note.slug,)),
+            reverse('notes:edit', args=(self.note.slug,)),
+            reverse('notes:delete', args=(self.note.slug,)),
+            URL_NOTES_SEARCH + '?q=проект',
+            URL_SEARCH_API + '?q=проект',
+            URL_IMPORT,
+            *(get_export_url(fmt) for fmt in ('ndjson', 'csv', 'zip')),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(get_slow_steps(self.client, url), [])
+        # Slug загружаемой заметки занят: загрузка подбирает новый.
+        upload = SimpleUploadedFile(
+            'notes.csv',
+            f'slug,title,text\n{self.note.slug},Проект,Отчёт\n'.encode(),
+        )
+        data = {'file': upload, 'import_format': 'csv'}
+        with self.subTest(url=URL_IMPORT, method='POST'):
+            self.assertEqual(get_slow_steps(self.client, URL_IMPORT, data), [])
+
+
+@override_settings(ASYNC_VIEWS=True)
+class AsyncViewsTestCase(BaseNoteTestCase):
+    """Страницы заметок под ASGI."""
+
+    @classmethod
+    def reload_urls(cls):
+        """Пересобирает URL-схему после смены ASYNC_VIEWS."""
+        reload(notes_urls)
+        reload(project_urls)
+        clear_url_caches()
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reload_urls()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.reload_urls()
+
+    def fetch(self, url):
+        async def request():
+            return await self.async_client.get(url)
+
+        return async_to_sync(request)()
+
+    def test_pages_served_by_async_views(self):
+        """Список и заметка отдаются асинхронными view."""
+        self.async_client.force_login(self.author)
+        for url, view in (
+            (URL_NOTES_LIST, async_notes_list),
+            (get_detail_url(SLUG), async_note_detail),
+        ):
+            with self.subTest(url=url):
+                self.assertIs(resolve(url).func, view)
+                self.assertContains(self.fetch(url), self.note.title)
+
+    def test_foreign_note_not_found(self):
+        """Чужая заметка недоступна и через асинхронное view."""
+        self.async_client.force_login(self.reader)
+        response = self.fetch(get_detail_url(SLUG))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_anonymous_redirected_to_login(self):
+        """Аноним отправляется на страницу входа."""
+        for url in (URL_NOTES_LIST, get_detail_url(SLUG)):
+            with self.subTest(url=url):
+                self.assertRedirects(
+                    self.fetch(url), f'{URL_LOGIN}?next={url}',
+                    fetch_redirect_response=False,
+                )
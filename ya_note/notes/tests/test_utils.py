@@ -8,6 +8,9 @@ URL_ADD_NOTE = reverse('notes:add')
 URL_LOGIN = reverse('users:login')
 URL_SUCCESS_PAGE = reverse('notes:success')
 URL_NOTES_LIST = reverse('notes:list')
+URL_NOTES_SEARCH = reverse('notes:search')
+URL_SEARCH_API = reverse('notes:search_api')
+URL_IMPORT = reverse('notes:import')
 URL_HOME = reverse('notes:home')
 URL_LOGOUT = reverse('users:logout')
 URL_SIGNUP = reverse('users:signup')
@@ -23,6 +26,10 @@ URL_NOTE_DELETE = reverse(
 SLUG = 'note-slug'
 
 
+def get_detail_url(slug):
+    return reverse('notes:detail', args=[slug])
+
+
 def get_edit_url(slug):
     return reverse('notes:edit', args=[slug])
 
@@ -31,6 +38,10 @@ def get_delete_url(slug):
     return reverse('notes:delete', args=[slug])
 
 
+def get_export_url(export_format):
+    return reverse('notes:export', args=[export_format])
+
+
 # Базовый класс для тестирования
 class BaseNoteTestCase(TestCase):
     """Базовый класс для тестирования заметок."""
@@ -0,0 +1,55 @@
+"""
+Быстрая замена pytils.translit.slugify с тем же результатом.
+
+pytils перебирает строку посимвольно по списку допустимых символов и
+затем делает полсотни str.replace() по таблице транслитерации. Здесь
+обе операции и финальная чистка знаков препинания сведены в одну
+таблицу для str.translate(), построенную по таблице самой pytils при
+импорте, а результаты для повторяющихся заголовков запоминаются.
+"""
+import re
+from functools import lru_cache
+
+from pytils.translit import ALPHABET, TRANSTABLE
+
+CACHE_SIZE = 4096
+AMPERSAND = re.compile(r'&amp;|&')
+DASHES = re.compile(r'[-\s]+')
+# То, что pytils удаляет после транслитерации.
+NOT_SLUG = re.compile(r'[^\w\s-]')
+
+
+class DeletingTable(dict):
+    """Таблица str.translate(), удаляющая символы не из таблицы."""
+
+    def __missing__(self, key):
+        return None
+
+
+def build_table():
+    """
+    Таблица транслитерации символов алфавита pytils.
+
+    Знаки препинания сразу удаляются из замен, символы не из алфавита
+    удаляются таблицей. pytils заменяет символы по порядку TRANSTABLE,
+    поэтому замены применяются в том же порядке.
+    """
+    table = DeletingTable()
+    for symbol in ALPHABET:
+        if len(symbol) != 1 or ord(symbol) in table:
+            continue
+        translated = symbol
+        for source, target in TRANSTABLE:
+            translated = translated.replace(source, target)
+        table[ord(symbol)] = NOT_SLUG.sub('', translated)
+    return table
+
+
+TABLE = build_table()
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def slugify(text):
+    """Slug для строки, совпадающий с pytils.translit.slugify."""
+    text = DASHES.sub('-', AMPERSAND.sub(' and ', str(text).lower()))
+    return text.translate(TABLE).strip()
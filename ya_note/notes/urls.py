@@ -1,15 +1,34 @@
+from django.conf import settings
 from django.urls import path
 
 from notes import views
 
 app_name = 'notes'
 
+if settings.ASYNC_VIEWS:
+    notes_list, note_detail = views.async_notes_list, views.async_note_detail
+else:
+    notes_list, note_detail = views.notes_list, views.note_detail
+
 urlpatterns = [
     path('', views.Home.as_view(), name='home'),
     path('add/', views.NoteCreate.as_view(), name='add'),
     path('edit/<slug:slug>/', views.NoteUpdate.as_view(), name='edit'),
-    path('note/<slug:slug>/', views.NoteDetail.as_view(), name='detail'),
+    path('note/<slug:slug>/', note_detail, name='detail'),
     path('delete/<slug:slug>/', views.NoteDelete.as_view(), name='delete'),
-    path('notes/', views.NotesList.as_view(), name='list'),
+    path('notes/', notes_list, name='list'),
+    path('search/', views.NoteSearch.as_view(), name='search'),
+    path('api/search/', views.NoteSearchApi.as_view(), name='search_api'),
+    path(
+        'export/<str:export_format>/',
+        views.NoteExport.as_view(),
+        name='export'
+    ),
+    path('import/', views.NoteImport.as_view(), name='import'),
+    path(
+        'import/<str:job_id>/',
+        views.NoteImportStatus.as_view(),
+        name='import_status'
+    ),
     path('done/', views.NoteSuccess.as_view(), name='success'),
 ]
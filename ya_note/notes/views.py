@@ -1,9 +1,22 @@
+from asgiref.sync import sync_to_async
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.urls import reverse_lazy
+from django.http import (
+    FileResponse, Http404, HttpResponseRedirect, JsonResponse
+)
+from django.urls import reverse, reverse_lazy
 from django.views import generic
 
-from .forms import NoteForm
+from yacommon.sqlite import writer
+from yacommon.views import render_response
+
+from .cache import ConditionalNotesMixin, get_notes_total
+from .export import FORMATS, export_to_file
+from .forms import ImportForm, NoteForm
+from .imports import get_progress, start_import
 from .models import Note
+from .pagination import get_notes_page
+from .search import search_notes
+from .slugs import SlugTaken
 
 
 class Home(generic.TemplateView):
@@ -26,34 +39,157 @@ class NoteBase(LoginRequiredMixin):
         return self.model.objects.filter(author=self.request.user)
 
 
-class NoteCreate(NoteBase, generic.CreateView):
+class NoteWriteMixin:
+    """Сохранение и удаление заметки идут через очередь записей."""
+
+    def form_valid(self, form):
+        try:
+            self.object = writer.run(form.save)
+        except SlugTaken:
+            form.slug_taken()
+            return self.form_invalid(form)
+        return HttpResponseRedirect(self.get_success_url())
+
+    def delete(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        writer.run(self.object.delete)
+        return HttpResponseRedirect(self.get_success_url())
+
+
+class NoteCreate(NoteWriteMixin, NoteBase, generic.CreateView):
     """Добавление заметки."""
     template_name = 'notes/form.html'
     form_class = NoteForm
 
     def form_valid(self, form):
-        new_note = form.save(commit=False)
-        new_note.author = self.request.user
-        new_note.save()
+        """Автор проставляется до единственного сохранения формой."""
+        form.instance.author = self.request.user
         return super().form_valid(form)
 
 
-class NoteUpdate(NoteBase, generic.UpdateView):
+class NoteUpdate(NoteWriteMixin, NoteBase, generic.UpdateView):
     """Редактирование заметки."""
     template_name = 'notes/form.html'
     form_class = NoteForm
 
 
-class NoteDelete(NoteBase, generic.DeleteView):
+class NoteDelete(NoteWriteMixin, NoteBase, generic.DeleteView):
     """Удаление заметки."""
     template_name = 'notes/delete.html'
 
 
-class NotesList(NoteBase, generic.ListView):
-    """Список всех заметок пользователя."""
+class NotesList(NoteBase, ConditionalNotesMixin, generic.ListView):
+    """Список заметок пользователя постранично."""
     template_name = 'notes/list.html'
 
+    def get_queryset(self):
+        notes, self.next_cursor = get_notes_page(
+            self.request.user, self.request.GET.get('after')
+        )
+        return notes
+
+    def get_context_data(self, **kwargs):
+        return super().get_context_data(
+            next_cursor=self.next_cursor,
+            notes_total=get_notes_total(self.request.user.pk),
+            **kwargs,
+        )
+
 
-class NoteDetail(NoteBase, generic.DetailView):
+class NoteDetail(NoteBase, ConditionalNotesMixin, generic.DetailView):
     """Заметка подробно."""
     template_name = 'notes/detail.html'
+
+
+class NoteSearch(NoteBase, generic.TemplateView):
+    """Поиск по заметкам пользователя."""
+    template_name = 'notes/search.html'
+
+    def get_context_data(self, **kwargs):
+        query = self.request.GET.get('q', '')
+        return super().get_context_data(
+            query=query,
+            results=search_notes(self.request.user.pk, query),
+            **kwargs,
+        )
+
+
+class NoteSearchApi(NoteBase, generic.View):
+    """Поиск по заметкам пользователя в JSON."""
+
+    def get(self, request, *args, **kwargs):
+        results = search_notes(request.user.pk, request.GET.get('q', ''))
+        return JsonResponse({'results': [
+            {
+                'id': result.id,
+                'slug': result.slug,
+                'title': result.title,
+                'snippet': result.snippet,
+                'url': reverse('notes:detail', args=(result.slug,)),
+            }
+            for result in results
+        ]})
+
+
+class NoteExport(NoteBase, generic.View):
+    """Выгрузка всех заметок пользователя одним файлом."""
+
+    def get(self, request, *args, **kwargs):
+        export_format = kwargs['export_format']
+        if export_format not in FORMATS:
+            raise Http404('Неизвестный формат выгрузки')
+        content_type, _ = FORMATS[export_format]
+        return FileResponse(
+            export_to_file(request.user.pk, export_format),
+            as_attachment=True,
+            filename=f'notes.{export_format}',
+            content_type=content_type,
+        )
+
+
+class NoteImport(NoteBase, generic.FormView):
+    """Загрузка заметок из файла в фоне."""
+    template_name = 'notes/import.html'
+    form_class = ImportForm
+
+    def form_valid(self, form):
+        job_id = start_import(
+            self.request.user.pk,
+            form.cleaned_data['file'],
+            form.cleaned_data['import_format'],
+        )
+        return HttpResponseRedirect(
+            reverse('notes:import_status', args=(job_id,))
+        )
+
+
+class NoteImportStatus(NoteBase, generic.TemplateView):
+    """Ход загрузки заметок."""
+    template_name = 'notes/import_status.html'
+
+    def get_context_data(self, **kwargs):
+        progress = get_progress(kwargs['job_id'], self.request.user.pk)
+        if progress is None:
+            raise Http404('Загрузка не найдена')
+        return super().get_context_data(progress=progress, **kwargs)
+
+
+notes_list = NotesList.as_view()
+note_detail = NoteDetail.as_view()
+
+
+async def async_notes_list(request):
+    """
+    Список заметок под ASGI.
+
+    Сессия, пользователь, страница заметок и рендеринг шаблона — один
+    вызов в потоке, цикл событий в это время обслуживает другие запросы.
+    """
+    return await sync_to_async(render_response)(notes_list, request)
+
+
+async def async_note_detail(request, slug):
+    """Заметка под ASGI, вся работа — одним вызовом в потоке."""
+    return await sync_to_async(render_response)(
+        note_detail, request, slug=slug
+    )
@@ -9,8 +9,18 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
+from yacommon.templating import preload_templates
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yanote.settings')
+# Под ASGI список и страницы заметок обслуживают асинхронные
+# представления, см. notes.views.
+os.environ.setdefault('YANOTE_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
+
+if settings.TEMPLATE_PRODUCTION_MODE:
+    # Все шаблоны разбираются до первого запроса.
+    preload_templates()
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from django.urls import reverse_lazy
@@ -21,14 +22,17 @@ INSTALLED_APPS = [
     'notes.apps.NotesConfig'
 ]
 
+# Наследники стандартных middleware: под ASGI их хуки выполняются в
+# цикле событий, см. yacommon.middleware.InlineHooksMixin.
 MIDDLEWARE = [
-    'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
-    'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'yacommon.middleware.SecurityMiddleware',
+    'yacommon.middleware.SessionMiddleware',
+    'yacommon.middleware.CommonMiddleware',
+    'yacommon.middleware.CsrfViewMiddleware',
+    'yacommon.middleware.AuthenticationMiddleware',
+    'yacommon.middleware.MessageMiddleware',
+    'yacommon.middleware.XFrameOptionsMiddleware',
+    'yacommon.middleware.ServerTimingMiddleware',
 ]
 
 ROOT_URLCONF = 'yanote.urls'
@@ -37,7 +41,6 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -45,9 +48,18 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            'loaders': [
+                ('yacommon.templating.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
+# Производственный режим шаблонов: кэш даже при DEBUG и компиляция
+# всех шаблонов при старте, см. yacommon.templating.
+TEMPLATE_PRODUCTION_MODE = False
 
 WSGI_APPLICATION = 'yanote.wsgi.application'
 
@@ -56,8 +68,71 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Файловая тестовая база: у потоков свои соединения, и
+        # параллельные записи спорят за неё, как в работе сервера.
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
+# Производственный режим SQLite: WAL, прагмы и единственный поток
+# для записей, см. yacommon.sqlite.
+SQLITE_PRODUCTION_MODE = False
+
+# Каталог файловых кэшей, общих для процессов сервера. Тесты подменяют
+# его через переменную окружения, см. yacommon.isolated_caches.
+CACHE_DIR_VARIABLE = 'YANOTE_CACHE_DIR'
+CACHE_DIR = Path(os.environ.get(CACHE_DIR_VARIABLE, BASE_DIR / 'cache'))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Версии заметок пользователей, см. notes.cache.get_notes_version.
+    # Общие для всех процессов сервера: запись в одном процессе
+    # сбрасывает ETag и число заметок во всех.
+    'versions': {
+        'BACKEND': 'yacommon.cache.VersionFileCache',
+        'LOCATION': CACHE_DIR / 'versions',
+    },
+    # Ход фоновых загрузок заметок, см. notes.imports. Загрузку ведёт
+    # процесс, принявший файл, а статус может спросить любой другой.
+    'imports': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_DIR / 'imports',
+    },
+}
+
+# Корень логгеров общих модулей yacommon: yanote.timing, yanote.templates.
+PROJECT_LOGGER = 'yanote'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'yanote.timing': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+        'yanote.templates': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+        },
+    },
+}
+
+# Асинхронные представления списка и страницы заметки, см. notes.views.
+# Включаются под ASGI: yanote.asgi задаёт переменную окружения.
+ASYNC_VIEWS = os.environ.get('YANOTE_ASYNC_VIEWS') == '1'
+
+# Доля запросов, для которых замеряется время этапов обработки. Каждый
+# замер пишет строку в лог, поэтому в бою замеряется один запрос из ста.
+REQUEST_TIMING_SAMPLE_RATE = 1.0 if DEBUG else 0.01
+# С какой длительности запроса в миллисекундах логировать его план.
+REQUEST_TIMING_SLOW_QUERY_MS = 100
 
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -87,3 +162,19 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('notes:home')
+
+NOTES_COUNT_ON_LIST_PAGE = 50
+NOTES_VERSION_CACHE = 'versions'
+# Сколько заметок выгрузка читает одним запросом.
+NOTES_EXPORT_BATCH_SIZE = 2000
+# Загрузка заметок: размер пачки и число фоновых потоков, 0 — сразу.
+NOTES_IMPORT_BATCH_SIZE = 1000
+NOTES_IMPORT_WORKERS = 2
+NOTES_IMPORT_CACHE = 'imports'
+# Пределы загружаемого файла, распакованной заметки из zip и числа
+# файлов в архиве.
+NOTES_IMPORT_MAX_SIZE = 50 * 1024 * 1024
+NOTES_IMPORT_MAX_NOTE_SIZE = 1024 * 1024
+NOTES_IMPORT_MAX_FILES = 100_000
+NOTES_SEARCH_RESULTS = 20
+NOTES_SEARCH_CANDIDATES = 1000
@@ -0,0 +1,6 @@
+"""
+Общий код проектов yanews и yanote.
+
+Проекты подключают пакет из корня репозитория, см. yanews/__init__.py.
+Имена логгеров модулей начинаются с настройки PROJECT_LOGGER проекта.
+"""
@@ -0,0 +1,19 @@
+from django.core.cache.backends.filebased import FileBasedCache
+
+
+class VersionFileCache(FileBasedCache):
+    """
+    Файловый кэш версий, общий для всех процессов сервера.
+
+    Версии — числа, которые читаются на каждом запросе и меняются при
+    записи. В локальном кэше процесса запись в одном процессе не
+    сбрасывала бы страницы и ETag в остальных. Запись в файл атомарна:
+    соседний процесс читает либо старую версию, либо новую.
+
+    FileBasedCache при каждой записи перечисляет весь каталог, чтобы
+    вытеснить лишние записи. Версий не больше, чем новостей или
+    пользователей, поэтому вытеснение отключено.
+    """
+
+    def _cull(self):
+        pass
@@ -0,0 +1,41 @@
+"""
+Общие части команд generate_data: словарь и детерминированные пачки.
+
+Данные зависят только от --seed: у каждой пачки свой генератор, а
+словарь строится из фиксированного зерна.
+"""
+import random
+from itertools import accumulate
+
+SYLLABLES = (
+    'ба', 'ве', 'го', 'ду', 'жи', 'за', 'ки', 'ло', 'ми', 'но', 'па', 'ре',
+    'со', 'ту', 'фа', 'хо', 'це', 'ча', 'ши', 'ля', 'ны', 'ра', 'ск', 'ст',
+)
+VOCABULARY_SIZE = 20000
+
+
+def build_vocabulary(words, size=VOCABULARY_SIZE):
+    """
+    Словарь в порядке убывания частоты: сначала настоящие слова words,
+    затем псевдослова из слогов. Возвращает слова и накопленные веса.
+
+    Частота слова убывает как 1 / rank, как в живом языке: без редких
+    слов любое слово встречалось бы почти в каждом тексте.
+    """
+    rng = random.Random('vocabulary')
+    vocabulary = dict.fromkeys(words)
+    while len(vocabulary) < size:
+        vocabulary[''.join(rng.choices(SYLLABLES, k=rng.randint(2, 5)))] = 1
+    return tuple(vocabulary), list(accumulate(
+        1 / rank for rank in range(1, len(vocabulary) + 1)
+    ))
+
+
+def chunk_random(seed, kind, index):
+    """Генератор пачки зависит только от seed, а не от числа процессов."""
+    return random.Random(f'{seed}:{kind}:{index}')
+
+
+def chunks(total, size):
+    for index, start in enumerate(range(0, total, size)):
+        yield index, start, min(size, total - start)
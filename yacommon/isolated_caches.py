@@ -0,0 +1,40 @@
+"""
+Pytest-плагин: файловые кэши тестов во временном каталоге.
+
+Файловые кэши из CACHES общие для процессов сервера, а тесты их
+очищают. На время прогона каталог CACHE_DIR заменяется временным: в
+настройках этого процесса и в переменной окружения CACHE_DIR_VARIABLE,
+которую наследуют процессы, запущенные тестами.
+"""
+import os
+from pathlib import Path
+
+import pytest
+from django.conf import settings
+from django.test import override_settings
+
+
+def relocate(config, directory):
+    """Настройки кэша с LOCATION внутри directory вместо CACHE_DIR."""
+    try:
+        relative = Path(config['LOCATION']).relative_to(settings.CACHE_DIR)
+    except (KeyError, ValueError):
+        return config
+    return {**config, 'LOCATION': directory / relative}
+
+
+@pytest.fixture(scope='session', autouse=True)
+def isolated_file_caches(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('cache')
+    variable = settings.CACHE_DIR_VARIABLE
+    previous = os.environ.get(variable)
+    os.environ[variable] = str(directory)
+    with override_settings(CACHE_DIR=directory, CACHES={
+        alias: relocate(config, directory)
+        for alias, config in settings.CACHES.items()
+    }):
+        yield directory
+    if previous is None:
+        del os.environ[variable]
+    else:
+        os.environ[variable] = previous
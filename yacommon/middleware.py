@@ -0,0 +1,277 @@
+import json
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import (
+    iscoroutinefunction, markcoroutinefunction, sync_to_async
+)
+from django.conf import settings
+from django.contrib.auth import middleware as auth
+from django.contrib.messages import middleware as messages
+from django.contrib.sessions import middleware as sessions
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.middleware import clickjacking, common, csrf, security
+
+
+def get_logger():
+    """Логгер замеров: PROJECT_LOGGER из настроек проекта и .timing."""
+    return logging.getLogger(f'{settings.PROJECT_LOGGER}.timing')
+
+
+class QueryTimer:
+    """Обёртка выполнения SQL, запоминающая длительность запросов."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((time.perf_counter() - start, sql, params))
+
+
+# Замер SQL асинхронного запроса: запросы к базе идут в потоках,
+# а контекстная переменная переходит в них вместе с вызовом.
+current_timer = ContextVar('current_timer', default=None)
+
+
+def time_queries(execute, sql, params, many, context):
+    timer = current_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """Обработчик connection_created: ставит обёртку time_queries."""
+    if time_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_queries)
+
+
+def explain(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def mark_view(request):
+    if hasattr(request, '_timing_marks'):
+        request._timing_marks['view'] = time.perf_counter()
+
+
+def mark_render(request, response):
+    marks = getattr(request, '_timing_marks', None)
+    if marks is None:
+        return response
+    marks['render'] = time.perf_counter()
+
+    def rendered(response):
+        marks['rendered'] = time.perf_counter()
+
+    response.add_post_render_callback(rendered)
+    return response
+
+
+class ServerTimingMiddleware:
+    """
+    Замеряет этапы обработки запроса.
+
+    Время разбора URL, работы view, рендеринга шаблона и SQL-запросов
+    отдаётся в заголовке Server-Timing и пишется в лог строкой JSON.
+    Замеряется доля запросов REQUEST_TIMING_SAMPLE_RATE; для запросов
+    SQLite дольше REQUEST_TIMING_SLOW_QUERY_MS в лог попадает план.
+    Middleware должна стоять последней: тогда время до process_view —
+    это время разбора URL.
+
+    Под ASGI middleware работает асинхронно и сама в поток не уходит:
+    SQL замеряется обёрткой соединений через current_timer, а в поток
+    отправляется только чтение планов медленных запросов.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            self.process_view = self.aprocess_view
+            self.process_template_response = self.aprocess_template_response
+            connection_created.connect(
+                install_query_timer, dispatch_uid='install_query_timer'
+            )
+
+    def __call__(self, request):
+        if iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if random.random() >= settings.REQUEST_TIMING_SAMPLE_RATE:
+            return self.get_response(request)
+        marks = request._timing_marks = {'start': time.perf_counter()}
+        timer = QueryTimer()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        marks['end'] = time.perf_counter()
+        return self.finish(request, response, marks, timer.queries)
+
+    async def __acall__(self, request):
+        if random.random() >= settings.REQUEST_TIMING_SAMPLE_RATE:
+            return await self.get_response(request)
+        marks = request._timing_marks = {'start': time.perf_counter()}
+        timer = QueryTimer()
+        token = current_timer.set(timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timer.reset(token)
+        marks['end'] = time.perf_counter()
+        if any(map(self.is_slow, timer.queries)):
+            return await sync_to_async(self.finish)(
+                request, response, marks, timer.queries
+            )
+        return self.finish(request, response, marks, timer.queries)
+
+    def finish(self, request, response, marks, queries):
+        timing = self.collect(request, response, marks, queries)
+        response['Server-Timing'] = (
+            f'url;dur={timing["url_ms"]:.2f}, '
+            f'view;dur={timing["view_ms"]:.2f}, '
+            f'template;dur={timing["template_ms"]:.2f}, '
+            f'db;dur={timing["db_ms"]:.2f};desc="{timing["queries"]} queries"'
+        )
+        get_logger().info(json.dumps(timing, ensure_ascii=False))
+        return response
+
+    def is_slow(self, query):
+        return query[0] >= settings.REQUEST_TIMING_SLOW_QUERY_MS / 1000
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        mark_view(request)
+
+    async def aprocess_view(self, request, *args):
+        mark_view(request)
+
+    def process_template_response(self, request, response):
+        return mark_render(request, response)
+
+    async def aprocess_template_response(self, request, response):
+        return mark_render(request, response)
+
+    def collect(self, request, response, marks, queries):
+        view_start = marks.get('view', marks['end'])
+        view_end = marks.get('render', marks['end'])
+        slowest = max(queries, default=(0, None, None))
+        return {
+            'method': request.method,
+            'path': request.path,
+            'view': getattr(request.resolver_match, 'view_name', None),
+            'status': response.status_code,
+            'url_ms': (view_start - marks['start']) * 1000,
+            'view_ms': (view_end - view_start) * 1000,
+            'template_ms': (
+                marks.get('rendered', view_end) - view_end
+            ) * 1000,
+            'db_ms': sum(duration for duration, *_ in queries) * 1000,
+            'queries': len(queries),
+            'slowest_query_ms': slowest[0] * 1000,
+            'slowest_query': slowest[1],
+            'slow_queries': [
+                {
+                    'sql': sql,
+                    'ms': duration * 1000,
+                    'plan': self.get_plan(sql, params),
+                }
+                for duration, sql, params in filter(self.is_slow, queries)
+            ],
+        }
+
+    def get_plan(self, sql, params):
+        if connection.vendor != 'sqlite' or not sql.startswith('SELECT'):
+            return None
+        return explain(sql, params)
+
+
+class InlineHooksMixin:
+    """
+    Под ASGI вызывает хуки middleware прямо в цикле событий.
+
+    MiddlewareMixin отправляет каждый process_request и process_response
+    в поток, и переход обходится дороже самого хука. Подходит для
+    middleware, хуки которых не обращаются к базе и диску; ответы,
+    которым поток всё же нужен, отмечает needs_thread().
+    """
+
+    async def __acall__(self, request):
+        response = None
+        if hasattr(self, 'process_request'):
+            response = self.process_request(request)
+        response = response or await self.get_response(request)
+        if hasattr(self, 'process_response'):
+            if self.needs_thread(request):
+                return await sync_to_async(self.process_response)(
+                    request, response
+                )
+            return self.process_response(request, response)
+        return response
+
+    def needs_thread(self, request):
+        return False
+
+
+class SecurityMiddleware(InlineHooksMixin, security.SecurityMiddleware):
+    pass
+
+
+class SessionMiddleware(InlineHooksMixin, sessions.SessionMiddleware):
+
+    def needs_thread(self, request):
+        """Изменённая сессия сохраняется в базу."""
+        return (
+            request.session.modified or settings.SESSION_SAVE_EVERY_REQUEST
+        )
+
+
+class CommonMiddleware(InlineHooksMixin, common.CommonMiddleware):
+    pass
+
+
+class CsrfViewMiddleware(InlineHooksMixin, csrf.CsrfViewMiddleware):
+    """
+    Проверка CSRF без перехода в поток для безопасных методов.
+
+    Для POST и остальных методов проверка читает форму, а тело запроса
+    с файлами может лежать на диске, поэтому она идёт в потоке.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        if iscoroutinefunction(get_response):
+            self.process_view = self.aprocess_view
+
+    async def aprocess_view(self, request, *args):
+        if request.method in ('GET', 'HEAD', 'OPTIONS', 'TRACE'):
+            return super().process_view(request, *args)
+        return await sync_to_async(super().process_view)(request, *args)
+
+
+class AuthenticationMiddleware(
+        InlineHooksMixin, auth.AuthenticationMiddleware
+):
+    pass
+
+
+class MessageMiddleware(InlineHooksMixin, messages.MessageMiddleware):
+
+    def needs_thread(self, request):
+        """Сохранение сообщений может прочитать сессию из базы."""
+        storage = getattr(request, '_messages', None)
+        return storage is not None and (storage.used or storage.added_new)
+
+
+class XFrameOptionsMiddleware(
+        InlineHooksMixin, clickjacking.XFrameOptionsMiddleware
+):
+    pass
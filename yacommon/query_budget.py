@@ -0,0 +1,160 @@
+"""
+Pytest-плагин: бюджет SQL-запросов на один HTTP-запрос.
+
+Плагин считает запросы к базе внутри каждого запроса тестового клиента
+и относит их к имени URL. Бюджеты задаются в pytest.ini:
+
+    query_budgets =
+        news:home = 1
+        news:detail = 7
+
+Если запрос к странице превысил бюджет, тест падает со списком SQL
+и местами в коде проекта, откуда они пришли. В конце прогона
+печатается сводка по всем адресам; --query-report сохраняет её в JSON.
+"""
+import json
+import traceback
+from collections import defaultdict
+from pathlib import Path
+
+import pytest
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.urls import Resolver404, resolve
+
+
+def pytest_addoption(parser):
+    parser.addini(
+        'query_budgets',
+        type='linelist',
+        help='Бюджеты SQL-запросов: строки вида "app:name = число".',
+    )
+    parser.addoption(
+        '--query-report',
+        metavar='PATH',
+        help='Сохранить сводку SQL-запросов по адресам в JSON-файл.',
+    )
+
+
+def pytest_configure(config):
+    config.pluginmanager.register(QueryBudget(config), 'query_budget_recorder')
+
+
+def parse_budgets(lines):
+    budgets = {}
+    for line in lines:
+        name, _, budget = line.partition('=')
+        budgets[name.strip()] = int(budget)
+    return budgets
+
+
+class QueryBudget:
+
+    def __init__(self, config):
+        self.budgets = parse_budgets(config.getini('query_budgets'))
+        self.report_path = config.getoption('query_report')
+        self.root = str(config.rootpath)
+        self.summary = defaultdict(
+            lambda: {'requests': 0, 'queries': 0, 'max_queries': 0}
+        )
+        self.current = None
+        self.violations = []
+
+    def _project_stack(self):
+        return [
+            frame for frame in traceback.extract_stack()[:-2]
+            if frame.filename.startswith(self.root)
+            and 'site-packages' not in frame.filename
+            and frame.filename != __file__
+        ]
+
+    def __call__(self, execute, sql, params, many, context):
+        # Планы запросов от диагностических middleware в бюджет не входят.
+        if self.current is not None and not sql.startswith('EXPLAIN'):
+            self.current['queries'].append((sql, self._project_stack()))
+        return execute(sql, params, many, context)
+
+    def request_started(self, environ=None, scope=None, **kwargs):
+        # Клиент WSGI передаёт environ, асинхронный клиент — scope ASGI.
+        path = environ['PATH_INFO'] if environ is not None else scope['path']
+        try:
+            view_name = resolve(path).view_name
+        except Resolver404:
+            view_name = None
+        self.current = {
+            'view_name': view_name,
+            'path': path,
+            'queries': [],
+        }
+
+    def request_finished(self, **kwargs):
+        current, self.current = self.current, None
+        if current is None or current['view_name'] is None:
+            return
+        count = len(current['queries'])
+        stats = self.summary[current['view_name']]
+        stats['requests'] += 1
+        stats['queries'] += count
+        stats['max_queries'] = max(stats['max_queries'], count)
+        budget = self.budgets.get(current['view_name'])
+        if budget is not None and count > budget:
+            self.violations.append((current, budget))
+
+    def format_violation(self, current, budget):
+        lines = [
+            f'{current["view_name"]} ({current["path"]}): '
+            f'{len(current["queries"])} SQL-запросов при бюджете {budget}'
+        ]
+        for number, (sql, stack) in enumerate(current['queries'], 1):
+            lines.append(f'  {number}. {sql}')
+            lines.extend(
+                f'       {frame.filename}:{frame.lineno} в {frame.name}'
+                for frame in stack
+            )
+        return '\n'.join(lines)
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_call(self, item):
+        self.violations = []
+        request_started.connect(self.request_started)
+        request_finished.connect(self.request_finished)
+        wrapped = []
+        for connection in connections.all():
+            connection.execute_wrappers.append(self)
+            wrapped.append(connection)
+        try:
+            yield
+        finally:
+            for connection in wrapped:
+                connection.execute_wrappers.remove(self)
+            request_started.disconnect(self.request_started)
+            request_finished.disconnect(self.request_finished)
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_makereport(self, item, call):
+        outcome = yield
+        report = outcome.get_result()
+        if call.when == 'call' and report.passed and self.violations:
+            report.outcome = 'failed'
+            report.longrepr = '\n\n'.join(
+                self.format_violation(current, budget)
+                for current, budget in self.violations
+            )
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if not self.summary:
+            return
+        terminalreporter.section('SQL-запросы по адресам')
+        for view_name, stats in sorted(self.summary.items()):
+            budget = self.budgets.get(view_name, '-')
+            average = stats['queries'] / stats['requests']
+            terminalreporter.write_line(
+                f'{view_name:<24} запросов: {stats["requests"]:>4}  '
+                f'в среднем: {average:>5.1f}  максимум: '
+                f'{stats["max_queries"]:>3}  бюджет: {budget}'
+            )
+        if self.report_path:
+            Path(self.report_path).write_text(
+                json.dumps(self.summary, ensure_ascii=False, indent=2),
+                encoding='utf-8',
+            )
@@ -0,0 +1,48 @@
+"""
+Проверка планов запросов страниц для тестов на большой базе.
+
+get_slow_steps выполняет запрос тестового клиента, собирает его SQL и
+возвращает шаги EXPLAIN QUERY PLAN, которые обходятся без индексов.
+"""
+from django.db import connection
+
+from yacommon.middleware import explain
+
+
+def is_slow_step(step):
+    """
+    Полный просмотр таблицы или сортировка всех строк в памяти.
+
+    Виртуальные таблицы FTS5 выбирают строки по собственному индексу.
+    """
+    return (
+        step.startswith('SCAN') and ' USING ' not in step
+        and ' VIRTUAL TABLE INDEX ' not in step
+        or step.startswith('USE TEMP B-TREE')
+    )
+
+
+def get_slow_steps(client, url, data=None):
+    """
+    Шаги планов запросов страницы, которые не используют индексы.
+
+    С data страница запрашивается POST-запросом, иначе GET.
+    """
+    queries = []
+
+    def capture(execute, sql, params, many, context):
+        queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(capture):
+        if data is None:
+            client.get(url)
+        else:
+            client.post(url, data)
+    return [
+        (step, sql)
+        for sql, params in queries
+        if sql.startswith(('SELECT', 'UPDATE', 'DELETE'))
+        for step in explain(sql, params)
+        if is_slow_step(step)
+    ]
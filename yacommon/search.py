@@ -0,0 +1,71 @@
+"""
+Разбор поисковых запросов для индексов SQLite FTS5.
+
+Слова запроса приводятся к основе и ищутся как префиксы, поэтому
+«новости» находит и «новость», и «новостями». Таблицы индексов и
+ранжирование свои у каждого проекта.
+"""
+import re
+
+from django.db import connection
+
+WORD = re.compile(r'\w+')
+MAX_TERMS = 10
+MIN_STEM_LENGTH = 3
+# Окончания русских слов, от длинных к коротким.
+ENDINGS = sorted((
+    'иями', 'ями', 'ами', 'ией', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими',
+    'ость', 'ости', 'ешь', 'ишь', 'ете', 'ите', 'ов', 'ев', 'ей', 'ий',
+    'ый', 'ой', 'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ам', 'ям', 'ах', 'ях',
+    'ом', 'ем', 'им', 'ым', 'ую', 'юю', 'ть', 'ет', 'ит', 'ут', 'ют', 'ат',
+    'ят', 'ла', 'ло', 'ли', 'ил', 'ал', 'а', 'я', 'о', 'е', 'ы', 'и', 'у',
+    'ю', 'ь', 'й',
+), key=len, reverse=True)
+
+
+def stem(word):
+    """Грубая основа слова: без самого длинного известного окончания."""
+    word = word.lower().replace('ё', 'е')
+    for ending in ENDINGS:
+        if (
+            word.endswith(ending)
+            and len(word) - len(ending) >= MIN_STEM_LENGTH
+        ):
+            return word[:-len(ending)]
+    return word
+
+
+def build_match(text):
+    """
+    Условие MATCH для слов текста или None, если искать нечего.
+
+    Каждое слово берётся в кавычки, поэтому синтаксис FTS5 в тексте
+    пользователя не работает. Токенизатор FTS5 не считает «ё» и «е»
+    одной буквой, поэтому основа с «е» ищется и в варианте с «ё».
+    """
+    terms = []
+    for word in WORD.findall(text)[:MAX_TERMS]:
+        base = stem(word)
+        variants = dict.fromkeys((base, base.replace('е', 'ё')))
+        terms.append(
+            '(' + ' OR '.join(f'"{variant}"*' for variant in variants) + ')'
+        )
+    if not terms:
+        return None
+    return ' AND '.join(terms)
+
+
+def optimize_tables(*tables):
+    """
+    Сливает сегменты индексов в один после массовой загрузки.
+
+    После тысяч отдельных вставок индекс состоит из множества мелких
+    сегментов, и каждый запрос обходит их все.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for table in tables:
+            cursor.execute(
+                f"INSERT INTO {table}({table}) VALUES ('optimize')"
+            )
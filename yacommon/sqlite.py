@@ -0,0 +1,115 @@
+"""
+Производственный режим SQLite.
+
+Включается настройкой SQLITE_PRODUCTION_MODE. Каждое новое соединение
+получает WAL-журнал и прагмы из PRAGMAS, а записи из представлений
+выполняет единственный поток-писатель: он собирает их в пачки и
+фиксирует одной транзакцией. Так параллельные запросы не спорят за
+блокировку базы и не получают «database is locked».
+"""
+import queue
+import threading
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import connection, transaction
+
+PRAGMAS = (
+    'PRAGMA journal_mode = WAL',
+    # В WAL-режиме NORMAL не портит базу при сбое, а fsync
+    # выполняется только при контрольных точках.
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA busy_timeout = 5000',
+    # Отрицательное значение задаёт размер кэша в килобайтах.
+    'PRAGMA cache_size = -20000',
+    'PRAGMA mmap_size = 268435456',
+    'PRAGMA temp_store = MEMORY',
+)
+BATCH_SIZE = 64
+
+
+def is_enabled(db_connection=connection):
+    return (
+        settings.SQLITE_PRODUCTION_MODE
+        and db_connection.vendor == 'sqlite'
+    )
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    """Обработчик connection_created: настраивает новое соединение."""
+    if not is_enabled(connection):
+        return
+    with connection.cursor() as cursor:
+        for pragma in PRAGMAS:
+            cursor.execute(pragma)
+
+
+class WriteQueue:
+    """
+    Очередь записей с единственным потоком-писателем.
+
+    run() ставит функцию в очередь и ждёт её результата. Писатель
+    выполняет каждую функцию в своей точке сохранения, поэтому ошибка
+    одной записи не отменяет остальные в пачке. Когда режим выключен
+    или вызов уже идёт внутри транзакции, функция выполняется сразу.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def run(self, func, *args, **kwargs):
+        if not is_enabled() or connection.in_atomic_block:
+            return func(*args, **kwargs)
+        future = Future()
+        self._queue.put((future, func, args, kwargs))
+        self._start()
+        return future.result()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._loop, name='sqlite-writer', daemon=True
+                )
+                self._thread.start()
+
+    def _loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch):
+        results = []
+        try:
+            with transaction.atomic():
+                for future, func, args, kwargs in batch:
+                    try:
+                        with transaction.atomic():
+                            results.append(
+                                (future, func(*args, **kwargs), None)
+                            )
+                    except Exception as error:
+                        results.append((future, None, error))
+        except Exception as error:
+            # Соединение могло остаться в неисправном состоянии:
+            # следующая пачка откроет новое.
+            connection.close()
+            for future, *_ in batch:
+                future.set_exception(error)
+            return
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+writer = WriteQueue()
@@ -0,0 +1,95 @@
+"""
+Загрузка шаблонов: кэш и предварительная компиляция.
+
+Загрузчик Loader кэширует разобранные шаблоны, если DEBUG выключен или
+включена настройка TEMPLATE_PRODUCTION_MODE. В этом режиме wsgi.py и
+asgi.py при старте вызывают preload_templates(): все шаблоны проекта и
+приложений разбираются до первого запроса, а шаблон, разобранный позже,
+попадает в лог предупреждением — значит, его не нашёл обход каталогов.
+"""
+import logging
+from pathlib import Path
+
+from django.conf import settings
+from django.template import engines
+from django.template.backends.django import DjangoTemplates
+from django.template.loaders import base, cached
+
+TEMPLATE_SUFFIXES = ('.html', '.txt')
+
+
+def get_logger():
+    """Логгер шаблонов: PROJECT_LOGGER из настроек проекта и .templates."""
+    return logging.getLogger(f'{settings.PROJECT_LOGGER}.templates')
+
+
+class Loader(cached.Loader):
+    """
+    Кэширующий загрузчик, который следит за разбором шаблонов.
+
+    При DEBUG без TEMPLATE_PRODUCTION_MODE шаблоны, как и раньше,
+    читаются заново при каждом обращении.
+    """
+
+    def __init__(self, engine, loaders):
+        super().__init__(engine, loaders)
+        self.preloaded = False
+
+    @property
+    def caching(self):
+        return not settings.DEBUG or settings.TEMPLATE_PRODUCTION_MODE
+
+    def get_template(self, template_name, skip=None):
+        if not self.caching:
+            return base.Loader.get_template(self, template_name, skip)
+        key = self.cache_key(template_name, skip)
+        parsed = self.preloaded and key not in self.get_template_cache
+        template = super().get_template(template_name, skip)
+        if parsed:
+            get_logger().warning(
+                'Шаблон %s разобран во время запроса', template_name
+            )
+        return template
+
+    def get_template_names(self):
+        """Имена всех шаблонов в каталогах вложенных загрузчиков."""
+        names = set()
+        for loader in self.loaders:
+            for directory in map(Path, loader.get_dirs()):
+                names.update(
+                    path.relative_to(directory).as_posix()
+                    for path in directory.rglob('*')
+                    if path.suffix in TEMPLATE_SUFFIXES and path.is_file()
+                )
+        return sorted(names)
+
+    def preload(self):
+        """Разбирает все шаблоны заранее и возвращает их число."""
+        names = self.get_template_names()
+        for name in names:
+            self.get_template(name)
+        self.preloaded = True
+        return len(names)
+
+    def reset(self):
+        super().reset()
+        self.preloaded = False
+
+
+def get_loaders():
+    for engine in engines.all():
+        if not isinstance(engine, DjangoTemplates):
+            continue
+        for loader in engine.engine.template_loaders:
+            if isinstance(loader, Loader):
+                yield loader
+
+
+def preload_templates():
+    """
+    Компилирует все шаблоны при старте процесса.
+
+    Ошибка синтаксиса в любом шаблоне остановит запуск, а не первый
+    запрос к странице. Возвращает число разобранных шаблонов.
+    """
+    return sum(loader.preload() for loader in get_loaders())
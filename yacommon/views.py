@@ -0,0 +1,20 @@
+from django.http import HttpResponse
+
+
+def render_response(view, request, *args, **kwargs):
+    """
+    Ответ синхронного view, отрисованный в том же потоке.
+
+    Готовый HttpResponse обработчик не отправляет на рендеринг ещё
+    одним переходом в поток.
+    """
+    response = view(request, *args, **kwargs)
+    if not callable(getattr(response, 'render', None)):
+        return response
+    response.render()
+    rendered = HttpResponse(
+        response.content, status=response.status_code,
+        headers=response.headers,
+    )
+    rendered.cookies = response.cookies
+    return rendered